@@ -0,0 +1,67 @@
+# alembic/env.py
+from logging.config import fileConfig
+
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+
+from alembic import context
+
+from database import DATABASE_URL
+from models import Base
+
+config = context.config
+
+# Use the same DATABASE_URL as the app instead of the placeholder in alembic.ini
+config.set_main_option("sqlalchemy.url", DATABASE_URL)
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# FTS5 search tables (and their shadow tables) on SQLite are managed by raw
+# DDL in models.py, not by the metadata
+SEARCH_TABLE_PREFIXES = ("repair_search", "customer_search")
+
+
+def include_name(name, type_, parent_names) -> bool:
+    return not (type_ == "table" and name.startswith(SEARCH_TABLE_PREFIXES))
+
+
+def run_migrations_offline() -> None:
+    """Emit migration SQL to stdout without connecting (alembic upgrade --sql)"""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations against a live connection"""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
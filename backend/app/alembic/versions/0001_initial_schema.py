@@ -0,0 +1,104 @@
+"""initial schema
+
+Tables as created by Base.metadata.create_all before migrations existed.
+Databases bootstrapped that way should be marked with
+``alembic stamp 0001_initial_schema`` and then upgraded normally.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_initial_schema'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'customers',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('cpf', sa.String(length=14), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('address', sa.Text(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_customers_cpf', 'customers', ['cpf'], unique=True)
+
+    op.create_table(
+        'watch_brands',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+
+    op.create_table(
+        'repair_types',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('estimated_price', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+    op.create_table(
+        'repair_requests',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('reference_number', sa.String(length=20), nullable=False),
+        sa.Column('customer_id', sa.Uuid(), nullable=True),
+        sa.Column('customer_name', sa.String(length=255), nullable=False),
+        sa.Column('customer_cpf', sa.String(length=14), nullable=False),
+        sa.Column('customer_phone', sa.String(length=20), nullable=False),
+        sa.Column('customer_address', sa.Text(), nullable=False),
+        sa.Column('customer_email', sa.String(length=255), nullable=True),
+        sa.Column('watch_brand_id', sa.Uuid(), nullable=False),
+        sa.Column('watch_type', sa.Enum('AUTOMATIC', 'BATTERY', 'MANUAL', name='watchtype'), nullable=False),
+        sa.Column('problem_description', sa.Text(), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'IN_PROGRESS', 'COMPLETED', 'DELIVERED', name='repairstatus'), nullable=True),
+        sa.Column('estimated_completion', sa.DateTime(), nullable=True),
+        sa.Column('total_price', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('internal_notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id']),
+        sa.ForeignKeyConstraint(['watch_brand_id'], ['watch_brands.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_repair_requests_reference_number', 'repair_requests', ['reference_number'], unique=True)
+
+    op.create_table(
+        'repair_request_types',
+        sa.Column('repair_request_id', sa.Uuid(), nullable=True),
+        sa.Column('repair_type_id', sa.Uuid(), nullable=True),
+        sa.ForeignKeyConstraint(['repair_request_id'], ['repair_requests.id']),
+        sa.ForeignKeyConstraint(['repair_type_id'], ['repair_types.id']),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('repair_request_types')
+    op.drop_index('ix_repair_requests_reference_number', table_name='repair_requests')
+    op.drop_table('repair_requests')
+    op.drop_table('repair_types')
+    op.drop_table('watch_brands')
+    op.drop_index('ix_customers_cpf', table_name='customers')
+    op.drop_table('customers')
+    sa.Enum(name='repairstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='watchtype').drop(op.get_bind(), checkfirst=True)
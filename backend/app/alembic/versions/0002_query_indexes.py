@@ -0,0 +1,69 @@
+"""indexes for the endpoint query patterns
+
+- repair_requests (created_at, id) and (status, created_at, id) back the
+  admin list ordering, keyset seek and status filter
+- repair_request_types gets a composite primary key (after removing
+  duplicate and NULL rows) plus an index on repair_type_id
+- is_active indexes for the active catalog lookups
+
+Revision ID: 0002_query_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_query_indexes'
+down_revision: Union[str, None] = '0001_initial_schema'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_repair_requests_created_at_id', 'repair_requests', ['created_at', 'id'])
+    op.create_index('ix_repair_requests_status_created_at_id', 'repair_requests', ['status', 'created_at', 'id'])
+    op.create_index('ix_watch_brands_is_active', 'watch_brands', ['is_active'])
+    op.create_index('ix_repair_types_is_active', 'repair_types', ['is_active'])
+
+    # The association table never had a key, so it may hold duplicates
+    op.execute(
+        "DELETE FROM repair_request_types "
+        "WHERE repair_request_id IS NULL OR repair_type_id IS NULL"
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "DELETE FROM repair_request_types a USING repair_request_types b "
+            "WHERE a.ctid < b.ctid "
+            "AND a.repair_request_id = b.repair_request_id "
+            "AND a.repair_type_id = b.repair_type_id"
+        )
+    else:
+        op.execute(
+            "DELETE FROM repair_request_types WHERE rowid NOT IN ("
+            "SELECT MIN(rowid) FROM repair_request_types "
+            "GROUP BY repair_request_id, repair_type_id)"
+        )
+
+    with op.batch_alter_table('repair_request_types') as batch_op:
+        batch_op.alter_column('repair_request_id', existing_type=sa.Uuid(), nullable=False)
+        batch_op.alter_column('repair_type_id', existing_type=sa.Uuid(), nullable=False)
+        batch_op.create_primary_key('repair_request_types_pkey', ['repair_request_id', 'repair_type_id'])
+    op.create_index('ix_repair_request_types_repair_type_id', 'repair_request_types', ['repair_type_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_repair_request_types_repair_type_id', table_name='repair_request_types')
+    with op.batch_alter_table('repair_request_types') as batch_op:
+        batch_op.drop_constraint('repair_request_types_pkey', type_='primary')
+        batch_op.alter_column('repair_type_id', existing_type=sa.Uuid(), nullable=True)
+        batch_op.alter_column('repair_request_id', existing_type=sa.Uuid(), nullable=True)
+
+    op.drop_index('ix_repair_types_is_active', table_name='repair_types')
+    op.drop_index('ix_watch_brands_is_active', table_name='watch_brands')
+    op.drop_index('ix_repair_requests_status_created_at_id', table_name='repair_requests')
+    op.drop_index('ix_repair_requests_created_at_id', table_name='repair_requests')
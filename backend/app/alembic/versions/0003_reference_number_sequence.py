@@ -0,0 +1,43 @@
+"""reference number sequence
+
+Reference numbers move from REP-YYYY-NNN with three random digits to
+REP-YYYY-NNNNNN built from a sequence. Existing references keep their
+three-digit suffix, which can never equal a zero-padded six-digit one, so
+no backfill is needed and the sequence simply starts at 1.
+
+Revision ID: 0003_reference_number_sequence
+Revises: 0002_query_indexes
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_reference_number_sequence'
+down_revision: Union[str, None] = '0002_query_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.CreateSequence(sa.Sequence('repair_reference_number_seq')))
+
+    # Fallback for backends without sequences (SQLite)
+    reference_counters = op.create_table(
+        'reference_counters',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.bulk_insert(reference_counters, [{'name': 'repair_reference_number', 'value': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('reference_counters')
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.DropSequence(sa.Sequence('repair_reference_number_seq')))
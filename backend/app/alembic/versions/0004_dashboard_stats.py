@@ -0,0 +1,115 @@
+"""dashboard aggregate tables
+
+repair_stats keeps count and revenue per (dimension, key, status) and
+repair_turnaround_stats keeps completed count and total turnaround seconds
+per (dimension, key). Both are backfilled from existing repairs; for
+repairs already COMPLETED or DELIVERED (which stay counted once delivered,
+as StatsDelta does) the turnaround is approximated by updated_at -
+created_at since the completion time was never recorded.
+
+Revision ID: 0004_dashboard_stats
+Revises: 0003_reference_number_sequence
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_dashboard_stats'
+down_revision: Union[str, None] = '0003_reference_number_sequence'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REPAIR_STATUSES = ('PENDING', 'IN_PROGRESS', 'COMPLETED', 'DELIVERED')
+
+
+def upgrade() -> None:
+    repair_stats = op.create_table(
+        'repair_stats',
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('dimension_key', sa.String(length=64), nullable=False),
+        sa.Column('status', postgresql.ENUM(*REPAIR_STATUSES, name='repairstatus', create_type=False), nullable=False),
+        sa.Column('repair_count', sa.BigInteger(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'dimension_key', 'status'),
+    )
+    turnaround_stats = op.create_table(
+        'repair_turnaround_stats',
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('dimension_key', sa.String(length=64), nullable=False),
+        sa.Column('completed_count', sa.BigInteger(), nullable=False),
+        sa.Column('turnaround_seconds', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'dimension_key'),
+    )
+    backfill(repair_stats, turnaround_stats)
+
+
+def backfill(repair_stats, turnaround_stats) -> None:
+    """Aggregate per dimension with INSERT ... SELECT, so `alembic upgrade
+    --sql` emits the backfill too instead of needing a live connection"""
+    is_postgresql = op.get_context().dialect.name == 'postgresql'
+    repairs = sa.table(
+        'repair_requests',
+        sa.column('id', sa.Uuid()),
+        sa.column('watch_brand_id', sa.Uuid()),
+        sa.column('watch_type', sa.String()),
+        sa.column('status', sa.String()),
+        sa.column('total_price', sa.Numeric()),
+        sa.column('created_at', sa.DateTime()),
+        sa.column('updated_at', sa.DateTime()),
+    )
+    repair_types = sa.table(
+        'repair_request_types',
+        sa.column('repair_request_id', sa.Uuid()),
+        sa.column('repair_type_id', sa.Uuid()),
+    )
+
+    def uuid_key(column):
+        """The UUID as str(uuid.UUID) renders it, which is how the app keys it"""
+        if is_postgresql:
+            return sa.cast(column, sa.String)
+        # SQLite stores Uuid columns as 32 hex digits without dashes
+        hex_digits = sa.func.lower(sa.cast(column, sa.String))
+        key = sa.func.substr(hex_digits, 1, 8)
+        for start, length in ((9, 4), (13, 4), (17, 4), (21, 12)):
+            key = key.concat('-').concat(sa.func.substr(hex_digits, start, length))
+        return key
+
+    if is_postgresql:
+        seconds = sa.func.extract('epoch', repairs.c.updated_at - repairs.c.created_at)
+    else:
+        seconds = (sa.func.julianday(repairs.c.updated_at) - sa.func.julianday(repairs.c.created_at)) * 86400
+
+    with_types = repair_types.join(repairs, repairs.c.id == repair_types.c.repair_request_id)
+    dimensions = [
+        (sa.literal('all'), sa.literal('all'), [], repairs),
+        (sa.literal('brand'), uuid_key(repairs.c.watch_brand_id), [repairs.c.watch_brand_id], repairs),
+        (sa.literal('watch_type'), sa.cast(repairs.c.watch_type, sa.String), [repairs.c.watch_type], repairs),
+        (sa.literal('repair_type'), uuid_key(repair_types.c.repair_type_id), [repair_types.c.repair_type_id], with_types),
+    ]
+    for dimension, key, group_by, source in dimensions:
+        op.execute(repair_stats.insert().from_select(
+            ['dimension', 'dimension_key', 'status', 'repair_count', 'revenue'],
+            sa.select(
+                dimension, key, repairs.c.status,
+                sa.func.count(), sa.func.coalesce(sa.func.sum(repairs.c.total_price), 0),
+            ).select_from(source).group_by(*group_by, repairs.c.status)
+        ))
+        op.execute(turnaround_stats.insert().from_select(
+            ['dimension', 'dimension_key', 'completed_count', 'turnaround_seconds'],
+            sa.select(
+                dimension, key,
+                sa.func.count(), sa.cast(sa.func.round(sa.func.coalesce(sa.func.sum(seconds), 0)), sa.BigInteger),
+            ).select_from(source).where(repairs.c.status.in_(('COMPLETED', 'DELIVERED'))).group_by(*group_by)
+            .having(sa.func.count() > 0)
+        ))
+
+
+def downgrade() -> None:
+    op.drop_table('repair_turnaround_stats')
+    op.drop_table('repair_stats')
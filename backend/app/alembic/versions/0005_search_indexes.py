@@ -0,0 +1,65 @@
+"""search indexes
+
+PostgreSQL: pg_trgm extension plus GIN expression indexes (tsvector over
+problem_description, trigrams over lowercased names, reference numbers and
+CPF/phone digits). SQLite: FTS5 trigram tables with sync triggers, filled
+from the existing rows.
+
+The DDL is shared with models.py so create_all and migrations build the
+same objects; every statement is IF NOT EXISTS.
+
+Revision ID: 0005_search_indexes
+Revises: 0004_dashboard_stats
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from models import POSTGRESQL_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_search_indexes'
+down_revision: Union[str, None] = '0004_dashboard_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTGRESQL_INDEXES = (
+    'ix_repair_requests_problem_fts',
+    'ix_repair_requests_customer_name_trgm',
+    'ix_repair_requests_reference_number_trgm',
+    'ix_repair_requests_customer_digits_trgm',
+    'ix_customers_name_trgm',
+    'ix_customers_digits_trgm',
+)
+SQLITE_FTS_TABLES = ('repair_search', 'customer_search')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in POSTGRESQL_SEARCH_DDL:
+            op.execute(statement)
+        return
+
+    for statement in SQLITE_SEARCH_DDL:
+        op.execute(statement)
+    # Index rows that existed before the triggers did; touching a watched
+    # column fires the update trigger, which (re)writes the FTS row
+    op.execute("DELETE FROM repair_search")
+    op.execute("DELETE FROM customer_search")
+    op.execute("UPDATE repair_requests SET customer_name = customer_name")
+    op.execute("UPDATE customers SET name = name")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for index in POSTGRESQL_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {index}")
+        return
+
+    for table in SQLITE_FTS_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {table}")
@@ -0,0 +1,44 @@
+"""customer cpf_key
+
+Adds customers.cpf_key, the CPF as 11 bare digits, with a plain btree index
+so check_customer finds a customer with one equality seek whatever
+punctuation the caller used. Backfilled in SQL from customers.cpf.
+
+Revision ID: 0006_customer_cpf_key
+Revises: 0005_search_indexes
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_customer_cpf_key'
+down_revision: Union[str, None] = '0005_search_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Added NOT NULL with a temporary default so SQLite needs no batch table
+    # rebuild, which would drop the customer_search triggers and renumber rowids
+    op.add_column('customers', sa.Column('cpf_key', sa.String(length=11), nullable=False, server_default=''))
+
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    if is_postgresql:
+        digits = "regexp_replace(cpf, '[^0-9]', '', 'g')"
+    else:
+        digits = "replace(replace(replace(cpf, '.', ''), '-', ''), ' ', '')"
+    op.execute(f"UPDATE customers SET cpf_key = substr({digits}, 1, 11)")
+
+    if is_postgresql:
+        op.alter_column('customers', 'cpf_key', server_default=None)
+    op.create_index('ix_customers_cpf_key', 'customers', ['cpf_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_customers_cpf_key', table_name='customers')
+    op.drop_column('customers', 'cpf_key')
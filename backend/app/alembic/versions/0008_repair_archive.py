@@ -0,0 +1,48 @@
+"""repair archive
+
+Adds repair_archive, where archive.py moves DELIVERED repairs that have not
+changed for ARCHIVE_AFTER_DAYS, one zlib-compressed JSON document per repair.
+On PostgreSQL the table is range partitioned by created_at (yearly
+partitions are created by archive.py as needed) and the document column is
+stored out of line without TOAST compression, since it is compressed already.
+
+Revision ID: 0008_repair_archive
+Revises: 0007_idempotency_keys
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_repair_archive'
+down_revision: Union[str, None] = '0007_idempotency_keys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'repair_archive',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('reference_number', sa.String(length=20), nullable=False),
+        sa.Column('customer_id', sa.Uuid(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('document', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('ix_repair_archive_reference_number', 'repair_archive', ['reference_number'])
+    op.create_index('ix_repair_archive_customer_id', 'repair_archive', ['customer_id'])
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE repair_archive ALTER COLUMN document SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_repair_archive_customer_id', table_name='repair_archive')
+    op.drop_index('ix_repair_archive_reference_number', table_name='repair_archive')
+    op.drop_table('repair_archive')
@@ -0,0 +1,54 @@
+"""repair status events
+
+Adds repair_status_events, the append-only history of repair status
+changes written by status_history.py, with one index for per-repair
+timelines and one over changed_at for time-window analytics (covering the
+stage columns on PostgreSQL). Existing repairs get no backfilled events.
+
+Revision ID: 0009_repair_status_events
+Revises: 0008_repair_archive
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_repair_status_events'
+down_revision: Union[str, None] = '0008_repair_archive'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REPAIR_STATUSES = ('PENDING', 'IN_PROGRESS', 'COMPLETED', 'DELIVERED')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'repair_status_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('repair_request_id', sa.Uuid(), nullable=False),
+        sa.Column('watch_brand_id', sa.Uuid(), nullable=False),
+        sa.Column('from_status', postgresql.ENUM(*REPAIR_STATUSES, name='repairstatus', create_type=False), nullable=True),
+        sa.Column('to_status', postgresql.ENUM(*REPAIR_STATUSES, name='repairstatus', create_type=False), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.Column('dwell_seconds', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_repair_status_events_repair_request_id_changed_at', 'repair_status_events',
+        ['repair_request_id', 'changed_at']
+    )
+    op.create_index(
+        'ix_repair_status_events_changed_at', 'repair_status_events', ['changed_at'],
+        postgresql_include=['from_status', 'watch_brand_id', 'dwell_seconds']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_repair_status_events_changed_at', table_name='repair_status_events')
+    op.drop_index('ix_repair_status_events_repair_request_id_changed_at', table_name='repair_status_events')
+    op.drop_table('repair_status_events')
@@ -0,0 +1,40 @@
+"""customer history indexes
+
+Index for the paginated customer history: (customer_id, created_at, id) on
+repair_requests, covering the listed columns on PostgreSQL so pages are
+index-only reads, and the same key on repair_archive in place of its
+customer_id index, so archived repairs merge in with the same seek.
+
+Revision ID: 0010_customer_history_indexes
+Revises: 0009_repair_status_events
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_customer_history_indexes'
+down_revision: Union[str, None] = '0009_repair_status_events'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_repair_requests_customer_id_created_at', 'repair_requests', ['customer_id', 'created_at', 'id'],
+        postgresql_include=['reference_number', 'status', 'watch_brand_id', 'watch_type',
+                            'total_price', 'estimated_completion']
+    )
+    op.drop_index('ix_repair_archive_customer_id', table_name='repair_archive')
+    op.create_index(
+        'ix_repair_archive_customer_id_created_at', 'repair_archive', ['customer_id', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_repair_archive_customer_id_created_at', table_name='repair_archive')
+    op.create_index('ix_repair_archive_customer_id', 'repair_archive', ['customer_id'])
+    op.drop_index('ix_repair_requests_customer_id_created_at', table_name='repair_requests')
@@ -0,0 +1,39 @@
+"""repair completed_at
+
+Adds repair_requests.completed_at, the first time a repair reached
+COMPLETED, so the dashboard turnaround counts a repair once even when it is
+reopened and completed again. Backfilled from the first COMPLETED event in
+repair_status_events, else updated_at for repairs already COMPLETED or
+DELIVERED (the same approximation 0004 used for their turnaround).
+
+Revision ID: 0011_repair_completed_at
+Revises: 0010_customer_history_indexes
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011_repair_completed_at'
+down_revision: Union[str, None] = '0010_customer_history_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('repair_requests', sa.Column('completed_at', sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE repair_requests SET completed_at = COALESCE("
+        "(SELECT MIN(changed_at) FROM repair_status_events "
+        "WHERE repair_status_events.repair_request_id = repair_requests.id "
+        "AND repair_status_events.to_status = 'COMPLETED'), "
+        "CASE WHEN status IN ('COMPLETED', 'DELIVERED') THEN updated_at END)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('repair_requests', 'completed_at')
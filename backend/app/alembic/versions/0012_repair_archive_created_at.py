@@ -0,0 +1,29 @@
+"""repair archive created_at index
+
+Index on repair_archive (created_at, id), so exports can stream archived
+repairs in the same order as repair_requests for a created_at range, and the
+admin list can count the archived repairs its filters match.
+
+Revision ID: 0012_repair_archive_created_at
+Revises: 0011_repair_completed_at
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012_repair_archive_created_at'
+down_revision: Union[str, None] = '0011_repair_completed_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_repair_archive_created_at_id', 'repair_archive', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_repair_archive_created_at_id', table_name='repair_archive')
@@ -0,0 +1,186 @@
+# archive.py
+"""
+Archival of delivered repairs
+DELIVERED repairs that have not changed for ARCHIVE_AFTER_DAYS are moved out
+of repair_requests (and their repair_request_types rows) into repair_archive,
+one compressed document per repair. This keeps the hot table, its indexes and
+the admin/search queries sized by the repairs still in the workshop.
+
+repair_archive is range partitioned by year of created_at on PostgreSQL; the
+partitions a batch needs are created before it is inserted. The status
+endpoints fall back to load_archived_status when a repair is not found in
+repair_requests, exports merge archived repairs back in, and the admin list
+reports how many of its matches are archived. Dashboard aggregates are left
+as they are: an archived repair still counts as delivered.
+
+CLI usage:
+    python archive.py
+    python archive.py --older-than-days 365 --batch-size 1000
+    python archive.py --dry-run
+"""
+import argparse
+import asyncio
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+import orjson
+from decouple import config
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from database import AsyncSessionLocal, engine
+from models import RepairArchive, RepairRequest, RepairStatus, repair_request_types
+
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=180, cast=int)
+DEFAULT_BATCH_SIZE = 500
+
+# Columns copied from repair_requests into the document
+DOCUMENT_COLUMNS = [column.name for column in RepairRequest.__table__.columns]
+
+@dataclass
+class ArchiveResult:
+    archived: int = 0
+    batches: int = 0
+
+def pack(repair: RepairRequest) -> bytes:
+    """Compressed JSON of the repair with its brand and repair types resolved"""
+    document = {name: getattr(repair, name) for name in DOCUMENT_COLUMNS}
+    document["watch_brand"] = repair.watch_brand.name
+    document["repair_types"] = [{"id": rt.id, "name": rt.name} for rt in repair.repair_types]
+    # orjson handles the UUIDs, datetimes and enums; prices go in as strings
+    return zlib.compress(orjson.dumps(document, default=str))
+
+def unpack(document: bytes) -> Dict:
+    return orjson.loads(zlib.decompress(document))
+
+async def ensure_partitions(db: AsyncSession, years: Iterable[int]) -> None:
+    """Create the yearly repair_archive partitions (PostgreSQL only)"""
+    if db.bind.dialect.name != 'postgresql':
+        return
+    for year in sorted(set(years)):
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS repair_archive_{year} PARTITION OF repair_archive "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+
+def archivable(cutoff: datetime):
+    """DELIVERED repairs untouched since cutoff. created_at <= updated_at, so
+    the created_at bound keeps this a range scan of the status index."""
+    return (
+        (RepairRequest.status == RepairStatus.DELIVERED)
+        & (RepairRequest.created_at < cutoff)
+        & (RepairRequest.updated_at < cutoff)
+    )
+
+async def count_archivable(db: AsyncSession, cutoff: datetime) -> int:
+    return await db.scalar(select(func.count()).select_from(RepairRequest).where(archivable(cutoff)))
+
+async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Move up to batch_size repairs into the archive in one transaction"""
+    repairs = (await db.scalars(
+        select(RepairRequest)
+        .options(selectinload(RepairRequest.watch_brand), selectinload(RepairRequest.repair_types))
+        .where(archivable(cutoff))
+        .order_by(RepairRequest.created_at, RepairRequest.id)
+        .limit(batch_size)
+        .with_for_update(of=RepairRequest)
+    )).all()
+    if not repairs:
+        return 0
+
+    ids = [repair.id for repair in repairs]
+    archived_at = datetime.utcnow()
+    await ensure_partitions(db, (repair.created_at.year for repair in repairs))
+    await db.execute(insert(RepairArchive), [
+        {
+            "id": repair.id,
+            "reference_number": repair.reference_number,
+            "customer_id": repair.customer_id,
+            "created_at": repair.created_at,
+            "archived_at": archived_at,
+            "document": pack(repair),
+        }
+        for repair in repairs
+    ])
+    await db.execute(delete(repair_request_types).where(repair_request_types.c.repair_request_id.in_(ids)))
+    await db.execute(
+        delete(RepairRequest)
+        .where(RepairRequest.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    db.expunge_all()
+    return len(repairs)
+
+async def archive_delivered(
+    db: AsyncSession,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ArchiveResult:
+    """Archive every eligible repair, batch by batch; each batch commits on
+    its own so locks stay short and an interrupted run resumes cleanly"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = ArchiveResult()
+    while True:
+        archived = await archive_batch(db, cutoff, batch_size)
+        if not archived:
+            return result
+        result.archived += archived
+        result.batches += 1
+
+async def load_archived_status(
+    db: AsyncSession,
+    repair_id: uuid.UUID = None,
+    reference_number: str = None,
+) -> Optional[Dict]:
+    """Public status payload of an archived repair, or None"""
+    if repair_id is not None:
+        condition = RepairArchive.id == repair_id
+    else:
+        condition = RepairArchive.reference_number == reference_number
+    document = (await db.scalars(select(RepairArchive.document).where(condition))).first()
+    if document is None:
+        return None
+    repair = unpack(document)
+    return {
+        "id": repair["id"],
+        "reference_number": repair["reference_number"],
+        "status": repair["status"],
+        "estimated_completion": repair["estimated_completion"],
+        "customer_name": repair["customer_name"],
+        "watch_brand": repair["watch_brand"],
+        "repair_types": [rt["name"] for rt in repair["repair_types"]],
+        "created_at": repair["created_at"],
+        "notes": repair["internal_notes"],
+    }
+
+async def run(older_than_days: int, batch_size: int, dry_run: bool) -> ArchiveResult:
+    try:
+        async with AsyncSessionLocal() as db:
+            if dry_run:
+                cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+                return ArchiveResult(archived=await count_archivable(db, cutoff))
+            return await archive_delivered(db, older_than_days, batch_size)
+    finally:
+        await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old delivered repairs into the archive")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the repairs that would be archived")
+    args = parser.parse_args()
+
+    print(f"🔄 Archiving repairs delivered more than {args.older_than_days} days ago...")
+    result = asyncio.run(run(args.older_than_days, args.batch_size, args.dry_run))
+    if args.dry_run:
+        print(f"✅ {result.archived} repair requests would be archived")
+    else:
+        print(f"✅ {result.archived} repair requests archived in {result.batches} batches")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# benchmark.py
+"""
+Load benchmark for the Watchmaker API
+Drives a running server with a weighted mix of public and admin requests and
+reports requests/sec, latency percentiles and SQL statements per request for
+each endpoint. Query counts come from the server's /metrics endpoint.
+
+Seed a realistic dataset first (see seed_benchmark_data.py), then:
+
+Usage:
+    python benchmark.py --base-url http://localhost:8000 --concurrency 50 --duration 30
+    python benchmark.py --mix polling               # status lookups only (status cache p99)
+    python benchmark.py --mix admin                 # admin list/detail/search/stats/updates
+    python benchmark.py --mix "status_id=5,search=1"
+    python benchmark.py --output baseline.json      # store a baseline
+    python benchmark.py --baseline baseline.json    # exit 1 on a regression against it
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+VALID_CPFS = ["529.982.247-25", "111.444.777-35", "123.456.789-09", "935.411.347-80"]
+STATUSES = ["PENDING", "IN_PROGRESS", "COMPLETED", "DELIVERED"]
+
+# Operation -> (method, route) as labelled in the server's /metrics
+OPERATIONS = {
+    "status_id": ("GET", "/api/repair-requests/{repair_id}/status"),
+    "status_ref": ("GET", "/api/repair-requests/reference/{reference_number}/status"),
+    "form": ("GET", "/api/repair-form/data"),
+    "check_customer": ("GET", "/api/customers/check"),
+    "submit": ("POST", "/api/repair-requests"),
+    "admin_list": ("GET", "/api/admin/repair-requests"),
+    "admin_detail": ("GET", "/api/admin/repair-requests/{repair_id}"),
+    "admin_update": ("PUT", "/api/admin/repair-requests/{repair_id}"),
+    "stats": ("GET", "/api/admin/stats"),
+    "search": ("GET", "/api/admin/search"),
+}
+MIXES = {
+    # Customers polling status dominate production traffic
+    "mixed": {"status_id": 30, "status_ref": 20, "form": 8, "check_customer": 4, "submit": 4,
+              "admin_list": 10, "admin_detail": 6, "admin_update": 3, "stats": 5, "search": 10},
+    "public": {"status_id": 45, "status_ref": 30, "form": 12, "check_customer": 6, "submit": 7},
+    "polling": {"status_id": 60, "status_ref": 40},
+    "admin": {"admin_list": 35, "admin_detail": 20, "admin_update": 10, "stats": 10, "search": 25},
+}
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def parse_mix(value):
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def build_submission(form_data):
+    brand = random.choice(form_data["watch_brands"])
+    repair_types = random.sample(form_data["repair_types"], k=min(2, len(form_data["repair_types"])))
+    return {
+        "customer_data": {
+            "name": "Benchmark Customer",
+            "cpf": random.choice(VALID_CPFS),
+            "phone": "(11) 99999-0000",
+            "address": "Rua do Relojoeiro, 100",
+        },
+        "watch_data": {"brand_id": brand["id"], "type": "AUTOMATIC"},
+        "repair_data": {
+            "repair_type_ids": [rt["id"] for rt in repair_types],
+            "problem_description": "Benchmark submission",
+        },
+    }
+
+class Workload:
+    """Sample data the request builders draw from"""
+
+    def __init__(self, form_data, repairs, cursors):
+        self.form_data = form_data
+        self.repairs = repairs
+        self.cursors = cursors
+        names = {word for repair in repairs for word in repair["customer_name"].split() if len(word) >= 3}
+        self.search_terms = sorted(names) or ["Benchmark"]
+
+    def search_term(self):
+        repair = random.choice(self.repairs)
+        roll = random.random()
+        if roll < 0.5:
+            return random.choice(self.search_terms)
+        if roll < 0.8:
+            return repair["reference_number"][-6:]
+        return "".join(random.choices(string.digits, k=4))
+
+    def request(self, operation):
+        """(method, url, kwargs) for one request of `operation`"""
+        repair = random.choice(self.repairs)
+        if operation == "status_id":
+            return "GET", f"/api/repair-requests/{repair['id']}/status", {}
+        if operation == "status_ref":
+            return "GET", f"/api/repair-requests/reference/{repair['reference_number']}/status", {}
+        if operation == "form":
+            return "GET", "/api/repair-form/data", {}
+        if operation == "check_customer":
+            return "GET", "/api/customers/check", {"params": {"cpf": random.choice(VALID_CPFS)}}
+        if operation == "submit":
+            return "POST", "/api/repair-requests", {"json": build_submission(self.form_data)}
+        if operation == "admin_list":
+            params = {"limit": 20}
+            roll = random.random()
+            if roll < 0.3:
+                params["status"] = random.choice(STATUSES)
+            elif roll < 0.6 and self.cursors:
+                params.update(cursor=random.choice(self.cursors), include_total="false")
+            return "GET", "/api/admin/repair-requests", {"params": params}
+        if operation == "admin_detail":
+            return "GET", f"/api/admin/repair-requests/{repair['id']}", {}
+        if operation == "admin_update":
+            return "PUT", f"/api/admin/repair-requests/{repair['id']}", {"json": {"status": random.choice(STATUSES)}}
+        if operation == "stats":
+            return "GET", "/api/admin/stats", {}
+        if operation == "search":
+            return "GET", "/api/admin/search", {"params": {"q": self.search_term(), "limit": 20}}
+        raise ValueError(operation)
+
+async def prepare(client, seed_repairs, sample_size):
+    """Fetch the catalog and a sample of existing repairs (creating some on an
+    empty database) plus keyset cursors deep into the admin list"""
+    response = await client.get("/api/repair-form/data")
+    response.raise_for_status()
+    form_data = response.json()
+    if not form_data["watch_brands"] or not form_data["repair_types"]:
+        raise SystemExit("❌ No active brands/repair types. Run setup_database.py first.")
+
+    repairs = []
+    cursors = []
+    cursor = None
+    while len(repairs) < sample_size:
+        params = {"limit": 100, "include_total": "false"}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/admin/repair-requests", params=params)
+        response.raise_for_status()
+        page = response.json()
+        repairs.extend(page["repair_requests"])
+        cursor = page["pagination"]["next_cursor"]
+        if not cursor:
+            break
+        cursors.append(cursor)
+
+    for _ in range(max(0, seed_repairs - len(repairs))):
+        response = await client.post("/api/repair-requests", json=build_submission(form_data))
+        response.raise_for_status()
+        repairs.append({**response.json()["repair_request"], "customer_name": "Benchmark Customer"})
+    return Workload(form_data, repairs, cursors)
+
+async def query_counts(client):
+    """{(method, route): (statements, requests)} from the server's /metrics, or
+    None when it does not expose them"""
+    try:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    from prometheus_client.parser import text_string_to_metric_families
+
+    sums = defaultdict(float)
+    counts = defaultdict(float)
+    for family in text_string_to_metric_families(response.text):
+        if family.name != "watchmaker_db_queries_per_request":
+            continue
+        for sample in family.samples:
+            key = (sample.labels.get("method"), sample.labels.get("route"))
+            if sample.name.endswith("_sum"):
+                sums[key] = sample.value
+            elif sample.name.endswith("_count"):
+                counts[key] = sample.value
+    return {key: (sums[key], counts[key]) for key in counts}
+
+async def worker(client, deadline, warmup_until, workload, operations, weights, latencies, errors):
+    while time.perf_counter() < deadline:
+        operation = random.choices(operations, weights)[0]
+        method, url, kwargs = workload.request(operation)
+        started = time.perf_counter()
+        failed = False
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if started < warmup_until:
+            continue
+        latencies[operation].append((time.perf_counter() - started) * 1000)
+        if failed:
+            errors[operation] += 1
+
+async def run_benchmark(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        workload = await prepare(client, args.seed_repairs, args.sample_size)
+        operations = list(args.mix)
+        weights = [args.mix[operation] for operation in operations]
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        started = time.perf_counter()
+        warmup_until = started + args.warmup
+        deadline = warmup_until + args.duration
+        workers = [
+            asyncio.create_task(worker(client, deadline, warmup_until, workload, operations, weights, latencies, errors))
+            for _ in range(args.concurrency)
+        ]
+        await asyncio.sleep(args.warmup)
+        queries_before = await query_counts(client)
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - warmup_until
+        queries_after = await query_counts(client)
+
+    def queries_per_request(operation):
+        if queries_before is None or queries_after is None:
+            return None
+        key = OPERATIONS[operation]
+        statements_after, requests_after = queries_after.get(key, (0, 0))
+        statements_before, requests_before = queries_before.get(key, (0, 0))
+        requests = requests_after - requests_before
+        return round((statements_after - statements_before) / requests, 2) if requests else None
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "duration": elapsed,
+        "requests": total,
+        "requests_per_second": total / elapsed,
+        "endpoints": {
+            operation: {
+                "route": " ".join(OPERATIONS[operation]),
+                "requests": len(values),
+                "errors": errors[operation],
+                "requests_per_second": len(values) / elapsed,
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "queries_per_request": queries_per_request(operation),
+            }
+            for operation, values in sorted(latencies.items())
+        },
+    }
+
+def print_results(results):
+    print(f"📊 {results['requests']} requests in {results['duration']:.1f}s "
+          f"at concurrency {results['concurrency']}: {results['requests_per_second']:.1f} req/s")
+    for stats in results["endpoints"].values():
+        queries = stats["queries_per_request"]
+        print(f"   {stats['route']}: {stats['requests']} reqs, {stats['errors']} errors, "
+              f"p50 {stats['p50_ms']:.1f}ms, p95 {stats['p95_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms"
+              + (f", {queries} queries/req" if queries is not None else ""))
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against a stored baseline: latency or
+    throughput worse by more than `tolerance`, or any extra SQL statements"""
+    regressions = []
+    for operation, stats in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(operation)
+        if not before:
+            continue
+        for field in ("p95_ms", "p99_ms"):
+            if before[field] and stats[field] > before[field] * (1 + tolerance):
+                regressions.append(f"{stats['route']} {field}: {before[field]:.1f} -> {stats[field]:.1f}")
+        if before.get("queries_per_request") is not None and stats["queries_per_request"] is not None:
+            # Statement counts are deterministic, so any increase is a regression (an N+1)
+            if stats["queries_per_request"] > before["queries_per_request"] + 0.5:
+                regressions.append(f"{stats['route']} queries/req: "
+                                   f"{before['queries_per_request']} -> {stats['queries_per_request']}")
+    if results["requests_per_second"] < baseline["requests_per_second"] * (1 - tolerance):
+        regressions.append(f"throughput: {baseline['requests_per_second']:.1f} -> {results['requests_per_second']:.1f} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the Watchmaker API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=MIXES["mixed"],
+                        help=f"Preset ({', '.join(MIXES)}) or operation=weight pairs")
+    parser.add_argument("--sample-size", type=int, default=1000, help="Existing repairs to draw requests from")
+    parser.add_argument("--seed-repairs", type=int, default=20, help="Repairs created when the database has fewer")
+    parser.add_argument("--output", help="Write results as JSON to this file (e.g. to store a baseline)")
+    parser.add_argument("--baseline", help="Compare against results stored with --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# bulk_import.py
+"""
+Bulk import of repair requests from partner store files
+Accepts CSV (one flat row per repair) or NDJSON (one repair request body, as
+sent to POST /api/repair-requests, per line). Rows are validated and written
+in batches; invalid rows are reported and skipped without aborting the rest.
+Each batch is validated with one pydantic call over the whole list, and
+written inside a SAVEPOINT: when the database rejects it, the batch is split
+in halves until the rows it rejects are isolated and reported with the
+database's message, and the other rows are still imported.
+
+CSV columns:
+    customer_name, customer_cpf, customer_phone, customer_address,
+    customer_email, watch_brand_id, watch_type, repair_type_ids
+    (separated by ';'), problem_description, create_customer_account
+
+CLI usage:
+    python bulk_import.py repairs.csv
+    python bulk_import.py repairs.ndjson --batch-size 1000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from catalog import Catalog, CatalogCache
+from cpf import cpf_key
+from database import AsyncSessionLocal, dialect_insert
+from models import Customer, RepairRequest, WatchType, RepairStatus, repair_request_types
+from references import allocate_reference_numbers
+from stats import RepairFacts, StatsDelta
+from status_history import StatusHistory
+import schemas
+
+DEFAULT_BATCH_SIZE = 500
+FORMATS = ("csv", "ndjson")
+TRUE_VALUES = {"1", "true", "yes", "y", "sim", "s"}
+
+@dataclass
+class ImportResult:
+    total_rows: int = 0
+    created: int = 0
+    errors: List[Dict] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    def as_dict(self) -> Dict:
+        return {
+            "total_rows": self.total_rows,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+def detect_format(filename: str) -> str:
+    if filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+def csv_row_to_request(row: Dict[str, str]) -> Dict:
+    """Map a flat CSV row onto the RepairRequestCreate body shape"""
+    return {
+        "customer_data": {
+            "name": row.get("customer_name", ""),
+            "cpf": row.get("customer_cpf", ""),
+            "phone": row.get("customer_phone", ""),
+            "address": row.get("customer_address", ""),
+            "email": row.get("customer_email") or None,
+        },
+        "watch_data": {
+            "brand_id": row.get("watch_brand_id", ""),
+            "type": row.get("watch_type", ""),
+        },
+        "repair_data": {
+            "repair_type_ids": [rt_id.strip() for rt_id in (row.get("repair_type_ids") or "").split(";") if rt_id.strip()],
+            "problem_description": row.get("problem_description", ""),
+        },
+        "create_customer_account": (row.get("create_customer_account") or "").strip().lower() in TRUE_VALUES,
+    }
+
+def iter_rows(stream: IO[bytes], file_format: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield (row_number, request body) pairs without loading the whole file"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        # Row 1 is the header, so data rows start at 2 like in a spreadsheet
+        for row_number, row in enumerate(csv.DictReader(text), start=2):
+            yield row_number, csv_row_to_request(row)
+    else:
+        for row_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, {"_error": f"Invalid JSON: {e.msg}"}
+
+def batched(rows: Iterable[Tuple[int, Dict]], size: int) -> Iterator[List[Tuple[int, Dict]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Validates a whole batch in one call into pydantic-core, CPF validators included
+REQUESTS_ADAPTER = TypeAdapter(List[schemas.RepairRequestCreate])
+
+ValidRow = Tuple[int, schemas.RepairRequestCreate, uuid.UUID, List[uuid.UUID]]
+
+def format_validation_errors(errors: List[Dict]) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in errors)
+
+def check_catalog(request: schemas.RepairRequestCreate, catalog: Catalog) -> Tuple[uuid.UUID, List[uuid.UUID]]:
+    """Brand and repair type ids of a schema-valid request, checked against
+    the cached catalog; raises ValueError"""
+    try:
+        brand_uuid = uuid.UUID(request.watch_data.brand_id)
+    except ValueError:
+        raise ValueError("Invalid watch brand")
+    if brand_uuid not in catalog.watch_brands:
+        raise ValueError("Invalid watch brand")
+
+    try:
+        WatchType(request.watch_data.type)
+    except ValueError:
+        raise ValueError("Invalid watch type")
+
+    try:
+        repair_type_uuids = [uuid.UUID(rt_id) for rt_id in request.repair_data.repair_type_ids]
+    except ValueError:
+        raise ValueError("Invalid repair types")
+    if (not repair_type_uuids or len(set(repair_type_uuids)) != len(repair_type_uuids)
+            or not all(rt_id in catalog.repair_types for rt_id in repair_type_uuids)):
+        raise ValueError("Invalid repair types")
+
+    return brand_uuid, repair_type_uuids
+
+def validate_batch(batch: List[Tuple[int, Dict]], catalog: Catalog, result: ImportResult) -> List[ValidRow]:
+    """Valid rows of `batch`; the others are reported in row order"""
+    errors = {}
+    candidates = []
+    for row_number, body in batch:
+        if "_error" in body:
+            errors[row_number] = body["_error"]
+        else:
+            candidates.append((row_number, body))
+
+    try:
+        requests = REQUESTS_ADAPTER.validate_python([body for _, body in candidates])
+    except ValidationError as e:
+        # A list is all or nothing: collect the errors by position, then
+        # validate the remaining rows again in one call
+        errors_by_index = defaultdict(list)
+        for err in e.errors():
+            index, *loc = err["loc"]
+            errors_by_index[index].append({**err, "loc": loc})
+        for index, row_errors in errors_by_index.items():
+            errors[candidates[index][0]] = format_validation_errors(row_errors)
+        candidates = [candidate for index, candidate in enumerate(candidates) if index not in errors_by_index]
+        requests = REQUESTS_ADAPTER.validate_python([body for _, body in candidates])
+
+    valid = []
+    for (row_number, _), request in zip(candidates, requests):
+        try:
+            valid.append((row_number, request, *check_catalog(request, catalog)))
+        except ValueError as e:
+            errors[row_number] = str(e)
+
+    result.errors.extend({"row": row_number, "error": errors[row_number]} for row_number in sorted(errors))
+    return valid
+
+def database_error_message(error: SQLAlchemyError) -> str:
+    """First line of the driver's message, e.g. the violated constraint"""
+    message = str(getattr(error, "orig", None) or error).strip()
+    return f"Database error: {message.splitlines()[0] if message else error.__class__.__name__}"
+
+async def upsert_customers(db: AsyncSession, requests: List[schemas.RepairRequestCreate]) -> Dict[str, uuid.UUID]:
+    """Create missing customer accounts in one statement; return ids by CPF"""
+    customers = {}
+    for request in requests:
+        if request.create_customer_account:
+            customers.setdefault(request.customer_data.cpf, request.customer_data)
+    if not customers:
+        return {}
+
+    now = datetime.utcnow()
+    await db.execute(
+        dialect_insert(db, Customer).on_conflict_do_nothing(index_elements=[Customer.cpf]),
+        [
+            {
+                "id": uuid.uuid4(),
+                "name": data.name,
+                "cpf": cpf,
+                "cpf_key": cpf_key(cpf),
+                "phone": data.phone,
+                "address": data.address,
+                "email": data.email,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for cpf, data in customers.items()
+        ],
+    )
+    rows = await db.execute(select(Customer.cpf, Customer.id).where(Customer.cpf.in_(list(customers))))
+    return {cpf: customer_id for cpf, customer_id in rows}
+
+async def write_rows(db: AsyncSession, valid: List[ValidRow]) -> None:
+    """Insert the repairs of `valid` with their customers, aggregates and
+    status events; does not commit"""
+    customer_ids = await upsert_customers(db, [request for _, request, _, _ in valid])
+    reference_numbers = await allocate_reference_numbers(db, len(valid))
+
+    now = datetime.utcnow()
+    repair_rows = []
+    type_rows = []
+    stats_delta = StatsDelta()
+    history = StatusHistory()
+    for (row_number, request, brand_uuid, repair_type_uuids), reference_number in zip(valid, reference_numbers):
+        repair_id = uuid.uuid4()
+        repair_rows.append({
+            "id": repair_id,
+            "reference_number": reference_number,
+            "customer_id": customer_ids.get(request.customer_data.cpf) if request.create_customer_account else None,
+            "customer_name": request.customer_data.name,
+            "customer_cpf": request.customer_data.cpf,
+            "customer_phone": request.customer_data.phone,
+            "customer_address": request.customer_data.address,
+            "customer_email": request.customer_data.email,
+            "watch_brand_id": brand_uuid,
+            "watch_type": WatchType(request.watch_data.type),
+            "problem_description": request.repair_data.problem_description,
+            "status": RepairStatus.PENDING,
+            "created_at": now,
+            "updated_at": now,
+        })
+        type_rows.extend({"repair_request_id": repair_id, "repair_type_id": rt_id} for rt_id in repair_type_uuids)
+        stats_delta.created(RepairFacts(brand_uuid, WatchType(request.watch_data.type), repair_type_uuids))
+        history.created(repair_id, brand_uuid, now)
+
+    # executemany: batched into multi-row INSERT ... VALUES by SQLAlchemy
+    await db.execute(insert(RepairRequest), repair_rows)
+    await db.execute(insert(repair_request_types), type_rows)
+    await stats_delta.apply(db)
+    await history.apply(db)
+
+async def write_isolating_errors(db: AsyncSession, valid: List[ValidRow], result: ImportResult) -> int:
+    """Write `valid` in a SAVEPOINT; when the database rejects it, retry each
+    half on its own until the failing rows are isolated. Returns the number
+    of rows written."""
+    try:
+        async with db.begin_nested():
+            await write_rows(db, valid)
+        return len(valid)
+    except SQLAlchemyError as e:
+        if len(valid) == 1:
+            result.errors.append({"row": valid[0][0], "error": database_error_message(e)})
+            return 0
+    middle = len(valid) // 2
+    return (await write_isolating_errors(db, valid[:middle], result)
+            + await write_isolating_errors(db, valid[middle:], result))
+
+async def import_batch(db: AsyncSession, batch: List[Tuple[int, Dict]], catalog: Catalog, result: ImportResult) -> None:
+    valid = validate_batch(batch, catalog, result)
+    if not valid:
+        return
+
+    reported = len(result.errors)
+    try:
+        created = await write_isolating_errors(db, valid, result)
+        await db.commit()
+    except SQLAlchemyError as e:
+        # The savepoints cover the rows; this is the connection or the commit,
+        # and none of the batch was written
+        await db.rollback()
+        del result.errors[reported:]
+        message = database_error_message(e)
+        result.errors.extend({"row": row_number, "error": message} for row_number, *_ in valid)
+        return
+
+    result.created += created
+
+async def import_repair_requests(
+    db: AsyncSession,
+    stream: IO[bytes],
+    file_format: str,
+    catalog: Catalog,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ImportResult:
+    """Import every row of `stream`, committing one batch at a time"""
+    result = ImportResult()
+    for batch in batched(iter_rows(stream, file_format), batch_size):
+        result.total_rows += len(batch)
+        await import_batch(db, batch, catalog, result)
+    return result
+
+async def import_file(path: str, file_format: str, batch_size: int) -> ImportResult:
+    async with AsyncSessionLocal() as db:
+        catalog = await CatalogCache(ttl=0).get(db)
+        with open(path, "rb") as stream:
+            return await import_repair_requests(db, stream, file_format, catalog, batch_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import repair requests from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print(f"🔄 Importing {args.path}...")
+    result = asyncio.run(import_file(args.path, args.format or detect_format(args.path), args.batch_size))
+    for error in result.errors:
+        print(f"❌ Row {error['row']}: {error['error']}")
+    print(f"✅ {result.created} of {result.total_rows} repair requests imported, {result.failed} failed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# bulk_update.py
+"""
+Batch status, price and estimated completion changes from the admin
+Every item is validated (id, status value, status transition) against one
+SELECT of the current rows; the valid ones are then written by a single
+UPDATE ... SET column = CASE WHEN id = ... END, one dashboard upsert and one
+status event INSERT, in one transaction. Invalid items are reported and
+skipped without aborting the rest.
+"""
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RepairRequest, RepairStatus, STATUS_TRANSITIONS
+from stats import StatsDelta, load_repair_facts_many
+from status_history import StatusHistory
+import schemas
+
+# Columns a batch item can change, by item field
+UPDATABLE_COLUMNS = ("status", "total_price", "estimated_completion")
+
+@dataclass(frozen=True)
+class UpdatedRepair:
+    id: uuid.UUID
+    reference_number: str
+    status_changed: bool
+
+@dataclass
+class BatchUpdateResult:
+    results: List[Optional[Dict]]
+    updated: List[UpdatedRepair] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for item in self.results if not item["success"])
+
+    def as_dict(self) -> Dict:
+        return {
+            "updated": len(self.updated),
+            "failed": self.failed,
+            "results": self.results,
+        }
+
+    def fail(self, index: int, repair_id: str, error: str) -> None:
+        self.results[index] = {"id": repair_id, "success": False, "status": None, "error": error}
+
+async def update_repair_requests(db: AsyncSession, items: List[schemas.RepairRequestBatchItem]) -> BatchUpdateResult:
+    """Apply `items` and commit; results are in request order"""
+    result = BatchUpdateResult(results=[None] * len(items))
+
+    parsed = {}
+    for index, item in enumerate(items):
+        try:
+            repair_id = uuid.UUID(item.id)
+        except ValueError:
+            result.fail(index, item.id, "Invalid repair ID format")
+            continue
+        if repair_id in parsed:
+            result.fail(index, item.id, "Repair request appears more than once in the batch")
+            continue
+        new_status = None
+        if item.status:
+            try:
+                new_status = RepairStatus(item.status.upper())
+            except ValueError:
+                result.fail(index, item.id, "Invalid status")
+                continue
+        parsed[repair_id] = (index, item, new_status)
+    if not parsed:
+        return result
+
+    # Locked on PostgreSQL so a concurrent edit cannot slip between the
+    # transition check and the UPDATE
+    current = {row.id: row for row in await db.execute(
+        select(
+            RepairRequest.id, RepairRequest.reference_number, RepairRequest.status, RepairRequest.total_price,
+            RepairRequest.watch_brand_id, RepairRequest.watch_type, RepairRequest.created_at,
+            RepairRequest.completed_at,
+        )
+        .where(RepairRequest.id.in_(list(parsed)))
+        .with_for_update()
+    )}
+
+    changes: Dict[str, Dict[uuid.UUID, object]] = {column: {} for column in UPDATABLE_COLUMNS}
+    valid = []
+    for repair_id, (index, item, new_status) in parsed.items():
+        row = current.get(repair_id)
+        if row is None:
+            result.fail(index, item.id, "Repair request not found")
+            continue
+        if new_status is not None and new_status != row.status and new_status not in STATUS_TRANSITIONS[row.status]:
+            result.fail(index, item.id, f"Cannot change status from {row.status.value} to {new_status.value}")
+            continue
+        if new_status is not None:
+            changes["status"][repair_id] = new_status
+        if item.total_price is not None:
+            changes["total_price"][repair_id] = item.total_price
+        if item.estimated_completion is not None:
+            changes["estimated_completion"][repair_id] = item.estimated_completion
+        result.results[index] = {"id": item.id, "success": True, "status": (new_status or row.status).value, "error": None}
+        valid.append(row)
+    if not valid:
+        await db.rollback()
+        return result
+
+    # Aggregates move only for repairs whose status or price really changes
+    moved = [
+        row for row in valid
+        if changes["status"].get(row.id, row.status) != row.status
+        or changes["total_price"].get(row.id, row.total_price) != row.total_price
+    ]
+    stats_delta = StatsDelta()
+    facts = await load_repair_facts_many(db, moved)
+    for row in moved:
+        stats_delta.changed(
+            facts[row.id],
+            row.status, row.total_price,
+            changes["status"].get(row.id, row.status), changes["total_price"].get(row.id, row.total_price),
+            created_at=row.created_at, completed_at=row.completed_at
+        )
+
+    values = {"updated_at": datetime.utcnow()}
+    for column_name, by_id in changes.items():
+        if by_id:
+            column = getattr(RepairRequest, column_name)
+            values[column_name] = case(
+                *((RepairRequest.id == repair_id, literal(value, column.type)) for repair_id, value in by_id.items()),
+                else_=column
+            )
+    first_completed = [
+        row.id for row in valid
+        if changes["status"].get(row.id) == RepairStatus.COMPLETED and row.completed_at is None
+    ]
+    if first_completed:
+        values["completed_at"] = case(
+            (RepairRequest.id.in_(first_completed), values["updated_at"]),
+            else_=RepairRequest.completed_at
+        )
+    await db.execute(
+        update(RepairRequest)
+        .where(RepairRequest.id.in_([row.id for row in valid]))
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+    await stats_delta.apply(db)
+    history = StatusHistory()
+    for row in valid:
+        history.changed(row.id, row.watch_brand_id, row.status, changes["status"].get(row.id, row.status), created_at=row.created_at)
+    await history.apply(db)
+    await db.commit()
+
+    result.updated = [
+        UpdatedRepair(row.id, row.reference_number, changes["status"].get(row.id, row.status) != row.status)
+        for row in valid
+    ]
+    return result
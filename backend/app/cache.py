@@ -0,0 +1,178 @@
+# cache.py
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Small in-process cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Drop one key, or everything when no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+class LRUCache(TTLCache):
+    """TTLCache bounded to `maxsize` entries, evicting the least recently used"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = super().get(key, default)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        super().set(key, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+# ===== READ-THROUGH CACHE BACKENDS =====
+
+class MemoryBackend:
+    """Per-process LRU; invalidations only reach the current worker"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize, ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set_many(self, values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            self._cache.set(key, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.invalidate(key)
+
+class RedisBackend:
+    """Shared backend for any Redis-protocol server; requires the optional
+    `redis` package. Values are stored as JSON with datetimes as ISO strings,
+    which is how they are rendered in responses anyway."""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "watchmaker:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("The redis package is required for a redis:// cache URL (pip install redis)") from e
+        self._client = redis.from_url(url)
+        self._errors = redis.RedisError
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set_many(self, values: Dict[str, Any]) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(self.prefix + key, json.dumps(value, default=_json_default), ex=max(1, int(self.ttl)))
+            await pipe.execute()
+
+    async def delete(self, *keys: str) -> None:
+        await self._client.delete(*(self.prefix + key for key in keys))
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+class ReadThroughCache:
+    """Cache-aside wrapper that counts hits and misses.
+
+    Backend failures are logged and treated as misses so the database stays
+    the source of truth when a shared cache is unavailable.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Any]:
+        """Return the cached value for `key`, or call `loader`.
+
+        `loader` returns a mapping of every key the loaded value should be
+        stored under (so one load can fill several lookup keys), or None
+        when there is nothing to cache.
+        """
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            logger.exception("Cache get failed for %s", key)
+            value = None
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        values = await loader()
+        if not values:
+            return None
+        try:
+            await self.backend.set_many(values)
+        except Exception:
+            self.errors += 1
+            logger.exception("Cache set failed for %s", key)
+        return values[key] if key in values else next(iter(values.values()))
+
+    async def set_many(self, values: Dict[str, Any]) -> None:
+        """Store freshly loaded values, e.g. right after the write that changed them"""
+        try:
+            await self.backend.set_many(values)
+        except Exception:
+            self.errors += 1
+            logger.exception("Cache set failed for %s", list(values))
+
+    async def invalidate(self, *keys: str) -> None:
+        try:
+            await self.backend.delete(*keys)
+        except Exception:
+            self.errors += 1
+            logger.exception("Cache delete failed for %s", keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+def create_backend(url: str, maxsize: int, ttl: float):
+    """'memory' (default) or a redis:// / rediss:// / unix:// URL"""
+    if not url or url == "memory":
+        return MemoryBackend(maxsize, ttl)
+    return RedisBackend(url, ttl)
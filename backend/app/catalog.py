@@ -0,0 +1,87 @@
+# catalog.py
+import asyncio
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import WatchBrand, RepairType
+import schemas
+
+@dataclass(frozen=True)
+class Catalog:
+    """Snapshot of the active watch brands and repair types"""
+    version: int
+    form_data: schemas.FormData
+    form_data_json: bytes
+    etag: str
+    watch_brands: Dict[uuid.UUID, schemas.WatchBrand]
+    repair_types: Dict[uuid.UUID, schemas.RepairType]
+
+class CatalogCache:
+    """In-process cache of the public form catalog.
+
+    The snapshot is reloaded after `ttl` seconds or on the next read after
+    invalidate(), which the admin brand/repair-type endpoints call on every
+    write. Other worker processes pick up changes when their TTL expires.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._catalog: Optional[Catalog] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db: AsyncSession) -> Catalog:
+        catalog = self._catalog
+        if catalog is not None and catalog.version == self.version and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return catalog
+
+        # Only one request reloads; the rest wait and reuse its snapshot
+        async with self._lock:
+            catalog = self._catalog
+            if catalog is None or catalog.version != self.version or time.monotonic() >= self._expires_at:
+                self.misses += 1
+                catalog = await self._load(db)
+                self._catalog = catalog
+                self._expires_at = time.monotonic() + self.ttl
+            else:
+                self.hits += 1
+            return catalog
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "version": self.version,
+        }
+
+    async def _load(self, db: AsyncSession) -> Catalog:
+        version = self.version
+        watch_brands = (await db.scalars(select(WatchBrand).where(WatchBrand.is_active == True))).all()
+        repair_types = (await db.scalars(select(RepairType).where(RepairType.is_active == True))).all()
+
+        form_data = schemas.FormData(watch_brands=watch_brands, repair_types=repair_types)
+        form_data_json = form_data.model_dump_json().encode()
+        return Catalog(
+            version=version,
+            form_data=form_data,
+            form_data_json=form_data_json,
+            # Content-based so every worker serving the same data agrees on it
+            etag=f'"{hashlib.sha1(form_data_json).hexdigest()}"',
+            watch_brands={brand.id: brand for brand in form_data.watch_brands},
+            repair_types={repair_type.id: repair_type for repair_type in form_data.repair_types},
+        )
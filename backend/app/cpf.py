@@ -0,0 +1,63 @@
+# cpf.py
+"""
+CPF (Brazilian taxpayer id) parsing, validation and formatting
+Customers are matched on the canonical 11-digit key (Customer.cpf_key), so
+"529.982.247-25", "52998224725" and " 529 982 247 25 " all find the same row.
+"""
+import re
+from operator import mul
+from typing import Optional
+
+# Check digit weights: 10..2 over the first nine digits, 11..2 over the first ten
+FIRST_WEIGHTS = tuple(range(10, 1, -1))
+SECOND_WEIGHTS = tuple(range(11, 1, -1))
+# Weighted sums run over ASCII codes; subtracting 48 * sum(weights) once
+# replaces converting every digit with int()
+FIRST_OFFSET = 48 * sum(FIRST_WEIGHTS)
+SECOND_OFFSET = 48 * sum(SECOND_WEIGHTS)
+
+_NON_DIGITS = re.compile(r"[^0-9]")
+
+def cpf_key(value: str) -> Optional[str]:
+    """Canonical 11-digit key for a CPF in any punctuation, or None when it
+    does not have exactly 11 digits. Does not check the verification digits."""
+    # Fast paths for the two shapes nearly every input takes
+    if len(value) == 14 and value[3] == "." and value[7] == "." and value[11] == "-":
+        digits = value[:3] + value[4:7] + value[8:11] + value[12:]
+    elif len(value) == 11:
+        digits = value
+    else:
+        digits = _NON_DIGITS.sub("", value)
+    if len(digits) != 11 or not (digits.isascii() and digits.isdigit()):
+        return None
+    return digits
+
+def check_digit(digits: str, weights) -> int:
+    """Verification digit for the leading len(weights) digits"""
+    remainder = sum(map(mul, digits.encode(), weights)) - 48 * sum(weights)
+    remainder %= 11
+    return 0 if remainder < 2 else 11 - remainder
+
+def is_valid_key(key: str) -> bool:
+    """True when an 11-digit key has correct verification digits"""
+    if key == key[0] * 11:
+        return False
+    codes = key.encode()
+    first = (sum(map(mul, codes, FIRST_WEIGHTS)) - FIRST_OFFSET) % 11
+    if codes[9] - 48 != (0 if first < 2 else 11 - first):
+        return False
+    second = (sum(map(mul, codes, SECOND_WEIGHTS)) - SECOND_OFFSET) % 11
+    return codes[10] - 48 == (0 if second < 2 else 11 - second)
+
+def normalize(value: str) -> str:
+    """Canonical key of a valid CPF; raises ValueError otherwise"""
+    key = cpf_key(value)
+    if key is None:
+        raise ValueError('CPF must have 11 digits')
+    if not is_valid_key(key):
+        raise ValueError('Invalid CPF')
+    return key
+
+def format_key(key: str) -> str:
+    """12345678901 -> 123.456.789-01"""
+    return f"{key[:3]}.{key[3:6]}.{key[6:9]}-{key[9:]}"
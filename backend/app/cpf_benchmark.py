@@ -0,0 +1,85 @@
+# cpf_benchmark.py
+"""
+CPF validation micro-benchmark
+Times cpf.normalize against the previous regex-based validator over random
+valid, invalid and differently punctuated CPFs. That both agree on every
+input is checked by tests/test_cpf.py.
+
+Usage:
+    python cpf_benchmark.py
+    python cpf_benchmark.py --count 200000 --repeat 5
+"""
+import argparse
+import random
+import re
+import timeit
+
+from cpf import FIRST_WEIGHTS, SECOND_WEIGHTS, check_digit, format_key, normalize
+
+def legacy_validate(v):
+    """The validator schemas.CustomerData used before cpf.py, for comparison"""
+    cpf = re.sub(r'\D', '', v)
+    if len(cpf) != 11:
+        raise ValueError('CPF must have 11 digits')
+    if cpf == cpf[0] * 11:
+        raise ValueError('Invalid CPF')
+
+    def calculate_digit(cpf_partial):
+        sum_val = sum(int(digit) * weight for digit, weight in zip(cpf_partial, range(len(cpf_partial) + 1, 1, -1)))
+        remainder = sum_val % 11
+        return 0 if remainder < 2 else 11 - remainder
+
+    if int(cpf[9]) != calculate_digit(cpf[:9]):
+        raise ValueError('Invalid CPF')
+    if int(cpf[10]) != calculate_digit(cpf[:10]):
+        raise ValueError('Invalid CPF')
+    return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+
+def random_valid_key(rng):
+    base = "".join(rng.choice("0123456789") for _ in range(9))
+    first = check_digit(base, FIRST_WEIGHTS)
+    second = check_digit(base + str(first), SECOND_WEIGHTS)
+    return f"{base}{first}{second}"
+
+def random_input(rng):
+    """A CPF in one of the shapes seen in imports, a fifth of them corrupted"""
+    key = random_valid_key(rng)
+    roll = rng.random()
+    if roll < 0.1:
+        key = key[:rng.randrange(11)] + rng.choice("0123456789") + key[rng.randrange(11):]
+    elif roll < 0.2:
+        position = rng.randrange(11)
+        key = key[:position] + str((int(key[position]) + 1) % 10) + key[position + 1:]
+    shape = rng.random()
+    if shape < 0.5:
+        return format_key(key) if len(key) == 11 else key
+    if shape < 0.8:
+        return key
+    return " ".join(key[i:i + 3] for i in range(0, len(key), 3))
+
+def run_all(validate, inputs):
+    for value in inputs:
+        try:
+            validate(value)
+        except ValueError:
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description="CPF validation micro-benchmark")
+    parser.add_argument("--count", type=int, default=100000, help="CPFs per run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    inputs = [random_input(rng) for _ in range(args.count)]
+
+    results = {}
+    for name, validate in (("legacy", legacy_validate), ("cpf.py", lambda v: format_key(normalize(v)))):
+        best = min(timeit.repeat(lambda: run_all(validate, inputs), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"📊 {name}: {best * 1000:.1f}ms for {len(inputs)} CPFs, {len(inputs) / best:,.0f} CPFs/s")
+    print(f"🚀 Speedup: {results['legacy'] / results['cpf.py']:.2f}x")
+
+if __name__ == "__main__":
+    main()
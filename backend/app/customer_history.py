@@ -0,0 +1,112 @@
+# customer_history.py
+"""
+Repair history of a customer account, newest first
+Pages are keyset seeks on (created_at, id) over
+ix_repair_requests_customer_id_created_at, which on PostgreSQL also carries
+every listed column, so a page of a corporate account with thousands of
+repairs is an index-only range read with the brand joined by primary key.
+Repair type names for the whole page come from one extra SELECT ... IN.
+
+Archived repairs (archive.py) are read from repair_archive with the same
+seek and merged in, so the history does not end at ARCHIVE_AFTER_DAYS.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import archive
+from models import RepairArchive, RepairRequest, RepairType, WatchBrand, repair_request_types
+from utils import encode_cursor
+
+async def load_repair_type_names(db: AsyncSession, repair_ids: List[uuid.UUID]) -> Dict[uuid.UUID, List[str]]:
+    names = defaultdict(list)
+    if repair_ids:
+        rows = await db.execute(
+            select(repair_request_types.c.repair_request_id, RepairType.name)
+            .join(RepairType, RepairType.id == repair_request_types.c.repair_type_id)
+            .where(repair_request_types.c.repair_request_id.in_(repair_ids))
+            .order_by(RepairType.name)
+        )
+        for repair_id, name in rows:
+            names[repair_id].append(name)
+    return names
+
+async def load_hot_page(db: AsyncSession, customer_id: uuid.UUID, after: Optional[Tuple[datetime, uuid.UUID]], limit: int) -> List[Dict]:
+    query = (
+        select(
+            RepairRequest.id, RepairRequest.reference_number, RepairRequest.status, RepairRequest.watch_type,
+            RepairRequest.total_price, RepairRequest.estimated_completion, RepairRequest.created_at,
+            WatchBrand.name.label("watch_brand"),
+        )
+        .join(WatchBrand, WatchBrand.id == RepairRequest.watch_brand_id)
+        .where(RepairRequest.customer_id == customer_id)
+    )
+    if after:
+        query = query.where(tuple_(RepairRequest.created_at, RepairRequest.id) < after)
+    rows = (await db.execute(
+        query.order_by(RepairRequest.created_at.desc(), RepairRequest.id.desc()).limit(limit)
+    )).all()
+    repair_types = await load_repair_type_names(db, [row.id for row in rows])
+    return [
+        {
+            "id": row.id,
+            "reference_number": row.reference_number,
+            "status": row.status.value,
+            "watch_brand": row.watch_brand,
+            "watch_type": row.watch_type.value,
+            "repair_types": repair_types[row.id],
+            "total_price": row.total_price,
+            "estimated_completion": row.estimated_completion,
+            "created_at": row.created_at,
+            "archived": False,
+        }
+        for row in rows
+    ]
+
+async def load_archived_page(db: AsyncSession, customer_id: uuid.UUID, after: Optional[Tuple[datetime, uuid.UUID]], limit: int) -> List[Dict]:
+    query = select(RepairArchive.document).where(RepairArchive.customer_id == customer_id)
+    if after:
+        query = query.where(tuple_(RepairArchive.created_at, RepairArchive.id) < after)
+    documents = (await db.scalars(
+        query.order_by(RepairArchive.created_at.desc(), RepairArchive.id.desc()).limit(limit)
+    )).all()
+    items = []
+    for document in documents:
+        repair = archive.unpack(document)
+        items.append({
+            "id": uuid.UUID(repair["id"]),
+            "reference_number": repair["reference_number"],
+            "status": repair["status"],
+            "watch_brand": repair["watch_brand"],
+            "watch_type": repair["watch_type"],
+            "repair_types": sorted(rt["name"] for rt in repair["repair_types"]),
+            "total_price": repair["total_price"],
+            "estimated_completion": repair["estimated_completion"] and datetime.fromisoformat(repair["estimated_completion"]),
+            "created_at": datetime.fromisoformat(repair["created_at"]),
+            "archived": True,
+        })
+    return items
+
+async def customer_history(
+    db: AsyncSession,
+    customer_id: uuid.UUID,
+    limit: int,
+    after: Optional[Tuple[datetime, uuid.UUID]] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """One page of the customer's repairs and the cursor of the next one"""
+    # One extra row from each source tells whether another page exists
+    items = await load_hot_page(db, customer_id, after, limit + 1)
+    items += await load_archived_page(db, customer_id, after, limit + 1)
+    items.sort(key=lambda item: (item["created_at"], item["id"]), reverse=True)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+    for item in items:
+        item["id"] = str(item["id"])
+    return items, next_cursor
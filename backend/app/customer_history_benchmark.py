@@ -0,0 +1,119 @@
+# customer_history_benchmark.py
+"""
+Customer history benchmark for corporate accounts
+Seeds one customer account holding --repairs repair requests into
+DATABASE_URL (use a benchmark database, as with seed_benchmark_data.py),
+then compares loading the whole history through the Customer.repair_requests
+relationship against paging it with customer_history.py: time and SQL
+statements for the first page and per page when walking the whole history
+by cursor.
+
+Usage:
+    python setup_database.py                       # brands and repair types
+    python customer_history_benchmark.py --repairs 5000
+    python customer_history_benchmark.py --customer-id <uuid> --page-size 50
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from cpf import cpf_key
+from customer_history import customer_history
+from database import AsyncSessionLocal, engine
+from models import Customer, RepairRequest
+from seed_benchmark_data import load_catalog, random_person, seed_repairs
+from utils import decode_cursor
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self.increment)
+
+    def increment(self, *args):
+        self.count += 1
+
+async def seed_corporate_customer(db, rng: random.Random, repairs: int, days: int) -> uuid.UUID:
+    person = random_person(rng)
+    customer = Customer(**person, cpf_key=cpf_key(person["cpf"]))
+    db.add(customer)
+    await db.commit()
+    await seed_repairs(db, rng, repairs, days, 2000, [(customer.id, person)], await load_catalog(db), account_share=1.0)
+    return customer.id
+
+async def timed(counter: StatementCounter, coroutine):
+    statements = counter.count
+    started = time.perf_counter()
+    result = await coroutine
+    return result, (time.perf_counter() - started) * 1000, counter.count - statements
+
+async def load_through_relationship(customer_id: uuid.UUID) -> int:
+    """Every repair with its brand and repair types, as the relationship would"""
+    async with AsyncSessionLocal() as db:
+        customer = (await db.scalars(
+            select(Customer)
+            .options(selectinload(Customer.repair_requests).options(
+                joinedload(RepairRequest.watch_brand), selectinload(RepairRequest.repair_types)
+            ))
+            .where(Customer.id == customer_id)
+        )).one()
+        return len(customer.repair_requests)
+
+async def load_page(customer_id: uuid.UUID, page_size: int, cursor=None):
+    async with AsyncSessionLocal() as db:
+        return await customer_history(db, customer_id, page_size, decode_cursor(cursor) if cursor else None)
+
+async def run(args) -> None:
+    counter = StatementCounter()
+    try:
+        customer_id = uuid.UUID(args.customer_id) if args.customer_id else None
+        if customer_id is None:
+            print(f"🔄 Seeding a customer account with {args.repairs:,} repairs...")
+            async with AsyncSessionLocal() as db:
+                customer_id = await seed_corporate_customer(db, random.Random(args.seed), args.repairs, args.days)
+            print(f"✅ Customer {customer_id}")
+
+        # Warm the pool and the database's page cache
+        await load_page(customer_id, args.page_size)
+
+        total, elapsed, statements = await timed(counter, load_through_relationship(customer_id))
+        print(f"📊 Customer.repair_requests: {total:,} repairs in {elapsed:.1f}ms, {statements} statements")
+
+        (items, cursor), elapsed, statements = await timed(counter, load_page(customer_id, args.page_size))
+        print(f"📊 First page of {len(items)}: {elapsed:.1f}ms, {statements} statements")
+
+        page_times = []
+        page_statements = []
+        walked = len(items)
+        while cursor:
+            (items, cursor), elapsed, statements = await timed(counter, load_page(customer_id, args.page_size, cursor))
+            page_times.append(elapsed)
+            page_statements.append(statements)
+            walked += len(items)
+        if page_times:
+            page_times.sort()
+            print(f"📊 Walked {walked:,} repairs in {len(page_times) + 1} pages: "
+                  f"avg {sum(page_times) / len(page_times):.1f}ms, "
+                  f"p95 {page_times[min(len(page_times) - 1, int(len(page_times) * 0.95))]:.1f}ms, "
+                  f"last {elapsed:.1f}ms, {max(page_statements)} statements per page")
+    finally:
+        await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer history benchmark for corporate accounts")
+    parser.add_argument("--repairs", type=int, default=5000, help="Repairs of the seeded customer")
+    parser.add_argument("--customer-id", help="Benchmark an existing customer instead of seeding one")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--days", type=int, default=1825, help="Spread creation dates over this many days")
+    # Differs per run by default: each run seeds a new customer, whose CPF must be unique
+    parser.add_argument("--seed", type=int, default=int(datetime.utcnow().timestamp()))
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# explain_queries.py
+"""
+Index usage check for the Watchmaker API queries
+Runs EXPLAIN for the query shapes issued by the endpoints in main.py against
+the database in DATABASE_URL and fails if any of them falls back to a full
+table scan. tests/test_query_plans.py runs the same check on a migrated
+SQLite database; use this script for PostgreSQL, after `alembic upgrade head`:
+
+    DATABASE_URL=postgresql://... python explain_queries.py
+"""
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, func, tuple_, and_, text
+
+from database import DATABASE_URL
+from models import Customer, WatchBrand, RepairType, RepairRequest, RepairArchive, RepairStatus, repair_request_types
+
+SAMPLE_ID = uuid.UUID("00000000-0000-4000-8000-000000000000")
+SAMPLE_TIME = datetime(2025, 1, 1)
+PAGE_ORDER = (RepairRequest.created_at.desc(), RepairRequest.id.desc())
+
+def endpoint_queries():
+    """(description, statement) pairs mirroring the endpoint queries"""
+    return [
+        ("status by id", select(RepairRequest).where(RepairRequest.id == SAMPLE_ID)),
+        ("status by reference", select(RepairRequest).where(RepairRequest.reference_number == "REP-2025-001")),
+        ("repair types for a page of repairs", select(RepairType.name, repair_request_types.c.repair_request_id)
+            .join(repair_request_types, RepairType.id == repair_request_types.c.repair_type_id)
+            .where(repair_request_types.c.repair_request_id.in_([SAMPLE_ID]))),
+        ("admin list first page", select(RepairRequest).order_by(*PAGE_ORDER).limit(21)),
+        ("admin list by status", select(RepairRequest)
+            .where(RepairRequest.status == RepairStatus.PENDING).order_by(*PAGE_ORDER).limit(21)),
+        ("admin list cursor seek", select(RepairRequest)
+            .where(tuple_(RepairRequest.created_at, RepairRequest.id) < (SAMPLE_TIME, SAMPLE_ID))
+            .order_by(*PAGE_ORDER).limit(21)),
+        ("admin list cursor seek by status", select(RepairRequest)
+            .where(and_(
+                RepairRequest.status == RepairStatus.PENDING,
+                tuple_(RepairRequest.created_at, RepairRequest.id) < (SAMPLE_TIME, SAMPLE_ID),
+            ))
+            .order_by(*PAGE_ORDER).limit(21)),
+        ("admin count by status", select(func.count()).where(RepairRequest.status == RepairStatus.PENDING)),
+        ("active watch brands", select(WatchBrand).where(WatchBrand.is_active == True)),
+        ("active repair types", select(RepairType).where(RepairType.is_active == True)),
+        ("customer by cpf", select(Customer).where(Customer.cpf_key == "52998224725")),
+        ("customer history page", select(RepairRequest.id, RepairRequest.status, RepairRequest.created_at)
+            .where(RepairRequest.customer_id == SAMPLE_ID).order_by(*PAGE_ORDER).limit(21)),
+        ("customer history cursor seek", select(RepairRequest.id, RepairRequest.status, RepairRequest.created_at)
+            .where(
+                RepairRequest.customer_id == SAMPLE_ID,
+                tuple_(RepairRequest.created_at, RepairRequest.id) < (SAMPLE_TIME, SAMPLE_ID),
+            )
+            .order_by(*PAGE_ORDER).limit(21)),
+        ("archived customer history seek", select(RepairArchive.document)
+            .where(
+                RepairArchive.customer_id == SAMPLE_ID,
+                tuple_(RepairArchive.created_at, RepairArchive.id) < (SAMPLE_TIME, SAMPLE_ID),
+            )
+            .order_by(RepairArchive.created_at.desc(), RepairArchive.id.desc()).limit(21)),
+        ("archived repairs for an export range", select(RepairArchive.document)
+            .where(RepairArchive.created_at >= SAMPLE_TIME, RepairArchive.created_at < SAMPLE_TIME + timedelta(days=31))
+            .order_by(RepairArchive.created_at, RepairArchive.id)),
+    ]
+
+def full_scans(connection, sql):
+    """Return the tables the plan reads with a full scan"""
+    if connection.dialect.name == "postgresql":
+        plan = connection.execute(text(f"EXPLAIN {sql}")).scalars().all()
+        return [match.group(1) for line in plan for match in [re.search(r"Seq Scan on (\w+)", line)] if match]
+    plan = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return [match.group(1) for row in plan for match in [re.fullmatch(r"SCAN (\w+)", row[-1])] if match]
+
+def main():
+    engine = create_engine(DATABASE_URL)
+    failures = 0
+
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Small or empty tables make sequential scans the cheapest plan;
+            # disable them so the check reports whether an index is usable
+            connection.execute(text("SET enable_seqscan = off"))
+
+        for description, statement in endpoint_queries():
+            sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+            scanned = full_scans(connection, sql)
+            if scanned:
+                failures += 1
+                print(f"❌ {description}: full scan on {', '.join(scanned)}")
+            else:
+                print(f"✅ {description}")
+
+    if failures:
+        print(f"❌ {failures} queries are not using an index")
+        sys.exit(1)
+    print("✅ All endpoint queries use an index")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# export.py
+"""
+Streaming CSV/NDJSON export of repair requests
+Rows come from repair_requests and, unless the filters rule them out, from
+repair_archive: archived repairs are unpacked and merged in by (created_at,
+id), so an export of an old period is complete after archive.py has run.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable, List, Optional
+
+from sqlalchemy import select, func, literal
+from sqlalchemy.sql import ColumnElement
+
+import archive
+from database import AsyncSessionLocal
+from models import RepairArchive, RepairRequest, WatchBrand, RepairType, repair_request_types
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_COLUMNS = [
+    "id", "reference_number", "status", "customer_name", "customer_cpf",
+    "customer_phone", "customer_email", "watch_brand", "watch_type",
+    "repair_types", "total_price", "estimated_completion", "created_at", "updated_at",
+]
+REPAIR_TYPE_SEPARATOR = "; "
+YIELD_PER = 1000
+ID_INDEX = EXPORT_COLUMNS.index("id")
+CREATED_AT_INDEX = EXPORT_COLUMNS.index("created_at")
+
+def repair_type_names(dialect_name: str):
+    """Correlated subquery joining a repair's type names into one string"""
+    if dialect_name == "postgresql":
+        names = func.string_agg(RepairType.name, literal(REPAIR_TYPE_SEPARATOR))
+    else:
+        names = func.group_concat(RepairType.name, REPAIR_TYPE_SEPARATOR)
+    return (
+        select(names)
+        .select_from(repair_request_types)
+        .join(RepairType, RepairType.id == repair_request_types.c.repair_type_id)
+        .where(repair_request_types.c.repair_request_id == RepairRequest.id)
+        .scalar_subquery()
+    )
+
+def export_query(filters: List[ColumnElement], dialect_name: str):
+    """Flat projection of repairs with brand and repair-type names, one row per repair"""
+    return (
+        select(
+            RepairRequest.id,
+            RepairRequest.reference_number,
+            RepairRequest.status,
+            RepairRequest.customer_name,
+            RepairRequest.customer_cpf,
+            RepairRequest.customer_phone,
+            RepairRequest.customer_email,
+            WatchBrand.name.label("watch_brand"),
+            RepairRequest.watch_type,
+            repair_type_names(dialect_name).label("repair_types"),
+            RepairRequest.total_price,
+            RepairRequest.estimated_completion,
+            RepairRequest.created_at,
+            RepairRequest.updated_at,
+        )
+        .join(WatchBrand, WatchBrand.id == RepairRequest.watch_brand_id)
+        .where(*filters)
+        .order_by(RepairRequest.created_at, RepairRequest.id)
+    )
+
+def export_value(value):
+    if value is None:
+        return None
+    if hasattr(value, "value"):  # enums
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value if isinstance(value, str) else str(value)
+
+def archived_export_row(document: bytes) -> List:
+    """Export row of an archived repair, in EXPORT_COLUMNS order"""
+    repair = archive.unpack(document)
+    repair["repair_types"] = REPAIR_TYPE_SEPARATOR.join(rt["name"] for rt in repair["repair_types"])
+    return [repair[column] for column in EXPORT_COLUMNS]
+
+async def merge_ordered(first: AsyncIterator[List], second: AsyncIterator[List]) -> AsyncIterator[List]:
+    """Merge two row streams that are each ordered by (created_at, id).
+    Exported datetimes are ISO strings and ids canonical UUID strings, which
+    compare in the same order as the database sorted them."""
+    def key(row):
+        return row[CREATED_AT_INDEX], row[ID_INDEX]
+
+    left, right = await anext(first, None), await anext(second, None)
+    while left is not None or right is not None:
+        if right is None or (left is not None and key(left) <= key(right)):
+            yield left
+            left = await anext(first, None)
+        else:
+            yield right
+            right = await anext(second, None)
+
+async def rows_of(partitions: AsyncIterator[Iterable]) -> AsyncIterator[List]:
+    async for partition in partitions:
+        for row in partition:
+            yield row
+
+async def stream_rows(filters: List[ColumnElement], archive_filters: Optional[List[ColumnElement]] = None) -> AsyncIterator[List]:
+    """Yield partitions of exported rows through server-side cursors.
+
+    Opens its own session because the response body is produced after the
+    endpoint (and its request-scoped session) has returned. With
+    `archive_filters` (None when they match no archived repair) the archive
+    is streamed alongside and merged in.
+    """
+    async with AsyncSessionLocal() as db:
+        statement = export_query(filters, db.bind.dialect.name).execution_options(yield_per=YIELD_PER)
+        result = await db.stream(statement)
+
+        async def hot_partitions():
+            async for partition in result.partitions():
+                yield [[export_value(value) for value in row] for row in partition]
+
+        if archive_filters is None:
+            async for partition in hot_partitions():
+                yield partition
+            return
+
+        archived = await db.stream_scalars(
+            select(RepairArchive.document)
+            .where(*archive_filters)
+            .order_by(RepairArchive.created_at, RepairArchive.id)
+            .execution_options(yield_per=YIELD_PER)
+        )
+
+        async def archived_partitions():
+            async for partition in archived.partitions():
+                yield [archived_export_row(document) for document in partition]
+
+        partition = []
+        async for row in merge_ordered(rows_of(hot_partitions()), rows_of(archived_partitions())):
+            partition.append(row)
+            if len(partition) >= YIELD_PER:
+                yield partition
+                partition = []
+        if partition:
+            yield partition
+
+async def stream_csv(filters: List[ColumnElement], archive_filters: Optional[List[ColumnElement]] = None) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in stream_rows(filters, archive_filters):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+async def stream_ndjson(filters: List[ColumnElement], archive_filters: Optional[List[ColumnElement]] = None) -> AsyncIterator[str]:
+    async for rows in stream_rows(filters, archive_filters):
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+def stream_export(
+    file_format: str,
+    filters: List[ColumnElement],
+    archive_filters: Optional[List[ColumnElement]] = None,
+) -> AsyncIterator[str]:
+    if file_format == "csv":
+        return stream_csv(filters, archive_filters)
+    return stream_ndjson(filters, archive_filters)
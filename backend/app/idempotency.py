@@ -0,0 +1,89 @@
+# idempotency.py
+"""
+Idempotency-Key support for repair submissions
+A client that retries POST /api/repair-requests with the same Idempotency-Key
+header gets the stored response of the first attempt instead of a duplicate
+repair. Keys live in idempotency_keys for at least IDEMPOTENCY_KEY_TTL
+seconds; KeyCleaner purges older rows in the background.
+
+A submission with a key costs one primary key lookup up front plus the insert
+of its row, in the same transaction as the repair. Two attempts racing with
+the same key both miss the lookup; PostgreSQL makes the second insert wait on
+the unique index until the first commits, and the resulting IntegrityError
+rolls the duplicate back so it can answer with the stored response.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from decouple import config
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import IdempotencyKey
+
+logger = logging.getLogger("watchmaker.idempotency")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+IDEMPOTENCY_CLEANUP_INTERVAL = config('IDEMPOTENCY_CLEANUP_INTERVAL', default=3600, cast=float)
+
+def fingerprint(body: BaseModel) -> str:
+    """Hash of the validated request body; a key reused for a different
+    submission is rejected rather than answered with someone else's repair"""
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+async def lookup(db: AsyncSession, key: str) -> Optional[IdempotencyKey]:
+    return await db.get(IdempotencyKey, key)
+
+def remember(db: AsyncSession, key: str, request_hash: str, response_json: str) -> None:
+    """Store the response; written when the submission's transaction commits"""
+    db.add(IdempotencyKey(key=key, request_hash=request_hash, response=response_json))
+
+def replay(record: IdempotencyKey, request_hash: str) -> Response:
+    if record.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+    return Response(content=record.response, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
+async def purge_expired(db: AsyncSession, ttl: float = IDEMPOTENCY_KEY_TTL) -> int:
+    """Delete keys older than `ttl` seconds (an index range scan on created_at)"""
+    result = await db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - timedelta(seconds=ttl))
+    )
+    await db.commit()
+    return result.rowcount
+
+class KeyCleaner:
+    """Runs purge_expired every `interval` seconds while the app is up. Each
+    worker runs its own; the deletes are idempotent and cheap when empty."""
+
+    def __init__(self, session_factory, interval: float = IDEMPOTENCY_CLEANUP_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    purged = await purge_expired(db)
+                if purged:
+                    logger.info("Purged %d expired idempotency keys", purged)
+            except Exception:
+                logger.exception("Idempotency key cleanup failed")
+            await asyncio.sleep(self.interval)
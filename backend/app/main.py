@@ -1,18 +1,139 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, UploadFile, WebSocket, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload, raiseload
+from sqlalchemy import select, insert, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from decouple import config
 from typing import List, Optional
+import asyncio
+import json
+import logging
+import os
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from database import get_db
-from models import Customer, WatchBrand, RepairType, RepairRequest, WatchType, RepairStatus
+from database import DATABASE_URL, AsyncSessionLocal, engine, get_db, pool_status, warm_pool
+from models import Base, Customer, WatchBrand, RepairType, RepairRequest, RepairArchive, WatchType, RepairStatus, repair_request_types
 import schemas
-from utils import generate_reference_number, format_cpf_for_display
+from utils import encode_cursor, decode_cursor
+from cpf import cpf_key
+from references import next_reference_number
+from cache import TTLCache, ReadThroughCache, create_backend
+from catalog import CatalogCache
+from pubsub import ADMIN_FEED, Event, create_broker
+import metrics
+import profiling
+from prometheus_client import CONTENT_TYPE_LATEST
+import bulk_import
+import bulk_update
+import archive
+import idempotency
+import export
+import search
+import customer_history
+from replicas import ReadYourWritesMiddleware, get_read_db, replica_router
+from stats import RepairFacts, StatsDelta, load_repair_facts, dashboard_stats
+from status_history import StatusHistory
+import status_history
 
-app = FastAPI(title="Watchmaker Repair Service API", version="1.0.0")
+startup_logger = logging.getLogger("watchmaker.startup")
+
+# Endpoints declare response models and return plain dicts: FastAPI then
+# validates and serializes them in pydantic-core instead of jsonable_encoder,
+# and orjson renders the result
+app = FastAPI(title="Watchmaker Repair Service API", version="1.0.0", default_response_class=ORJSONResponse)
+# Lets a profiled request time the endpoint function apart from serialization
+app.router.route_class = profiling.ProfiledRoute
+
+# Admin list totals per status filter; counting repair_requests on every page
+# is a full scan, so totals are allowed to lag writes by up to this many seconds
+repair_count_cache = TTLCache(ttl=config('REPAIR_COUNT_CACHE_TTL', default=30, cast=float))
+
+# Active brands/repair types for the public form and submission validation;
+# admin writes invalidate it, the TTL bounds staleness across workers
+catalog_cache = CatalogCache(ttl=config('CATALOG_CACHE_TTL', default=300, cast=float))
+
+# Public status payloads keyed by repair id and reference number. With the
+# default in-process backend, update_repair_request only invalidates the
+# local worker, so keep the TTL short; a redis:// URL shares entries and
+# invalidations across workers. Brand/repair-type renames show up after the TTL.
+status_cache = ReadThroughCache(create_backend(
+    config('STATUS_CACHE_URL', default='memory'),
+    maxsize=config('STATUS_CACHE_SIZE', default=10000, cast=int),
+    ttl=config('STATUS_CACHE_TTL', default=30, cast=float)
+))
+
+# Status change fan-out for the SSE/WebSocket subscriptions. "memory" only
+# reaches clients connected to this worker; "postgresql" relays through
+# LISTEN/NOTIFY so an update on any worker reaches every subscriber.
+broker = create_broker(
+    config('PUBSUB_BACKEND', default='memory'),
+    DATABASE_URL,
+    queue_size=config('PUBSUB_QUEUE_SIZE', default=100, cast=int)
+)
+# Idle SSE streams get a comment line this often so proxies keep them open
+EVENT_KEEPALIVE_SECONDS = config('EVENT_KEEPALIVE_SECONDS', default=15, cast=float)
+
+# Purges expired Idempotency-Key responses in the background
+idempotency_cleaner = idempotency.KeyCleaner(AsyncSessionLocal)
+
+@app.on_event("startup")
+async def warm_up():
+    """Fill the connection pool and load the catalog before this worker
+    starts accepting connections, so its first requests are not cold"""
+    started = time.perf_counter()
+    connections = await warm_pool()
+    async with AsyncSessionLocal() as db:
+        await catalog_cache.get(db)
+    # run.py records when it was launched, for cold-start timing
+    launched_at = os.environ.get("WATCHMAKER_LAUNCHED_AT")
+    startup_logger.info(
+        "Worker %d warmed up in %.0fms (%d pooled connections)%s",
+        os.getpid(), (time.perf_counter() - started) * 1000, connections,
+        f", ready {time.time() - float(launched_at):.2f}s after launch" if launched_at else ""
+    )
+
+@app.on_event("startup")
+async def start_replica_router():
+    await replica_router.start()
+
+@app.on_event("startup")
+async def start_broker():
+    await broker.start()
+
+@app.on_event("startup")
+async def start_idempotency_cleaner():
+    idempotency_cleaner.start()
+
+@app.on_event("shutdown")
+async def stop_broker():
+    await broker.stop()
+
+@app.on_event("shutdown")
+async def stop_idempotency_cleaner():
+    await idempotency_cleaner.stop()
+
+@app.on_event("shutdown")
+async def close_pool():
+    # Runs after in-flight requests have drained
+    await replica_router.stop()
+    await engine.dispose()
+
+metrics.instrument_engine(engine)
+profiling.instrument_engine(engine, Base)
+for replica in replica_router.replicas:
+    metrics.instrument_engine(replica.engine)
+    profiling.instrument_engine(replica.engine)
+metrics.stats_collector.register("status_cache", status_cache.stats)
+metrics.stats_collector.register("catalog_cache", catalog_cache.stats)
+metrics.stats_collector.register("db_pool", pool_status)
+metrics.stats_collector.register("events", broker.stats)
+metrics.stats_collector.register("db_replicas", replica_router.stats)
 
 # CORS middleware
 app.add_middleware(
@@ -23,32 +144,150 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Keeps clients that just wrote on the primary; only active with replicas
+app.add_middleware(ReadYourWritesMiddleware)
+# Outside CORS so request timings include it
+app.add_middleware(metrics.MetricsMiddleware)
+# Off unless PROFILING_ENABLED or PROFILE_SAMPLE_RATE is set; see profiling.py
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Eager-load everything the repair responses read: the brand joins into the
+# main query and repair types come in one extra SELECT ... IN for the whole
+# page. raiseload makes any other relationship access fail loudly instead of
+# silently issuing one query per row.
+REPAIR_LOAD_OPTIONS = (
+    joinedload(RepairRequest.watch_brand),
+    selectinload(RepairRequest.repair_types),
+    raiseload("*"),
+)
+
+def repair_status_response(repair: RepairRequest) -> dict:
+    """Public status payload shared by the ID and reference lookups"""
+    return {
+        "id": str(repair.id),
+        "reference_number": repair.reference_number,
+        "status": repair.status.value,
+        "estimated_completion": repair.estimated_completion,
+        "customer_name": repair.customer_name,
+        "watch_brand": repair.watch_brand.name,
+        "repair_types": [rt.name for rt in repair.repair_types],
+        "created_at": repair.created_at,
+        "notes": repair.internal_notes if repair.status != RepairStatus.PENDING else None
+    }
+
+def status_cache_keys(repair_id: uuid.UUID = None, reference_number: str = None) -> List[str]:
+    keys = []
+    if repair_id is not None:
+        keys.append(f"status:id:{repair_id}")
+    if reference_number is not None:
+        keys.append(f"status:ref:{reference_number}")
+    return keys
+
+async def load_repair_status(db: AsyncSession, repair_id: uuid.UUID = None, reference_number: str = None) -> Optional[dict]:
+    """Status cache loader: the payload stored under both its id and reference
+    keys. Repairs moved to the archive are looked up there on a miss."""
+    if repair_id is not None:
+        condition = RepairRequest.id == repair_id
+    else:
+        condition = RepairRequest.reference_number == reference_number
+    repair = (await db.scalars(
+        select(RepairRequest)
+        .options(*REPAIR_LOAD_OPTIONS)
+        .where(condition)
+    )).first()
+    if repair:
+        payload = repair_status_response(repair)
+    else:
+        payload = await archive.load_archived_status(db, repair_id, reference_number)
+        if payload is None:
+            return None
+    return {key: payload for key in status_cache_keys(uuid.UUID(payload["id"]), payload["reference_number"])}
+
+async def load_repair_statuses(db: AsyncSession, repair_ids: List[uuid.UUID]) -> List[dict]:
+    """Status payloads for several repairs in two queries"""
+    repairs = (await db.scalars(
+        select(RepairRequest)
+        .options(*REPAIR_LOAD_OPTIONS)
+        .where(RepairRequest.id.in_(repair_ids))
+    )).all()
+    return [repair_status_response(repair) for repair in repairs]
+
+async def repair_status_snapshot(key: str, lookup: dict) -> Optional[dict]:
+    """Cached status payload for streams, which outlive the request session;
+    `lookup` holds the repair_id or reference_number for load_repair_status"""
+    async def load():
+        async with AsyncSessionLocal() as db:
+            return await load_repair_status(db, **lookup)
+    return await status_cache.get_or_load(key, load)
+
+async def sse_events(keys: List[str], lookup: Optional[dict] = None):
+    """Event stream for `keys`. The current status is sent after
+    subscribing, so an update racing the connection is never missed."""
+    async with broker.subscribe(*keys) as subscription:
+        if lookup is not None:
+            snapshot = await repair_status_snapshot(keys[0], lookup)
+            if snapshot:
+                yield Event("status", json.dumps(jsonable_encoder(snapshot))).sse()
+        while True:
+            event = await subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+            yield event.sse() if event else ": keep-alive\n\n"
+
+def sse_response(keys: List[str], lookup: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(
+        sse_events(keys, lookup),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def websocket_events(websocket: WebSocket, keys: List[str], lookup: Optional[dict] = None):
+    """Forward events for `keys` to the socket until the client disconnects"""
+    await websocket.accept()
+    async with broker.subscribe(*keys) as subscription:
+        if lookup is not None:
+            snapshot = await repair_status_snapshot(keys[0], lookup)
+            if not snapshot:
+                await websocket.close(code=4404, reason="Repair request not found")
+                return
+            await websocket.send_text(Event("status", json.dumps(jsonable_encoder(snapshot))).json())
+
+        async def forward():
+            while True:
+                event = await subscription.get()
+                await websocket.send_text(event.json())
+
+        sender = asyncio.create_task(forward())
+        try:
+            # Client messages are ignored; reading is how a disconnect is noticed
+            while not sender.done():
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+
 # ===== CUSTOMER ENDPOINTS =====
 
 @app.get("/api/repair-form/data", response_model=schemas.FormData)
-async def get_form_data(db: Session = Depends(get_db)):
+async def get_form_data(request: Request, db: AsyncSession = Depends(get_db)):
     """Get watch brands and repair types for the form"""
-    watch_brands = db.query(WatchBrand).filter(WatchBrand.is_active == True).all()
-    repair_types = db.query(RepairType).filter(RepairType.is_active == True).all()
+    # The primary session only connects when the cache reloads; a reload from
+    # a lagging replica would keep a stale catalog for CATALOG_CACHE_TTL
+    catalog = await catalog_cache.get(db)
+    headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
     
-    return schemas.FormData(
-        watch_brands=watch_brands,
-        repair_types=repair_types
-    )
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or catalog.etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=catalog.form_data_json, media_type="application/json", headers=headers)
 
 @app.get("/api/customers/check", response_model=schemas.CustomerCheck)
-async def check_customer(cpf: str, db: Session = Depends(get_db)):
+async def check_customer(cpf: str, db: AsyncSession = Depends(get_read_db)):
     """Check if customer exists by CPF"""
-    # Clean CPF
-    cpf_digits = ''.join(filter(str.isdigit, cpf))
-    
-    # Look for customer with this CPF (try both formatted and unformatted)
-    customer = db.query(Customer).filter(
-        or_(
-            Customer.cpf == cpf,
-            Customer.cpf == format_cpf_for_display(cpf_digits)
-        )
-    ).first()
+    # Any punctuation matches: one index seek on the canonical digits
+    key = cpf_key(cpf)
+    customer = (await db.scalars(select(Customer).where(Customer.cpf_key == key))).first() if key else None
     
     if customer:
         return schemas.CustomerCheck(
@@ -64,31 +303,67 @@ async def check_customer(cpf: str, db: Session = Depends(get_db)):
     
     return schemas.CustomerCheck(exists=False)
 
-@app.post("/api/repair-requests")
-async def create_repair_request(request: schemas.RepairRequestCreate, db: Session = Depends(get_db)):
-    """Create a new repair request"""
-    
-    # Validate watch brand exists
-    watch_brand = db.query(WatchBrand).filter(
-        and_(WatchBrand.id == request.watch_data.brand_id, WatchBrand.is_active == True)
-    ).first()
-    if not watch_brand:
-        raise HTTPException(status_code=400, detail="Invalid watch brand")
-    
-    # Validate repair types exist
-    repair_types = db.query(RepairType).filter(
-        and_(RepairType.id.in_(request.repair_data.repair_type_ids), RepairType.is_active == True)
-    ).all()
-    if len(repair_types) != len(request.repair_data.repair_type_ids):
-        raise HTTPException(status_code=400, detail="Invalid repair types")
+async def repair_history_response(db: AsyncSession, customer: Customer, limit: int, cursor: Optional[str]) -> dict:
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    repairs, next_cursor = await customer_history.customer_history(db, customer.id, limit, after)
+    return {
+        "customer_id": str(customer.id),
+        "customer_name": customer.name,
+        "repair_requests": repairs,
+        "pagination": {"next_cursor": next_cursor, "has_more": next_cursor is not None}
+    }
+
+@app.get("/api/customers/repair-requests", response_model=schemas.CustomerRepairHistory)
+async def get_customer_history_by_cpf(
+    cpf: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Repair history of the customer account with this CPF (any
+    punctuation), newest first; pass ``next_cursor`` back as ``cursor``"""
+    key = cpf_key(cpf)
+    customer = (await db.scalars(select(Customer).where(Customer.cpf_key == key))).first() if key else None
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return await repair_history_response(db, customer, limit, cursor)
+
+@app.get("/api/customers/{customer_id}/repair-requests", response_model=schemas.CustomerRepairHistory)
+async def get_customer_history(
+    customer_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Repair history of a customer account, newest first; pass
+    ``next_cursor`` back as ``cursor``"""
+    try:
+        customer_uuid = uuid.UUID(customer_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid customer ID format")
     
+    customer = await db.get(Customer, customer_uuid)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return await repair_history_response(db, customer, limit, cursor)
+
+async def save_repair_request(
+    db: AsyncSession, request: schemas.RepairRequestCreate, brand_uuid: uuid.UUID, repair_type_uuids: List[uuid.UUID]
+):
+    """Insert a validated submission (and the customer account, if asked
+    for) without committing; returns the repair and whether an account was created"""
     customer_id = None
     customer_account_created = False
     
     # Check if customer wants to create an account
     if request.create_customer_account:
         # Check if customer already exists
-        existing_customer = db.query(Customer).filter(Customer.cpf == request.customer_data.cpf).first()
+        existing_customer = (await db.scalars(select(Customer).where(Customer.cpf_key == cpf_key(request.customer_data.cpf)))).first()
         
         if existing_customer:
             customer_id = existing_customer.id
@@ -97,19 +372,17 @@ async def create_repair_request(request: schemas.RepairRequestCreate, db: Sessio
             new_customer = Customer(
                 name=request.customer_data.name,
                 cpf=request.customer_data.cpf,
+                cpf_key=cpf_key(request.customer_data.cpf),
                 phone=request.customer_data.phone,
                 address=request.customer_data.address,
                 email=request.customer_data.email
             )
             db.add(new_customer)
-            db.flush()  # Get the ID
+            await db.flush()  # Get the ID
             customer_id = new_customer.id
             customer_account_created = True
     
-    # Generate unique reference number
-    reference_number = generate_reference_number()
-    while db.query(RepairRequest).filter(RepairRequest.reference_number == reference_number).first():
-        reference_number = generate_reference_number()
+    reference_number = await next_reference_number(db)
     
     # Create repair request
     repair_request = RepairRequest(
@@ -120,93 +393,265 @@ async def create_repair_request(request: schemas.RepairRequestCreate, db: Sessio
         customer_phone=request.customer_data.phone,
         customer_address=request.customer_data.address,
         customer_email=request.customer_data.email,
-        watch_brand_id=request.watch_data.brand_id,
+        watch_brand_id=brand_uuid,
         watch_type=WatchType(request.watch_data.type),
-        problem_description=request.repair_data.problem_description,
-        repair_types=repair_types
+        problem_description=request.repair_data.problem_description
     )
     
     db.add(repair_request)
-    db.commit()
+    await db.flush()
+    await db.execute(insert(repair_request_types), [
+        {"repair_request_id": repair_request.id, "repair_type_id": rt_id} for rt_id in repair_type_uuids
+    ])
     
-    return {
-        "success": True,
-        "repair_request": {
+    stats_delta = StatsDelta()
+    stats_delta.created(RepairFacts(brand_uuid, repair_request.watch_type, repair_type_uuids))
+    await stats_delta.apply(db)
+    history = StatusHistory()
+    history.created(repair_request.id, brand_uuid, repair_request.created_at)
+    await history.apply(db)
+    return repair_request, customer_account_created
+
+@app.post("/api/repair-requests", response_model=schemas.RepairRequestCreated)
+async def create_repair_request(
+    request: schemas.RepairRequestCreate,
+    idempotency_key: Optional[str] = Header(None, alias=idempotency.IDEMPOTENCY_HEADER, max_length=idempotency.MAX_KEY_LENGTH),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create a new repair request.
+
+    Clients that may retry should send an ``Idempotency-Key`` header (a
+    random UUID per submission); repeats with the same key get the original
+    response, marked with ``Idempotent-Replayed: true``.
+    """
+    
+    catalog = await catalog_cache.get(db)
+    
+    # Validate watch brand exists
+    try:
+        brand_uuid = uuid.UUID(request.watch_data.brand_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid watch brand")
+    
+    if brand_uuid not in catalog.watch_brands:
+        raise HTTPException(status_code=400, detail="Invalid watch brand")
+    
+    # Validate repair types exist
+    try:
+        repair_type_uuids = [uuid.UUID(rt_id) for rt_id in request.repair_data.repair_type_ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid repair types")
+    
+    if len(set(repair_type_uuids)) != len(repair_type_uuids) or not all(rt_id in catalog.repair_types for rt_id in repair_type_uuids):
+        raise HTTPException(status_code=400, detail="Invalid repair types")
+    
+    if idempotency_key:
+        request_hash = idempotency.fingerprint(request)
+        record = await idempotency.lookup(db, idempotency_key)
+        if record:
+            return idempotency.replay(record, request_hash)
+    
+    try:
+        repair_request, customer_account_created = await save_repair_request(db, request, brand_uuid, repair_type_uuids)
+        created = {
             "id": str(repair_request.id),
             "reference_number": repair_request.reference_number,
             "status": repair_request.status.value,
             "created_at": repair_request.created_at
-        },
-        "customer_account_created": customer_account_created,
-        "message": "Repair request submitted successfully!"
-    }
+        }
+        response = {
+            "success": True,
+            "repair_request": created,
+            "customer_account_created": customer_account_created,
+            "message": "Repair request submitted successfully!"
+        }
+        if idempotency_key:
+            idempotency.remember(db, idempotency_key, request_hash, schemas.RepairRequestCreated(**response).model_dump_json())
+        await db.commit()
+    except IntegrityError:
+        # A concurrent attempt with the same key committed first (its key row
+        # or new customer account blocked ours); answer as it did
+        await db.rollback()
+        record = await idempotency.lookup(db, idempotency_key) if idempotency_key else None
+        if record is None:
+            raise
+        return idempotency.replay(record, request_hash)
+    
+    await broker.publish([], "created", {
+        **created,
+        "customer_name": repair_request.customer_name,
+        "watch_brand": catalog.watch_brands[brand_uuid].name
+    })
+    
+    return response
 
-@app.get("/api/repair-requests/{repair_id}/status")
-async def get_repair_status(repair_id: str, db: Session = Depends(get_db)):
+@app.get("/api/repair-requests/{repair_id}/status", response_model=schemas.RepairStatusResponse)
+async def get_repair_status(repair_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get repair request status"""
     try:
         repair_uuid = uuid.UUID(repair_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid repair ID format")
     
-    repair = db.query(RepairRequest).filter(RepairRequest.id == repair_uuid).first()
-    if not repair:
+    payload = await status_cache.get_or_load(
+        status_cache_keys(repair_uuid)[0],
+        lambda: load_repair_status(db, repair_id=repair_uuid)
+    )
+    if not payload:
         raise HTTPException(status_code=404, detail="Repair request not found")
     
-    return {
-        "id": str(repair.id),
-        "reference_number": repair.reference_number,
-        "status": repair.status.value,
-        "estimated_completion": repair.estimated_completion,
-        "customer_name": repair.customer_name,
-        "watch_brand": repair.watch_brand.name,
-        "repair_types": [rt.name for rt in repair.repair_types],
-        "created_at": repair.created_at,
-        "notes": repair.internal_notes if repair.status != RepairStatus.PENDING else None
-    }
+    return payload
 
-@app.get("/api/repair-requests/reference/{reference_number}/status")
-async def get_repair_status_by_reference(reference_number: str, db: Session = Depends(get_db)):
+@app.get("/api/repair-requests/reference/{reference_number}/status", response_model=schemas.RepairStatusResponse)
+async def get_repair_status_by_reference(reference_number: str, db: AsyncSession = Depends(get_read_db)):
     """Get repair request status by reference number"""
-    repair = db.query(RepairRequest).filter(RepairRequest.reference_number == reference_number).first()
-    if not repair:
+    payload = await status_cache.get_or_load(
+        status_cache_keys(reference_number=reference_number)[0],
+        lambda: load_repair_status(db, reference_number=reference_number)
+    )
+    if not payload:
         raise HTTPException(status_code=404, detail="Repair request not found")
     
-    return {
-        "id": str(repair.id),
-        "reference_number": repair.reference_number,
-        "status": repair.status.value,
-        "estimated_completion": repair.estimated_completion,
-        "customer_name": repair.customer_name,
-        "watch_brand": repair.watch_brand.name,
-        "repair_types": [rt.name for rt in repair.repair_types],
-        "created_at": repair.created_at,
-        "notes": repair.internal_notes if repair.status != RepairStatus.PENDING else None
-    }
+    return payload
+
+@app.get("/api/repair-requests/{repair_id}/events")
+async def stream_repair_status(repair_id: str):
+    """Server-Sent Events: the current status, then every change"""
+    try:
+        repair_uuid = uuid.UUID(repair_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid repair ID format")
+    
+    # No request-scoped session: it would hold a pooled connection until the
+    # client disconnects
+    lookup = {"repair_id": repair_uuid}
+    if not await repair_status_snapshot(status_cache_keys(repair_uuid)[0], lookup):
+        raise HTTPException(status_code=404, detail="Repair request not found")
+    
+    return sse_response(status_cache_keys(repair_uuid), lookup)
+
+@app.get("/api/repair-requests/reference/{reference_number}/events")
+async def stream_repair_status_by_reference(reference_number: str):
+    """Server-Sent Events by reference number: the current status, then every change"""
+    keys = status_cache_keys(reference_number=reference_number)
+    lookup = {"reference_number": reference_number}
+    if not await repair_status_snapshot(keys[0], lookup):
+        raise HTTPException(status_code=404, detail="Repair request not found")
+    
+    return sse_response(keys, lookup)
+
+@app.websocket("/api/repair-requests/{repair_id}/ws")
+async def repair_status_websocket(websocket: WebSocket, repair_id: str):
+    """WebSocket variant of the status event stream"""
+    try:
+        repair_uuid = uuid.UUID(repair_id)
+    except ValueError:
+        await websocket.close(code=4400, reason="Invalid repair ID format")
+        return
+    await websocket_events(websocket, status_cache_keys(repair_uuid), {"repair_id": repair_uuid})
+
+@app.websocket("/api/repair-requests/reference/{reference_number}/ws")
+async def repair_status_websocket_by_reference(websocket: WebSocket, reference_number: str):
+    """WebSocket variant of the status event stream by reference number"""
+    await websocket_events(
+        websocket,
+        status_cache_keys(reference_number=reference_number),
+        {"reference_number": reference_number}
+    )
 
 # ===== ADMIN ENDPOINTS =====
 
-@app.get("/api/admin/repair-requests")
+def repair_list_filters(status: Optional[str], created_from: Optional[datetime], created_to: Optional[datetime]) -> list:
+    """WHERE conditions shared by the admin list and export endpoints"""
+    filters = []
+    if status:
+        try:
+            filters.append(RepairRequest.status == RepairStatus(status.upper()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid status")
+    if created_from:
+        filters.append(RepairRequest.created_at >= created_from)
+    if created_to:
+        filters.append(RepairRequest.created_at < created_to)
+    return filters
+
+def archive_list_filters(status: Optional[str], created_from: Optional[datetime], created_to: Optional[datetime]) -> Optional[list]:
+    """The same filters on repair_archive, or None when they match no archived
+    repair (all of them are DELIVERED); call after repair_list_filters"""
+    if status and status.upper() != RepairStatus.DELIVERED.value:
+        return None
+    filters = []
+    if created_from:
+        filters.append(RepairArchive.created_at >= created_from)
+    if created_to:
+        filters.append(RepairArchive.created_at < created_to)
+    return filters
+
+@app.get("/api/admin/repair-requests", response_model=schemas.RepairRequestList)
 async def list_repair_requests(
     status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     page: int = 1,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List all repair requests with pagination"""
-    query = db.query(RepairRequest)
+    """List all repair requests, newest first.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to page with a
+    keyset seek on (created_at, id) instead of an OFFSET scan. Totals come
+    from a short-lived per-status cache and can be skipped entirely with
+    ``include_total=false``.
     
-    if status:
+    Repairs moved to the archive (archive.py) are not listed; with totals,
+    ``archived_items`` says how many matching repairs are archived. The
+    export includes them.
+    """
+    query = select(RepairRequest).where(*repair_list_filters(status, created_from, created_to))
+    archive_filters = archive_list_filters(status, created_from, created_to)
+    
+    total_items = None
+    total_pages = None
+    archived_items = None
+    if include_total:
+        count_key = (status and status.upper(), created_from, created_to)
+        total_items = repair_count_cache.get(count_key)
+        if total_items is None:
+            total_items = await db.scalar(select(func.count()).select_from(query.subquery()))
+            repair_count_cache.set(count_key, total_items)
+        total_pages = (total_items + limit - 1) // limit
+        
+        archived_items = 0
+        if archive_filters is not None:
+            archived_items = repair_count_cache.get(("archived", *count_key))
+            if archived_items is None:
+                archived_items = await db.scalar(
+                    select(func.count()).select_from(RepairArchive).where(*archive_filters)
+                )
+                repair_count_cache.set(("archived", *count_key), archived_items)
+    
+    if cursor:
         try:
-            status_enum = RepairStatus(status.upper())
-            query = query.filter(RepairRequest.status == status_enum)
+            cursor_created_at, cursor_id = decode_cursor(cursor)
         except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid status")
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(RepairRequest.created_at, RepairRequest.id) < (cursor_created_at, cursor_id))
+    else:
+        query = query.offset((page - 1) * limit)
     
-    total_items = query.count()
-    total_pages = (total_items + limit - 1) // limit
+    # Fetch one extra row to know whether another page exists
+    repairs = (await db.scalars(
+        query.options(*REPAIR_LOAD_OPTIONS)
+        .order_by(RepairRequest.created_at.desc(), RepairRequest.id.desc())
+        .limit(limit + 1)
+    )).all()
     
-    repairs = query.offset((page - 1) * limit).limit(limit).all()
+    next_cursor = None
+    if len(repairs) > limit:
+        repairs = repairs[:limit]
+        next_cursor = encode_cursor(repairs[-1].created_at, repairs[-1].id)
     
     repair_list = []
     for repair in repairs:
@@ -226,21 +671,106 @@ async def list_repair_requests(
     return {
         "repair_requests": repair_list,
         "pagination": {
-            "current_page": page,
+            "current_page": None if cursor else page,
             "total_pages": total_pages,
-            "total_items": total_items
-        }
+            "total_items": total_items,
+            "next_cursor": next_cursor
+        },
+        "archived_items": archived_items
     }
 
-@app.get("/api/admin/repair-requests/{repair_id}")
-async def get_repair_request_details(repair_id: str, db: Session = Depends(get_db)):
+@app.get("/api/admin/repair-requests/export")
+async def export_repair_requests(
+    format: str = "csv",
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Stream every matching repair request as CSV or NDJSON.
+
+    Rows are read through a server-side cursor and written as they arrive,
+    so memory use does not grow with the size of the export. Archived
+    repairs in the range are included.
+    """
+    file_format = format.lower()
+    if file_format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    
+    filters = repair_list_filters(status, created_from, created_to)
+    archive_filters = archive_list_filters(status, created_from, created_to)
+    filename = f"repair-requests-{datetime.utcnow():%Y%m%d%H%M%S}.{file_format}"
+    return StreamingResponse(
+        export.stream_export(file_format, filters, archive_filters),
+        media_type=export.FORMATS[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/api/admin/repair-requests/import", response_model=schemas.ImportResult)
+async def import_repair_requests(
+    file: UploadFile,
+    format: Optional[str] = None,
+    batch_size: int = bulk_import.DEFAULT_BATCH_SIZE,
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk import repair requests from a CSV or NDJSON file.
+
+    Rows are validated and inserted in batches; invalid rows are reported
+    per row number and skipped without aborting the rest of the file.
+    """
+    file_format = (format or bulk_import.detect_format(file.filename or "")).lower()
+    if file_format not in bulk_import.FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="Invalid batch size")
+    
+    catalog = await catalog_cache.get(db)
+    result = await bulk_import.import_repair_requests(db, file.file, file_format, catalog, batch_size)
+    repair_count_cache.invalidate()
+    if result.created:
+        await broker.publish([], "imported", {"created": result.created, "failed": result.failed})
+    
+    return {"success": result.failed == 0, **result.as_dict()}
+
+@app.post("/api/admin/repair-requests/batch-update", response_model=schemas.RepairRequestBatchResult)
+async def batch_update_repair_requests(batch: schemas.RepairRequestBatchUpdate, db: AsyncSession = Depends(get_db)):
+    """Apply status, price and estimated completion changes to up to 500
+    repairs in one transaction.
+
+    Status changes must follow ``STATUS_TRANSITIONS`` (forward through the
+    workflow or one step back). Invalid items are reported in ``results``,
+    in request order, and skipped without aborting the rest.
+    """
+    result = await bulk_update.update_repair_requests(db, batch.updates)
+    
+    if result.updated:
+        if any(repair.status_changed for repair in result.updated):
+            repair_count_cache.invalidate()
+        # Refilled from the primary, so pollers never see a replica's older copy
+        payloads = await load_repair_statuses(db, [repair.id for repair in result.updated])
+        await status_cache.set_many({
+            key: payload for payload in payloads
+            for key in status_cache_keys(uuid.UUID(payload["id"]), payload["reference_number"])
+        })
+        for payload in payloads:
+            await broker.publish(
+                status_cache_keys(uuid.UUID(payload["id"]), payload["reference_number"]), "status", payload
+            )
+    
+    return {"success": result.failed == 0, **result.as_dict()}
+
+@app.get("/api/admin/repair-requests/{repair_id}", response_model=schemas.RepairRequestResponse)
+async def get_repair_request_details(repair_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get detailed repair request information"""
     try:
         repair_uuid = uuid.UUID(repair_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid repair ID format")
     
-    repair = db.query(RepairRequest).filter(RepairRequest.id == repair_uuid).first()
+    repair = (await db.scalars(
+        select(RepairRequest)
+        .options(*REPAIR_LOAD_OPTIONS)
+        .where(RepairRequest.id == repair_uuid)
+    )).first()
     if not repair:
         raise HTTPException(status_code=404, detail="Repair request not found")
     
@@ -264,11 +794,26 @@ async def get_repair_request_details(repair_id: str, db: Session = Depends(get_d
         "updated_at": repair.updated_at
     }
 
-@app.put("/api/admin/repair-requests/{repair_id}")
+@app.get("/api/admin/repair-requests/{repair_id}/timeline", response_model=schemas.RepairTimeline)
+async def get_repair_timeline(repair_id: str, db: AsyncSession = Depends(get_read_db)):
+    """Status history of a repair request, oldest first, with the time
+    spent in each status before the change"""
+    try:
+        repair_uuid = uuid.UUID(repair_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid repair ID format")
+    
+    events = await status_history.load_timeline(db, repair_uuid)
+    if not events and not await load_repair_status(db, repair_id=repair_uuid):
+        raise HTTPException(status_code=404, detail="Repair request not found")
+    
+    return {"repair_request_id": str(repair_uuid), "events": events}
+
+@app.put("/api/admin/repair-requests/{repair_id}", response_model=schemas.SuccessResponse)
 async def update_repair_request(
     repair_id: str,
     update_data: schemas.RepairRequestUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update repair request"""
     try:
@@ -276,10 +821,18 @@ async def update_repair_request(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid repair ID format")
     
-    repair = db.query(RepairRequest).filter(RepairRequest.id == repair_uuid).first()
+    # Locked on PostgreSQL: the aggregates move by deltas from the status read
+    # here, so two concurrent updates must not both start from the same one
+    repair = (await db.scalars(
+        select(RepairRequest).where(RepairRequest.id == repair_uuid).with_for_update()
+    )).first()
     if not repair:
         raise HTTPException(status_code=404, detail="Repair request not found")
     
+    old_status = repair.status
+    old_price = repair.total_price
+    old_completed_at = repair.completed_at
+    
     # Update fields
     if update_data.status:
         try:
@@ -297,36 +850,122 @@ async def update_repair_request(
         repair.internal_notes = update_data.internal_notes
     
     repair.updated_at = datetime.utcnow()
-    db.commit()
+    if repair.status == RepairStatus.COMPLETED and repair.completed_at is None:
+        repair.completed_at = repair.updated_at
+    
+    if repair.status != old_status or repair.total_price != old_price:
+        stats_delta = StatsDelta()
+        stats_delta.changed(
+            await load_repair_facts(db, repair),
+            old_status, old_price, repair.status, repair.total_price,
+            created_at=repair.created_at, completed_at=old_completed_at
+        )
+        await stats_delta.apply(db)
+        repair_count_cache.invalidate()
+    
+    history = StatusHistory()
+    history.changed(repair.id, repair.watch_brand_id, old_status, repair.status, created_at=repair.created_at)
+    await history.apply(db)
+    
+    await db.commit()
+    keys = status_cache_keys(repair.id, repair.reference_number)
+    await status_cache.invalidate(*keys)
+    
+    # Reloading through the cache also warms it for pollers
+    payload = await status_cache.get_or_load(keys[0], lambda: load_repair_status(db, repair_id=repair.id))
+    await broker.publish(keys, "status", payload)
     
     return {"success": True, "message": "Repair request updated successfully"}
 
+@app.get("/api/admin/stats", response_model=schemas.DashboardStats)
+async def get_admin_stats(db: AsyncSession = Depends(get_read_db)):
+    """Dashboard aggregates: counts and revenue per status, average turnaround
+    to COMPLETED, overall and per watch brand, repair type and watch type"""
+    return await dashboard_stats(db)
+
+@app.get("/api/admin/stats/dwell-times", response_model=schemas.DwellTimeStats)
+async def get_dwell_time_stats(
+    changed_from: Optional[datetime] = None,
+    changed_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """How long repairs sit in each status (average and p50/p90/p99 hours),
+    overall and per watch brand and repair type, for status changes made
+    between ``changed_from`` and ``changed_to`` (default: the last 30 days)"""
+    changed_to = changed_to or datetime.utcnow()
+    changed_from = changed_from or changed_to - timedelta(days=status_history.DEFAULT_WINDOW_DAYS)
+    if changed_from >= changed_to:
+        raise HTTPException(status_code=400, detail="changed_from must be before changed_to")
+    return await status_history.dwell_time_stats(db, changed_from, changed_to)
+
+@app.get("/api/admin/search", response_model=schemas.SearchResults)
+async def search_repairs_and_customers(
+    q: str = Query(..., min_length=search.MIN_QUERY_LENGTH),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Ranked search over repairs and customers by name, CPF or phone
+    fragment, reference number or words in the problem description"""
+    return await search.search(db, q, limit)
+
+@app.get("/api/admin/cache/stats", response_model=schemas.StatusCacheStats)
+async def get_cache_stats():
+    """Hit/miss counters for the public status cache in this worker"""
+    return {"status_cache": status_cache.stats()}
+
+@app.get("/api/admin/db/pool", response_model=schemas.PoolStatus, response_model_exclude_unset=True)
+async def get_pool_status():
+    """Connection pool occupancy and checkout wait counters for this worker"""
+    return pool_status()
+
+@app.get("/api/admin/db/replicas", response_model=schemas.ReplicaRouterStatus)
+async def get_replica_status():
+    """Read replicas in rotation, their lag and reads routed to each"""
+    return replica_router.stats()
+
+@app.get("/api/admin/events")
+async def stream_admin_events():
+    """Server-Sent Events for the front desk: every status change, new
+    submission and bulk import"""
+    return sse_response([ADMIN_FEED])
+
+@app.websocket("/api/admin/ws")
+async def admin_events_websocket(websocket: WebSocket):
+    """WebSocket variant of the admin event feed"""
+    await websocket_events(websocket, [ADMIN_FEED])
+
+@app.get("/api/admin/events/stats", response_model=schemas.BrokerStats)
+async def get_event_stats():
+    """Subscriber and publish counters for this worker's event broker"""
+    return broker.stats()
+
 # ===== ADMIN BRAND MANAGEMENT =====
 
 @app.get("/api/admin/watch-brands", response_model=List[schemas.WatchBrand])
-async def list_watch_brands(db: Session = Depends(get_db)):
+async def list_watch_brands(db: AsyncSession = Depends(get_read_db)):
     """List all watch brands"""
-    return db.query(WatchBrand).all()
+    return (await db.scalars(select(WatchBrand))).all()
 
 @app.post("/api/admin/watch-brands", response_model=schemas.WatchBrand)
-async def create_watch_brand(brand: schemas.WatchBrandCreate, db: Session = Depends(get_db)):
+async def create_watch_brand(brand: schemas.WatchBrandCreate, db: AsyncSession = Depends(get_db)):
     """Create new watch brand"""
     # Check if brand already exists
-    existing = db.query(WatchBrand).filter(WatchBrand.name == brand.name).first()
+    existing = (await db.scalars(select(WatchBrand).where(WatchBrand.name == brand.name))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Watch brand already exists")
     
     db_brand = WatchBrand(**brand.dict())
     db.add(db_brand)
-    db.commit()
-    db.refresh(db_brand)
+    await db.commit()
+    catalog_cache.invalidate()
+    await db.refresh(db_brand)
     return db_brand
 
-@app.put("/api/admin/watch-brands/{brand_id}")
+@app.put("/api/admin/watch-brands/{brand_id}", response_model=schemas.SuccessResponse)
 async def update_watch_brand(
     brand_id: str, 
     brand: schemas.WatchBrandCreate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update watch brand"""
     try:
@@ -334,53 +973,56 @@ async def update_watch_brand(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid brand ID format")
     
-    db_brand = db.query(WatchBrand).filter(WatchBrand.id == brand_uuid).first()
+    db_brand = await db.get(WatchBrand, brand_uuid)
     if not db_brand:
         raise HTTPException(status_code=404, detail="Watch brand not found")
     
     for field, value in brand.dict().items():
         setattr(db_brand, field, value)
     
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
     return {"success": True, "message": "Watch brand updated successfully"}
 
-@app.delete("/api/admin/watch-brands/{brand_id}")
-async def delete_watch_brand(brand_id: str, db: Session = Depends(get_db)):
+@app.delete("/api/admin/watch-brands/{brand_id}", response_model=schemas.SuccessResponse)
+async def delete_watch_brand(brand_id: str, db: AsyncSession = Depends(get_db)):
     """Delete watch brand (soft delete by setting is_active=False)"""
     try:
         brand_uuid = uuid.UUID(brand_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid brand ID format")
     
-    db_brand = db.query(WatchBrand).filter(WatchBrand.id == brand_uuid).first()
+    db_brand = await db.get(WatchBrand, brand_uuid)
     if not db_brand:
         raise HTTPException(status_code=404, detail="Watch brand not found")
     
     db_brand.is_active = False
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
     return {"success": True, "message": "Watch brand deactivated successfully"}
 
 # ===== ADMIN REPAIR TYPE MANAGEMENT =====
 
 @app.get("/api/admin/repair-types", response_model=List[schemas.RepairType])
-async def list_repair_types(db: Session = Depends(get_db)):
+async def list_repair_types(db: AsyncSession = Depends(get_read_db)):
     """List all repair types"""
-    return db.query(RepairType).all()
+    return (await db.scalars(select(RepairType))).all()
 
 @app.post("/api/admin/repair-types", response_model=schemas.RepairType)
-async def create_repair_type(repair_type: schemas.RepairTypeCreate, db: Session = Depends(get_db)):
+async def create_repair_type(repair_type: schemas.RepairTypeCreate, db: AsyncSession = Depends(get_db)):
     """Create new repair type"""
     db_repair_type = RepairType(**repair_type.dict())
     db.add(db_repair_type)
-    db.commit()
-    db.refresh(db_repair_type)
+    await db.commit()
+    catalog_cache.invalidate()
+    await db.refresh(db_repair_type)
     return db_repair_type
 
-@app.put("/api/admin/repair-types/{repair_type_id}")
+@app.put("/api/admin/repair-types/{repair_type_id}", response_model=schemas.SuccessResponse)
 async def update_repair_type(
     repair_type_id: str,
     repair_type: schemas.RepairTypeCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update repair type"""
     try:
@@ -388,38 +1030,45 @@ async def update_repair_type(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid repair type ID format")
     
-    db_repair_type = db.query(RepairType).filter(RepairType.id == repair_type_uuid).first()
+    db_repair_type = await db.get(RepairType, repair_type_uuid)
     if not db_repair_type:
         raise HTTPException(status_code=404, detail="Repair type not found")
     
     for field, value in repair_type.dict().items():
         setattr(db_repair_type, field, value)
     
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
     return {"success": True, "message": "Repair type updated successfully"}
 
-@app.delete("/api/admin/repair-types/{repair_type_id}")
-async def delete_repair_type(repair_type_id: str, db: Session = Depends(get_db)):
+@app.delete("/api/admin/repair-types/{repair_type_id}", response_model=schemas.SuccessResponse)
+async def delete_repair_type(repair_type_id: str, db: AsyncSession = Depends(get_db)):
     """Delete repair type (soft delete)"""
     try:
         repair_type_uuid = uuid.UUID(repair_type_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid repair type ID format")
     
-    db_repair_type = db.query(RepairType).filter(RepairType.id == repair_type_uuid).first()
+    db_repair_type = await db.get(RepairType, repair_type_uuid)
     if not db_repair_type:
         raise HTTPException(status_code=404, detail="Repair type not found")
     
     db_repair_type.is_active = False
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
     return {"success": True, "message": "Repair type deactivated successfully"}
 
 # ===== HEALTH CHECK =====
-@app.get("/")
+@app.get("/", response_model=schemas.ServiceInfo)
 async def root():
     return {"message": "Watchmaker Repair Service API", "status": "running"}
 
-@app.get("/health")
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics.metrics_response_body(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/health", response_model=schemas.HealthCheck)
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
@@ -0,0 +1,162 @@
+# metrics.py
+"""
+Prometheus instrumentation for the Watchmaker API
+MetricsMiddleware records per-route request counts, latency and in-flight
+requests; engine hooks attribute every SQL statement to the request that
+issued it, so slow endpoints and N+1 regressions show up per route.
+Server-Sent Events streams last as long as the client listens, so they are
+counted as open streams rather than in-flight requests and are left out of
+the latency histogram.
+
+With several uvicorn/gunicorn workers, set PROMETHEUS_MULTIPROC_DIR to an
+empty directory so /metrics aggregates all workers; the stats gauges
+(cache, pool, events) are then reported by the worker that serves the scrape.
+"""
+import contextvars
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+REQUESTS = Counter(
+    "watchmaker_http_requests_total", "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "watchmaker_http_request_duration_seconds", "Time until the response is fully sent",
+    ["method", "route"],
+)
+IN_FLIGHT = Gauge("watchmaker_http_requests_in_flight", "Requests being served", multiprocess_mode="livesum")
+EVENT_STREAMS = Gauge("watchmaker_event_streams_open", "Server-Sent Events streams being served", multiprocess_mode="livesum")
+REQUEST_QUERIES = Histogram(
+    "watchmaker_db_queries_per_request", "SQL statements executed per request",
+    ["method", "route"], buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50, 100),
+)
+REQUEST_DB_TIME = Histogram(
+    "watchmaker_db_time_per_request_seconds", "Time spent executing SQL per request",
+    ["method", "route"],
+)
+QUERIES = Counter("watchmaker_db_queries_total", "SQL statements executed, including outside requests")
+QUERY_TIME = Counter("watchmaker_db_query_seconds_total", "Time spent executing SQL statements")
+
+UNMATCHED_ROUTE = "unmatched"
+EVENT_STREAM_TYPE = b"text/event-stream"
+
+class RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+_request_db_stats: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar("request_db_stats", default=None)
+
+def instrument_engine(engine) -> None:
+    """Time every statement on `engine` (an AsyncEngine or Engine)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    # The start time lives on the statement's execution context, which is
+    # discarded with it, so a failed statement leaves nothing behind on the
+    # pooled connection. SQLAlchemy's internal statements without a context
+    # are counted untimed.
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started_at = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "query_started_at", None)
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        QUERIES.inc()
+        QUERY_TIME.inc(elapsed)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+def is_event_stream(response_start) -> bool:
+    return any(
+        name.lower() == b"content-type" and value.lower().startswith(EVENT_STREAM_TYPE)
+        for name, value in response_start.get("headers", [])
+    )
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed to their last
+    chunk and the request's context is shared with the endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        event_stream = False
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if is_event_stream(message):
+                    event_stream = True
+                    IN_FLIGHT.dec()
+                    EVENT_STREAMS.inc()
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            if event_stream:
+                EVENT_STREAMS.dec()
+            else:
+                IN_FLIGHT.dec()
+            _request_db_stats.reset(token)
+            # The router stores the matched route in the scope; labelling by its
+            # template keeps one series per endpoint rather than per repair id
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            if not event_stream:
+                REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_TIME.labels(method, route).observe(stats.seconds)
+
+class StatsCollector:
+    """Exposes the numeric fields of existing stats() dicts (caches, pool,
+    event broker) as gauges named watchmaker_<name>_<field>, read at scrape time"""
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], Dict]] = {}
+
+    def register(self, name: str, source: Callable[[], Dict]) -> None:
+        self.sources[name] = source
+
+    def collect(self):
+        for name, source in self.sources.items():
+            for field, value in source().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield GaugeMetricFamily(f"watchmaker_{name}_{field}", f"{name} {field.replace('_', ' ')}", value=value)
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+def metrics_response_body() -> bytes:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(stats_collector)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -1,8 +1,7 @@
 # models.py
-from sqlalchemy import Column, String, DateTime, Boolean, Text, ForeignKey, Table, Enum, Numeric
+from sqlalchemy import Column, String, DateTime, Boolean, Text, ForeignKey, Table, Enum, Numeric, Uuid, Index, BigInteger, Integer, Sequence, LargeBinary, PrimaryKeyConstraint, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
 import enum
@@ -20,20 +19,36 @@ class RepairStatus(enum.Enum):
     COMPLETED = "COMPLETED"
     DELIVERED = "DELIVERED"
 
+# Status changes the batch update accepts, besides keeping the same status:
+# forward through the workshop flow, or one step back to correct a mistake
+STATUS_TRANSITIONS = {
+    RepairStatus.PENDING: {RepairStatus.IN_PROGRESS, RepairStatus.COMPLETED},
+    RepairStatus.IN_PROGRESS: {RepairStatus.PENDING, RepairStatus.COMPLETED},
+    RepairStatus.COMPLETED: {RepairStatus.IN_PROGRESS, RepairStatus.DELIVERED},
+    RepairStatus.DELIVERED: set(),
+}
+
+# Source of reference numbers on PostgreSQL; one nextval per repair, no retries
+reference_number_seq = Sequence('repair_reference_number_seq', metadata=Base.metadata)
+
 # Many-to-many relationship table
 repair_request_types = Table(
     'repair_request_types',
     Base.metadata,
-    Column('repair_request_id', UUID(as_uuid=True), ForeignKey('repair_requests.id')),
-    Column('repair_type_id', UUID(as_uuid=True), ForeignKey('repair_types.id'))
+    Column('repair_request_id', Uuid, ForeignKey('repair_requests.id'), primary_key=True),
+    Column('repair_type_id', Uuid, ForeignKey('repair_types.id'), primary_key=True),
+    # The primary key covers lookups by repair; this one serves repair type filters
+    Index('ix_repair_request_types_repair_type_id', 'repair_type_id')
 )
 
 class Customer(Base):
     __tablename__ = "customers"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
     cpf = Column(String(14), unique=True, nullable=False, index=True)
+    # 11 digits without punctuation (cpf.cpf_key); what lookups compare against
+    cpf_key = Column(String(11), nullable=False, index=True)
     phone = Column(String(20), nullable=False)
     address = Column(Text, nullable=False)
     email = Column(String(255), nullable=True)
@@ -45,9 +60,9 @@ class Customer(Base):
 class WatchBrand(Base):
     __tablename__ = "watch_brands"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False, unique=True)
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     repair_requests = relationship("RepairRequest", back_populates="watch_brand")
@@ -55,11 +70,11 @@ class WatchBrand(Base):
 class RepairType(Base):
     __tablename__ = "repair_types"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     estimated_price = Column(Numeric(10, 2), nullable=True)
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     repair_requests = relationship("RepairRequest", secondary=repair_request_types, back_populates="repair_types")
@@ -67,11 +82,11 @@ class RepairType(Base):
 class RepairRequest(Base):
     __tablename__ = "repair_requests"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     reference_number = Column(String(20), unique=True, nullable=False, index=True)
     
     # Customer info (stored directly for non-registered customers)
-    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=True)
+    customer_id = Column(Uuid, ForeignKey("customers.id"), nullable=True)
     customer_name = Column(String(255), nullable=False)
     customer_cpf = Column(String(14), nullable=False)
     customer_phone = Column(String(20), nullable=False)
@@ -79,7 +94,7 @@ class RepairRequest(Base):
     customer_email = Column(String(255), nullable=True)
     
     # Watch info
-    watch_brand_id = Column(UUID(as_uuid=True), ForeignKey("watch_brands.id"), nullable=False)
+    watch_brand_id = Column(Uuid, ForeignKey("watch_brands.id"), nullable=False)
     watch_type = Column(Enum(WatchType), nullable=False)
     
     # Repair info
@@ -91,8 +106,200 @@ class RepairRequest(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # First time the repair reached COMPLETED; a repair reopened and completed
+    # again keeps it, so its turnaround is only counted once
+    completed_at = Column(DateTime, nullable=True)
     
     # Relationships
     customer = relationship("Customer", back_populates="repair_requests")
     watch_brand = relationship("WatchBrand", back_populates="repair_requests")
     repair_types = relationship("RepairType", secondary=repair_request_types, back_populates="repair_requests")
+    
+    __table_args__ = (
+        # Admin list: newest first, keyset seek on (created_at, id), optionally per status
+        Index('ix_repair_requests_created_at_id', 'created_at', 'id'),
+        Index('ix_repair_requests_status_created_at_id', 'status', 'created_at', 'id'),
+        # Customer history (customer_history.py): keyset seek per account,
+        # covering the listed columns on PostgreSQL
+        Index(
+            'ix_repair_requests_customer_id_created_at', 'customer_id', 'created_at', 'id',
+            postgresql_include=['reference_number', 'status', 'watch_brand_id', 'watch_type',
+                                'total_price', 'estimated_completion']
+        ),
+    )
+
+class ReferenceCounter(Base):
+    """Named counters for databases without sequences (SQLite in local testing)"""
+    __tablename__ = "reference_counters"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+event.listen(
+    ReferenceCounter.__table__,
+    'after_create',
+    DDL("INSERT INTO reference_counters (name, value) VALUES ('repair_reference_number', 0)")
+)
+
+class RepairStat(Base):
+    """Running repair count and revenue per status for one dashboard dimension.
+
+    dimension is 'all', 'brand', 'repair_type' or 'watch_type'; dimension_key
+    is the brand/repair type id or watch type value ('all' for the totals).
+    Maintained incrementally by stats.StatsDelta in the same transaction as
+    the repair write.
+    """
+    __tablename__ = "repair_stats"
+    
+    dimension = Column(String(20), primary_key=True)
+    dimension_key = Column(String(64), primary_key=True)
+    status = Column(Enum(RepairStatus), primary_key=True)
+    repair_count = Column(BigInteger, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+class RepairTurnaroundStat(Base):
+    """Completed repairs and total seconds from creation to COMPLETED per dimension"""
+    __tablename__ = "repair_turnaround_stats"
+    
+    dimension = Column(String(20), primary_key=True)
+    dimension_key = Column(String(64), primary_key=True)
+    completed_count = Column(BigInteger, nullable=False, default=0)
+    turnaround_seconds = Column(BigInteger, nullable=False, default=0)
+
+class RepairStatusEvent(Base):
+    """Append-only history of repair status changes, written by
+    status_history.StatusHistory in the same transaction as the change.
+
+    from_status is NULL for the submission itself; dwell_seconds is the time
+    spent in from_status. No foreign key to repair_requests, so the history
+    outlives archival.
+    """
+    __tablename__ = "repair_status_events"
+
+    # SQLite only auto-increments INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    repair_request_id = Column(Uuid, nullable=False)
+    watch_brand_id = Column(Uuid, nullable=False)
+    from_status = Column(Enum(RepairStatus), nullable=True)
+    to_status = Column(Enum(RepairStatus), nullable=False)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    dwell_seconds = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Per-repair timeline
+        Index('ix_repair_status_events_repair_request_id_changed_at', 'repair_request_id', 'changed_at'),
+        # Time-window analytics; on PostgreSQL an index-only scan for the
+        # overall and per-brand stage figures
+        Index(
+            'ix_repair_status_events_changed_at', 'changed_at',
+            postgresql_include=['from_status', 'watch_brand_id', 'dwell_seconds']
+        ),
+    )
+
+class IdempotencyKey(Base):
+    """Response of a repair submission made with an Idempotency-Key header,
+    replayed for retries until purged (see idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request body
+    response = Column(Text, nullable=False)  # JSON body returned to the first attempt
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class RepairArchive(Base):
+    """Old DELIVERED repairs moved out of repair_requests by archive.py.
+
+    document is the zlib-compressed JSON of the repair with its brand and
+    repair types resolved, so an archived repair reads back without joins.
+    On PostgreSQL the table is range partitioned by year of created_at.
+    """
+    __tablename__ = "repair_archive"
+
+    id = Column(Uuid, nullable=False)
+    reference_number = Column(String(20), nullable=False, index=True)
+    customer_id = Column(Uuid, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    document = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        # The partition key has to be part of the primary key; id leads it
+        # for the status lookup
+        PrimaryKeyConstraint('id', 'created_at'),
+        Index('ix_repair_archive_customer_id_created_at', 'customer_id', 'created_at', 'id'),
+        # Exports stream the archive in (created_at, id) order alongside
+        # repair_requests; also serves the admin list's archived count
+        Index('ix_repair_archive_created_at_id', 'created_at', 'id'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+
+# The document is compressed already; keep TOAST from trying again
+event.listen(
+    RepairArchive.__table__,
+    'after_create',
+    DDL("ALTER TABLE repair_archive ALTER COLUMN document SET STORAGE EXTERNAL").execute_if(dialect='postgresql')
+)
+
+# ===== SEARCH INDEXES =====
+# Created alongside the tables by create_all and by migration 0005. On
+# PostgreSQL they are expression indexes (tsvector for problem descriptions,
+# pg_trgm for name/CPF/phone fragments) matched by search.py; on SQLite they
+# are FTS5 trigram tables kept in sync by triggers and joined on rowid.
+
+def _digits_sql(column: str, dialect: str) -> str:
+    """SQL expression stripping CPF/phone punctuation from a column"""
+    if dialect == 'postgresql':
+        return f"regexp_replace({column}, '[^0-9]', '', 'g')"
+    for char in ".-() ":
+        column = f"replace({column}, '{char}', '')"
+    return column
+
+POSTGRESQL_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_repair_requests_problem_fts ON repair_requests "
+    "USING gin (to_tsvector('portuguese'::regconfig, problem_description))",
+    "CREATE INDEX IF NOT EXISTS ix_repair_requests_customer_name_trgm ON repair_requests "
+    "USING gin (lower(customer_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_repair_requests_reference_number_trgm ON repair_requests "
+    "USING gin (lower(reference_number) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_repair_requests_customer_digits_trgm ON repair_requests "
+    f"USING gin (({_digits_sql('customer_cpf', 'postgresql')} || ' ' || "
+    f"{_digits_sql('customer_phone', 'postgresql')}) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_customers_name_trgm ON customers "
+    "USING gin (lower(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_customers_digits_trgm ON customers "
+    f"USING gin (({_digits_sql('cpf', 'postgresql')} || ' ' || "
+    f"{_digits_sql('phone', 'postgresql')}) gin_trgm_ops)",
+]
+
+def _sqlite_fts_ddl(fts_table: str, source_table: str, columns: dict, source_columns: list) -> list:
+    """FTS5 trigram table over computed columns of source_table, keyed by rowid"""
+    names = ", ".join(columns)
+    new_values = ", ".join(expression.format(row="new") for expression in columns.values())
+    old_values = ", ".join(expression.format(row="old") for expression in columns.values())
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({names}, tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source_table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, {names}) VALUES (new.rowid, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source_table} BEGIN "
+        f"DELETE FROM {fts_table} WHERE rowid = old.rowid; END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {', '.join(source_columns)} ON {source_table} BEGIN "
+        f"DELETE FROM {fts_table} WHERE rowid = old.rowid; "
+        f"INSERT INTO {fts_table}(rowid, {names}) VALUES (new.rowid, {new_values}); END",
+    ]
+
+SQLITE_SEARCH_DDL = _sqlite_fts_ddl("repair_search", "repair_requests", {
+    "reference_number": "{row}.reference_number",
+    "customer_name": "{row}.customer_name",
+    "customer_digits": f"{_digits_sql('{row}.customer_cpf', 'sqlite')} || ' ' || {_digits_sql('{row}.customer_phone', 'sqlite')}",
+    "problem_description": "{row}.problem_description",
+}, ["reference_number", "customer_name", "customer_cpf", "customer_phone", "problem_description"]) + _sqlite_fts_ddl("customer_search", "customers", {
+    "name": "{row}.name",
+    "customer_digits": f"{_digits_sql('{row}.cpf', 'sqlite')} || ' ' || {_digits_sql('{row}.phone', 'sqlite')}",
+    "email": "coalesce({row}.email, '')",
+}, ["name", "cpf", "phone", "email"])
+
+for _statement in POSTGRESQL_SEARCH_DDL:
+    event.listen(Base.metadata, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Base.metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
@@ -0,0 +1,252 @@
+# profiling.py
+"""
+Opt-in request profiling and slow-query log
+A profiled request (X-Profile header when PROFILING_ENABLED, or sampled at
+PROFILE_SAMPLE_RATE) gets a per-phase breakdown in its Server-Timing header
+and in the log, and a cProfile (or pyinstrument) dump in PROFILE_DIR:
+
+    sql        time inside cursor.execute
+    endpoint   time inside the endpoint function, minus sql: ORM hydration
+               and Python work
+    serialize  endpoint return until the response starts: response_model
+               validation and JSON rendering
+    other      routing, dependencies (session setup) and middleware
+
+SQL statements slower than SLOW_QUERY_MS are logged with their parameters
+and, for SELECTs, the plan from EXPLAIN run on a separate connection.
+
+    curl -H 'X-Profile: 1' -D - http://localhost:8000/api/admin/repair-requests
+    python -m pstats profiles/<file>.prof
+"""
+import asyncio
+import contextvars
+import cProfile
+import functools
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime
+from typing import Optional
+
+from decouple import config
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+logger = logging.getLogger("watchmaker.profiling")
+slow_query_logger = logging.getLogger("watchmaker.slow_query")
+
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILE_HEADER = config('PROFILE_HEADER', default='X-Profile')
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILE_DIR = config('PROFILE_DIR', default='profiles')
+PROFILE_TOOL = config('PROFILE_TOOL', default='cprofile')  # cprofile, pyinstrument or none
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=200, cast=float)  # 0 disables
+SLOW_QUERY_EXPLAIN = config('SLOW_QUERY_EXPLAIN', default=True, cast=bool)
+
+MAX_LOGGED_PARAMETERS = 500  # characters; parameters can be whole import batches
+# EXPLAINs each hold a pooled connection; during a slow-query storm the
+# rest are logged without a plan rather than starving requests
+MAX_PENDING_EXPLAINS = 4
+_pending_explains = set()
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+class RequestProfile:
+    __slots__ = ("sql_seconds", "queries", "orm_objects", "endpoint_seconds", "endpoint_finished_at")
+
+    def __init__(self):
+        self.sql_seconds = 0.0
+        self.queries = 0
+        self.orm_objects = 0
+        self.endpoint_seconds = 0.0
+        self.endpoint_finished_at: Optional[float] = None
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("request_profile", default=None)
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that times the endpoint function itself when the request is
+    being profiled, which separates it from FastAPI's serialization"""
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed_call(*args, **kwargs):
+                profile = _current_profile.get()
+                if profile is None:
+                    return await call(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    profile.endpoint_finished_at = time.perf_counter()
+                    profile.endpoint_seconds += profile.endpoint_finished_at - started
+
+            self.dependant.call = timed_call
+        return super().get_route_handler()
+
+def instrument_engine(engine, base=None) -> None:
+    """SQL timing for profiled requests, the slow-query log and a count of
+    ORM objects hydrated from `base`'s mapped classes (pass it for one
+    engine only; the count is per class, not per engine)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    # Timed per execution context, as in metrics.instrument_engine, so
+    # failed statements leave no start time behind
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.profile_started_at = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "profile_started_at", None)
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.sql_seconds += elapsed
+            profile.queries += 1
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS and not conn.info.get("explaining"):
+            log_slow_query(engine, statement, parameters, elapsed, executemany)
+
+    if base is None:
+        return
+
+    @event.listens_for(base, "load", propagate=True)
+    def count_loaded(target, context):
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.orm_objects += 1
+
+def log_slow_query(engine, statement, parameters, elapsed, executemany) -> None:
+    shown = repr(parameters)
+    if len(shown) > MAX_LOGGED_PARAMETERS:
+        shown = shown[:MAX_LOGGED_PARAMETERS] + "..."
+    slow_query_logger.warning("Slow query (%.1fms): %s | parameters: %s", elapsed * 1000, statement, shown)
+    if (SLOW_QUERY_EXPLAIN and not executemany and EXPLAINABLE.match(statement)
+            and len(_pending_explains) < MAX_PENDING_EXPLAINS):
+        # Never on the connection that ran the query: it may still be
+        # streaming rows, and EXPLAIN would count against this request
+        task = asyncio.get_running_loop().create_task(explain(engine, statement, parameters))
+        _pending_explains.add(task)
+        task.add_done_callback(_pending_explains.discard)
+
+async def explain(engine, statement, parameters) -> None:
+    prefix = "EXPLAIN " if engine.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+    try:
+        async with engine.connect() as connection:
+            info = connection.info
+            info["explaining"] = True
+            try:
+                rows = await connection.exec_driver_sql(prefix + statement, parameters)
+                plan = "\n".join(" ".join(str(value) for value in row) for row in rows)
+            finally:
+                info.pop("explaining", None)
+        slow_query_logger.warning("Plan for slow query: %s\n%s", statement, plan)
+    except Exception:
+        slow_query_logger.exception("EXPLAIN failed for slow query: %s", statement)
+
+class Profiler:
+    """Whole-call profiler for a sampled request. cProfile sees every
+    coroutine that runs on the event loop meanwhile, so profile under light
+    load or read the request's own frames from the dump. Only one profiler
+    can be active per thread; overlapping requests get the breakdown only."""
+
+    active = False
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self._profiler = None
+
+    def start(self) -> None:
+        if Profiler.active or self.tool not in ("cprofile", "pyinstrument"):
+            return
+        if self.tool == "pyinstrument":
+            from pyinstrument import Profiler as PyinstrumentProfiler
+            self._profiler = PyinstrumentProfiler(async_mode="enabled")
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        Profiler.active = True
+
+    def stop(self, name: str) -> Optional[str]:
+        if self._profiler is None:
+            return None
+        Profiler.active = False
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self.tool == "pyinstrument":
+            self._profiler.stop()
+            path = os.path.join(PROFILE_DIR, f"{name}.html")
+            with open(path, "w") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.disable()
+            path = os.path.join(PROFILE_DIR, f"{name}.prof")
+            self._profiler.dump_stats(path)
+        return path
+
+def should_profile(scope) -> bool:
+    if PROFILING_ENABLED:
+        header = PROFILE_HEADER.lower().encode()
+        for key, value in scope["headers"]:
+            if key == header and value not in (b"", b"0", b"false"):
+                return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def profile_name(scope) -> str:
+    route = getattr(scope.get("route"), "path", scope["path"])
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}-{slug}"
+
+def server_timing(phases) -> bytes:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()).encode()
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; costs one random() call for requests that are
+    not profiled"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        profiler = Profiler(PROFILE_TOOL)
+        started = time.perf_counter()
+        phases = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Timings stop when the response starts; a streamed body is
+                # not part of the breakdown
+                now = time.perf_counter()
+                serialize = now - profile.endpoint_finished_at if profile.endpoint_finished_at else 0.0
+                phases.update(
+                    sql=profile.sql_seconds,
+                    endpoint=max(profile.endpoint_seconds - profile.sql_seconds, 0.0),
+                    serialize=serialize,
+                    other=max(now - started - profile.endpoint_seconds - serialize, 0.0),
+                    total=now - started,
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", server_timing(phases))]}
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = profiler.stop(profile_name(scope))
+            _current_profile.reset(token)
+            logger.info(
+                "Profiled %s %s: %s, %d queries, %d ORM objects%s",
+                scope["method"], scope["path"],
+                ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in phases.items()),
+                profile.queries, profile.orm_objects,
+                f", profile written to {path}" if path else "",
+            )
@@ -0,0 +1,201 @@
+# pubsub.py
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+ADMIN_FEED = "admin"
+NOTIFY_CHANNEL = "watchmaker_events"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7900
+
+class Event:
+    """A published message, serialized once and shared by every subscriber"""
+    __slots__ = ("name", "data")
+
+    def __init__(self, name: str, data: str):
+        self.name = name
+        self.data = data
+
+    def sse(self) -> str:
+        return f"event: {self.name}\ndata: {self.data}\n\n"
+
+    def json(self) -> str:
+        return f'{{"event": {json.dumps(self.name)}, "data": {self.data}}}'
+
+class Subscription:
+    """Bounded queue of events for one connection. Status updates are
+    latest-wins, so a slow consumer loses its oldest events rather than
+    holding memory or blocking publishers."""
+
+    def __init__(self, keys: Set[str], maxsize: int):
+        self.keys = keys
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, event: Event) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None when `timeout` seconds pass without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class MemoryBroker:
+    """In-process fan-out; publishes only reach subscribers of this worker"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def subscribe(self, *keys: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(set(keys), self.queue_size)
+        for key in keys:
+            self._subscribers.setdefault(key, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            for key in keys:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+    def deliver(self, keys: Iterable[str], event: Event) -> None:
+        # A subscriber listening on both the id and reference key of a
+        # repair gets the event once
+        targets = set()
+        for key in keys:
+            targets.update(self._subscribers.get(key, ()))
+        for subscription in targets:
+            subscription.put(event)
+
+    async def publish(self, keys: Iterable[str], name: str, data: Any) -> None:
+        """Send `data` to subscribers of any of `keys` and to the admin feed"""
+        self.published += 1
+        self.deliver([*keys, ADMIN_FEED], Event(name, json.dumps(jsonable_encoder(data))))
+
+    def stats(self) -> Dict[str, Any]:
+        subscriptions = set().union(*self._subscribers.values()) if self._subscribers else set()
+        return {
+            "backend": self.__class__.__name__,
+            "subscribers": len(subscriptions),
+            "published": self.published,
+            "dropped": sum(subscription.dropped for subscription in subscriptions),
+        }
+
+class PostgresBroker(MemoryBroker):
+    """Relays publishes through PostgreSQL LISTEN/NOTIFY so every worker
+    (and every host) delivers them to its own subscribers.
+
+    Uses two dedicated asyncpg connections outside the SQLAlchemy pool: one
+    that only listens and one for NOTIFY, since asyncpg allows a single
+    operation at a time per connection. Events published by this worker
+    come back through its own listener, so there is one delivery path.
+    """
+
+    def __init__(self, database_url: str, queue_size: int = 100, reconnect_delay: float = 2.0):
+        super().__init__(queue_size)
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.reconnect_delay = reconnect_delay
+        self._publish_connection = None
+        self._publish_lock = asyncio.Lock()
+        self._listen_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._listen_task is None:
+            self._listen_task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            await asyncio.gather(self._listen_task, return_exceptions=True)
+            self._listen_task = None
+        await self._close_publish_connection()
+
+    async def _close_publish_connection(self) -> None:
+        connection, self._publish_connection = self._publish_connection, None
+        if connection is None:
+            return
+        try:
+            await connection.close(timeout=self.reconnect_delay)
+        except Exception:
+            # Already broken: drop the socket without the goodbye message
+            connection.terminate()
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                await closed.wait()
+                logger.warning("LISTEN connection closed, reconnecting")
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception:
+                logger.exception("LISTEN connection failed, retrying in %ss", self.reconnect_delay)
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            self.deliver(message["keys"], Event(message["event"], json.dumps(message["data"])))
+        except (ValueError, KeyError):
+            logger.exception("Ignoring malformed notification")
+
+    async def publish(self, keys: Iterable[str], name: str, data: Any) -> None:
+        import asyncpg
+
+        self.published += 1
+        data = jsonable_encoder(data)
+        payload = json.dumps({"keys": [*keys, ADMIN_FEED], "event": name, "data": data})
+        if len(payload.encode()) > MAX_NOTIFY_BYTES:
+            # Long notes can overflow NOTIFY; subscribers get the identifying
+            # fields and can fetch the rest from the status endpoint
+            data = {field: data.get(field) for field in ("id", "reference_number", "status")}
+            payload = json.dumps({"keys": [*keys, ADMIN_FEED], "event": name, "data": {**data, "partial": True}})
+
+        async with self._publish_lock:
+            try:
+                if self._publish_connection is None or self._publish_connection.is_closed():
+                    self._publish_connection = await asyncpg.connect(self.dsn)
+                await self._publish_connection.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, payload)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                # Subscribers can always fall back to polling; never fail the write
+                logger.exception("NOTIFY failed for %s", name)
+                await self._close_publish_connection()
+
+def create_broker(backend: str, database_url: str, queue_size: int = 100):
+    """'memory' (default) or 'postgresql' for LISTEN/NOTIFY across workers"""
+    if not backend or backend == "memory":
+        return MemoryBroker(queue_size)
+    if backend == "postgresql":
+        return PostgresBroker(database_url, queue_size)
+    raise ValueError(f"Unknown pub/sub backend: {backend}")
@@ -0,0 +1,51 @@
+# references.py
+from typing import List
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ReferenceCounter, reference_number_seq
+from utils import generate_reference_number
+
+REFERENCE_COUNTER_NAME = 'repair_reference_number'
+
+async def next_reference_value(db: AsyncSession) -> int:
+    """Allocate the next reference sequence value in a single round trip.
+
+    PostgreSQL uses a real sequence, which never hands out the same value
+    twice and does not block concurrent transactions. Other backends bump a
+    counter row; the UPDATE holds the row lock until commit, which
+    serializes submissions but keeps values unique.
+    """
+    if db.bind.dialect.name == 'postgresql':
+        return await db.scalar(reference_number_seq.next_value())
+    
+    return await db.scalar(
+        update(ReferenceCounter)
+        .where(ReferenceCounter.name == REFERENCE_COUNTER_NAME)
+        .values(value=ReferenceCounter.value + 1)
+        .returning(ReferenceCounter.value)
+    )
+
+async def next_reference_number(db: AsyncSession) -> str:
+    return generate_reference_number(await next_reference_value(db))
+
+async def allocate_reference_numbers(db: AsyncSession, count: int) -> List[str]:
+    """Allocate `count` reference numbers in one round trip for bulk inserts"""
+    if count <= 0:
+        return []
+    
+    if db.bind.dialect.name == 'postgresql':
+        values = (await db.scalars(
+            select(reference_number_seq.next_value()).select_from(func.generate_series(1, count))
+        )).all()
+    else:
+        last_value = await db.scalar(
+            update(ReferenceCounter)
+            .where(ReferenceCounter.name == REFERENCE_COUNTER_NAME)
+            .values(value=ReferenceCounter.value + count)
+            .returning(ReferenceCounter.value)
+        )
+        values = range(last_value - count + 1, last_value + 1)
+    
+    return [generate_reference_number(value) for value in values]
@@ -0,0 +1,213 @@
+# replicas.py
+"""
+Read-replica routing for the read-only endpoints
+GET endpoints take their session from get_read_db, which binds it to one of
+the DATABASE_REPLICA_URLS engines in round-robin order; writes keep using
+get_db and the primary. ReplicaRouter checks every replica each
+REPLICA_HEALTH_INTERVAL seconds and skips the ones that are unreachable or
+replaying more than REPLICA_MAX_LAG seconds behind; with none healthy (or
+none configured) reads go to the primary.
+
+Read-your-writes: a successful write response sets a short-lived cookie
+(ReadYourWritesMiddleware), and requests carrying it read from the primary
+until the replicas have had time to catch up. Writes refill the status
+cache from the primary themselves, and the form catalog cache only ever
+reloads from the primary, so a lagging replica cannot cache stale data for
+other clients.
+
+Local testing with SQLite: copy the database file and point a replica at
+the copy, e.g. DATABASE_REPLICA_URLS=sqlite:///./replica.db (reads then see
+the copy until it is refreshed, which makes the routing easy to observe).
+"""
+import asyncio
+import itertools
+import logging
+import math
+from typing import Dict, List, Optional
+
+from decouple import Csv, config
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database import AsyncSessionLocal, engine, engine_options, get_async_url
+
+logger = logging.getLogger("watchmaker.replicas")
+
+# Comma separated; empty sends every read to DATABASE_URL
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+REPLICA_HEALTH_INTERVAL = config('REPLICA_HEALTH_INTERVAL', default=5, cast=float)
+REPLICA_HEALTH_TIMEOUT = config('REPLICA_HEALTH_TIMEOUT', default=2, cast=float)
+# Replicas further behind than this are skipped until they catch up
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=float)
+# How long a client reads from the primary after one of its writes
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=REPLICA_MAX_LAG, cast=float)
+PRIMARY_COOKIE = "watchmaker_primary"
+
+# Seconds of WAL the replica has received but not replayed yet; 0 when it
+# is caught up (an idle primary sends nothing, so the last replayed
+# transaction can be old without the replica being behind)
+POSTGRESQL_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        options = engine_options(url)
+        if 'pool_size' in options:
+            # Keep the primary's pool metrics about the primary
+            options['poolclass'] = AsyncAdaptedQueuePool
+        self.engine: AsyncEngine = create_async_engine(get_async_url(url), **options)
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reads = 0
+
+    async def check(self) -> None:
+        try:
+            async with self.engine.connect() as connection:
+                if self.engine.dialect.name == 'postgresql':
+                    lag = float(await connection.scalar(POSTGRESQL_LAG_SQL))
+                else:
+                    await connection.execute(text("SELECT 1"))
+                    lag = 0.0
+        except Exception as e:
+            self.mark_down(f"{e.__class__.__name__}: {str(e).splitlines()[0]}")
+            return
+        if lag > REPLICA_MAX_LAG:
+            self.mark_down(f"Lagging {lag:.1f}s behind the primary", lag)
+            return
+        self.lag_seconds = lag
+        self.error = None
+        self._set_healthy(True)
+
+    def mark_down(self, error: str, lag_seconds: Optional[float] = None) -> None:
+        self.lag_seconds = lag_seconds
+        self.error = error
+        self._set_healthy(False)
+
+    def _set_healthy(self, healthy: bool) -> None:
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Replica %s is back in rotation", self.name)
+            else:
+                logger.warning("Replica %s taken out of rotation: %s", self.name, self.error)
+        self.healthy = healthy
+
+    def as_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "error": self.error,
+            "reads": self.reads,
+        }
+
+class ReplicaRouter:
+    """Round-robin over the healthy replicas, checked in the background"""
+
+    def __init__(self, urls: List[str], interval: float = REPLICA_HEALTH_INTERVAL):
+        self.replicas = [Replica(url) for url in urls if url]
+        self.interval = interval
+        # Reads sent to the primary because no replica was healthy
+        self.primary_fallbacks = 0
+        self._turn = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> AsyncEngine:
+        """Engine for the next read; the primary when no replica is healthy"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            if self.replicas:
+                self.primary_fallbacks += 1
+            return engine
+        replica = healthy[next(self._turn) % len(healthy)]
+        replica.reads += 1
+        return replica.engine
+
+    async def check(self) -> None:
+        results = await asyncio.gather(*(
+            asyncio.wait_for(replica.check(), REPLICA_HEALTH_TIMEOUT) for replica in self.replicas
+        ), return_exceptions=True)
+        for replica, result in zip(self.replicas, results):
+            # A check that timed out never got to mark the replica itself
+            if isinstance(result, asyncio.TimeoutError):
+                replica.mark_down(f"Health check timed out after {REPLICA_HEALTH_TIMEOUT:g}s")
+
+    async def start(self) -> None:
+        """Check once before serving, then keep checking in the background"""
+        if not self.replicas:
+            return
+        await self.check()
+        if self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Replica health check failed")
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "healthy": sum(1 for replica in self.replicas if replica.healthy),
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [replica.as_dict() for replica in self.replicas],
+        }
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+async def get_read_db(request: Request):
+    """Session for read-only endpoints: a replica, or the primary for
+    clients that have just written"""
+    if replica_router.enabled and request.cookies.get(PRIMARY_COOKIE):
+        bind = engine
+    else:
+        bind = replica_router.choose()
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
+
+class ReadYourWritesMiddleware:
+    """Marks clients that just wrote successfully so get_read_db keeps them
+    on the primary for REPLICA_STICKY_SECONDS"""
+
+    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (
+            f"{PRIMARY_COOKIE}=1; Max-Age={max(math.ceil(REPLICA_STICKY_SECONDS), 1)}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        ).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS or not replica_router.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message = dict(message, headers=[*message.get("headers", []), (b"set-cookie", self.cookie)])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
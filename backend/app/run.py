@@ -3,14 +3,38 @@
 Startup script for the Watchmaker API
 This script will:
 1. Check environment setup
-2. Setup initial data
+2. Setup initial data, unless the alembic migrations are already current
 3. Start the API server
+
+By default the server is a single development process with --reload. With
+--production it runs under gunicorn: WEB_CONCURRENCY uvicorn workers (one
+per available core by default) forked from an app imported once in the
+master. Each worker fills its connection pool and loads the catalog before
+it accepts connections. SIGTERM stops accepting, lets in-flight requests
+finish for up to GRACEFUL_TIMEOUT seconds, then closes the pools. The
+startup phases and each worker's time from launch to ready are logged.
+
+Usage:
+    python run.py
+    python run.py --production --workers 4 --port 8000
+    python run.py --production --migrate    # apply pending migrations first
 """
+import argparse
+import logging
+import os
 import subprocess
 import sys
-import os
+import tempfile
+import time
+
+from decouple import config
+
 from setup_database import setup_database
 
+KEEPALIVE = config('KEEPALIVE', default=5, cast=int)
+LOG_LEVEL = config('LOG_LEVEL', default='info')
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
 def run_command(command, description):
     """Run a shell command and handle errors"""
     print(f"🔄 {description}...")
@@ -23,9 +47,126 @@ def run_command(command, description):
         print(f"Error: {e.stderr}")
         return False
 
+def available_cores():
+    """Cores this process may run on (honours CPU affinity and cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def schema_revisions():
+    """(current, head) alembic revisions for DATABASE_URL"""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from sqlalchemy import create_engine
+    from database import DATABASE_URL
+
+    heads = set(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+    engine = create_engine(DATABASE_URL)
+    try:
+        with engine.connect() as connection:
+            current = set(MigrationContext.configure(connection).get_current_heads())
+    finally:
+        engine.dispose()
+    return current, heads
+
+def prepare_database(production, migrate):
+    """Skip schema setup when the database is at the latest migration;
+    otherwise create it (development) or migrate it (production, --migrate)"""
+    started = time.perf_counter()
+    current, heads = schema_revisions()
+    if current == heads:
+        print(f"✅ Database schema is at the latest migration ({', '.join(sorted(heads))}); skipping setup "
+              f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+        return
+
+    if production:
+        if not migrate:
+            print(f"❌ Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+                  f"expected {', '.join(sorted(heads))}")
+            print("💡 Run `alembic upgrade head`, or pass --migrate to apply the migrations now")
+            sys.exit(1)
+        from alembic import command
+        from alembic.config import Config
+
+        print("🔄 Applying database migrations...")
+        command.upgrade(Config(ALEMBIC_INI), "head")
+        setup_database(create_tables=False)
+    else:
+        setup_database()
+    print(f"✅ Database ready in {time.perf_counter() - started:.2f}s")
+
+def run_development():
+    print("🌐 API will be available at: http://localhost:8000")
+    print("📚 API docs will be available at: http://localhost:8000/docs")
+    print("🛑 Press Ctrl+C to stop the server")
+
+    try:
+        subprocess.run(["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000", "--reload"])
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped. Goodbye!")
+
+def run_production(host, port, workers):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn_worker import GRACEFUL_TIMEOUT
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # With preload_app this runs once in the master; workers are
+            # forked with main already imported
+            started = time.perf_counter()
+            from main import app
+            print(f"📦 App preloaded in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return app
+
+    def when_ready(server):
+        print(f"🌐 Listening on http://{host}:{port} with {workers} workers "
+              f"({time.time() - float(os.environ['WATCHMAKER_LAUNCHED_AT']):.2f}s after launch)")
+
+    def child_exit(server, worker):
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(worker.pid)
+
+    def on_exit(server):
+        print("👋 Server stopped. Goodbye!")
+
+    ProductionServer({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn_worker.GracefulUvicornWorker",
+        "preload_app": True,
+        # Headroom over uvicorn's drain for the shutdown hooks (broker, pool)
+        "graceful_timeout": GRACEFUL_TIMEOUT + 5,
+        "keepalive": KEEPALIVE,
+        "loglevel": LOG_LEVEL,
+        "when_ready": when_ready,
+        "child_exit": child_exit,
+        "on_exit": on_exit,
+    }).run()
+
 def main():
+    parser = argparse.ArgumentParser(description="Start the Watchmaker API")
+    parser.add_argument("--production", action="store_true", help="Multi-worker gunicorn server without --reload")
+    parser.add_argument("--workers", type=int, default=config('WEB_CONCURRENCY', default=available_cores(), cast=int))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=config('PORT', default=8000, cast=int))
+    parser.add_argument("--migrate", action="store_true", help="Apply pending migrations before starting (production)")
+    args = parser.parse_args()
+
+    # Workers report their time to ready against this
+    os.environ["WATCHMAKER_LAUNCHED_AT"] = str(time.time())
     print("🚀 Starting Watchmaker API setup...")
-    
+
     # Check if .env file exists
     if not os.path.exists('.env'):
         print("⚠️  .env file not found. Creating one with default settings...")
@@ -34,26 +175,31 @@ def main():
             f.write("SECRET_KEY=your-secret-key-here\n")
             f.write("DEBUG=True\n")
         print("✅ Created .env file. Please update it with your database credentials.")
-    
+
+    if args.production:
+        logging.basicConfig(level=LOG_LEVEL.upper(), format="[%(process)d] [%(levelname)s] %(name)s: %(message)s")
+        if args.workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+            # Must be set before prometheus_client is imported (by main)
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="watchmaker-metrics-")
+
     # Setup initial data
-    print("🔄 Setting up initial database data...")
+    print("🔄 Checking database schema...")
     try:
-        setup_database()
+        prepare_database(args.production, args.migrate)
     except Exception as e:
         print(f"❌ Database setup failed: {str(e)}")
         print("💡 Make sure PostgreSQL is running and your .env file has correct database credentials")
         sys.exit(1)
-    
+
     # Start the API server
     print("🔄 Starting API server...")
-    print("🌐 API will be available at: http://localhost:8000")
-    print("📚 API docs will be available at: http://localhost:8000/docs")
-    print("🛑 Press Ctrl+C to stop the server")
-    
-    try:
-        subprocess.run(["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000", "--reload"])
-    except KeyboardInterrupt:
-        print("\n👋 Server stopped. Goodbye!")
+    if args.production:
+        from database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+        print(f"🔌 Up to {args.workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)} database connections "
+              f"({args.workers} workers × {DB_POOL_SIZE} + {DB_MAX_OVERFLOW} overflow)")
+        run_production(args.host, args.port, args.workers)
+    else:
+        run_development()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
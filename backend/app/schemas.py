@@ -1,9 +1,16 @@
 # schemas.py
-from pydantic import BaseModel, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, PlainSerializer, field_validator
+from typing import Annotated, Dict, List, Optional, Union
 from datetime import datetime
 from decimal import Decimal
-import re
+from uuid import UUID
+from fastapi.encoders import decimal_encoder
+
+from cpf import format_key, normalize
+
+# Amounts in response models go out as JSON numbers, the way jsonable_encoder
+# rendered them before the endpoints had models (pydantic would send strings)
+Price = Annotated[Decimal, PlainSerializer(decimal_encoder, return_type=Union[int, float], when_used="json")]
 
 class WatchBrandBase(BaseModel):
     name: str
@@ -13,7 +20,7 @@ class WatchBrandCreate(WatchBrandBase):
     pass
 
 class WatchBrand(WatchBrandBase):
-    id: str
+    id: UUID
     created_at: datetime
     
     class Config:
@@ -29,7 +36,7 @@ class RepairTypeCreate(RepairTypeBase):
     pass
 
 class RepairType(RepairTypeBase):
-    id: str
+    id: UUID
     created_at: datetime
     
     class Config:
@@ -45,33 +52,8 @@ class CustomerData(BaseModel):
     @field_validator('cpf')
     @classmethod
     def validate_cpf(cls, v):
-        # Remove non-digits
-        cpf = re.sub(r'\D', '', v)
-        
-        # Check if CPF has 11 digits
-        if len(cpf) != 11:
-            raise ValueError('CPF must have 11 digits')
-        
-        # Check if all digits are the same
-        if cpf == cpf[0] * 11:
-            raise ValueError('Invalid CPF')
-        
-        # Calculate verification digits
-        def calculate_digit(cpf_partial):
-            sum_val = sum(int(digit) * weight for digit, weight in zip(cpf_partial, range(len(cpf_partial) + 1, 1, -1)))
-            remainder = sum_val % 11
-            return 0 if remainder < 2 else 11 - remainder
-        
-        # Validate first digit
-        if int(cpf[9]) != calculate_digit(cpf[:9]):
-            raise ValueError('Invalid CPF')
-        
-        # Validate second digit
-        if int(cpf[10]) != calculate_digit(cpf[:10]):
-            raise ValueError('Invalid CPF')
-        
-        # Format CPF
-        return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+        # Stored and displayed formatted; lookups use Customer.cpf_key
+        return format_key(normalize(v))
 
 class WatchData(BaseModel):
     brand_id: str
@@ -87,22 +69,81 @@ class RepairRequestCreate(BaseModel):
     repair_data: RepairData
     create_customer_account: bool = False
 
+class RepairRequestSummary(BaseModel):
+    id: str
+    reference_number: str
+    status: str
+    created_at: datetime
+
+class RepairRequestCreated(BaseModel):
+    success: bool
+    repair_request: RepairRequestSummary
+    customer_account_created: bool
+    message: str
+
+class RepairStatusResponse(BaseModel):
+    """Public status payload; also the shape kept in the status cache"""
+    id: str
+    reference_number: str
+    status: str
+    estimated_completion: Optional[datetime] = None
+    customer_name: str
+    watch_brand: str
+    repair_types: List[str]
+    created_at: datetime
+    notes: Optional[str] = None
+
+class RepairListItem(BaseModel):
+    id: str
+    reference_number: str
+    customer_name: str
+    customer_phone: str
+    watch_brand: str
+    watch_type: str
+    repair_types: List[str]
+    status: str
+    total_price: Optional[Price] = None
+    created_at: datetime
+
+class Pagination(BaseModel):
+    current_page: Optional[int] = None  # None when paging by cursor
+    total_pages: Optional[int] = None
+    total_items: Optional[int] = None  # None with include_total=false
+    next_cursor: Optional[str] = None
+
+class CursorPagination(BaseModel):
+    """Keyset pagination: no page numbers or totals"""
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+class RepairRequestList(BaseModel):
+    repair_requests: List[RepairListItem]
+    pagination: Pagination
+    archived_items: Optional[int] = None  # matching repairs in the archive, not listed; None with include_total=false
+
+class RepairTypeSummary(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+
 class RepairRequestResponse(BaseModel):
     id: str
     reference_number: str
     customer_name: str
+    customer_cpf: str
     customer_phone: str
-    watch_brand_name: str
+    customer_address: str
+    customer_email: Optional[str] = None
+    watch_brand: str
     watch_type: str
-    repair_type_names: List[str]
+    repair_types: List[RepairTypeSummary]
     problem_description: str
     status: str
     estimated_completion: Optional[datetime] = None
-    total_price: Optional[Decimal] = None
+    total_price: Optional[Price] = None
+    internal_notes: Optional[str] = None
     created_at: datetime
-    
-    class Config:
-        from_attributes = True
+    updated_at: datetime
 
 class RepairRequestUpdate(BaseModel):
     status: Optional[str] = None
@@ -110,10 +151,191 @@ class RepairRequestUpdate(BaseModel):
     total_price: Optional[Decimal] = None
     internal_notes: Optional[str] = None
 
+class RepairRequestBatchItem(BaseModel):
+    id: str
+    status: Optional[str] = None
+    estimated_completion: Optional[datetime] = None
+    total_price: Optional[Decimal] = None
+
+class RepairRequestBatchUpdate(BaseModel):
+    updates: List[RepairRequestBatchItem] = Field(min_length=1, max_length=500)
+
 class FormData(BaseModel):
     watch_brands: List[WatchBrand]
     repair_types: List[RepairType]
 
 class CustomerCheck(BaseModel):
     exists: bool
-    customer: Optional[CustomerData] = None
\ No newline at end of file
+    customer: Optional[CustomerData] = None
+
+class CustomerRepairItem(BaseModel):
+    id: str
+    reference_number: str
+    status: str
+    watch_brand: str
+    watch_type: str
+    repair_types: List[str]
+    total_price: Optional[Price] = None
+    estimated_completion: Optional[datetime] = None
+    created_at: datetime
+    archived: bool
+
+class CustomerRepairHistory(BaseModel):
+    customer_id: str
+    customer_name: str
+    repair_requests: List[CustomerRepairItem]
+    pagination: CursorPagination
+
+class BatchItemResult(BaseModel):
+    id: str
+    success: bool
+    status: Optional[str] = None  # status after the update
+    error: Optional[str] = None
+
+class RepairRequestBatchResult(BaseModel):
+    success: bool
+    updated: int
+    failed: int
+    results: List[BatchItemResult]
+
+class SuccessResponse(BaseModel):
+    success: bool
+    message: str
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    success: bool
+    total_rows: int
+    created: int
+    failed: int
+    errors: List[ImportRowError]
+
+class StatusTotals(BaseModel):
+    count: int
+    revenue: Price
+
+class StatsSummary(BaseModel):
+    total_repairs: int
+    total_revenue: Price
+    by_status: Dict[str, StatusTotals]
+    completed_count: int
+    average_turnaround_hours: Optional[float] = None
+
+class DimensionStats(StatsSummary):
+    key: str
+    name: str
+
+class DashboardStats(BaseModel):
+    totals: StatsSummary
+    by_brand: List[DimensionStats]
+    by_repair_type: List[DimensionStats]
+    by_watch_type: List[DimensionStats]
+
+class StatusEventItem(BaseModel):
+    from_status: Optional[str] = None
+    to_status: str
+    changed_at: datetime
+    dwell_seconds: Optional[int] = None
+
+class RepairTimeline(BaseModel):
+    repair_request_id: str
+    events: List[StatusEventItem]
+
+class StageDwellTime(BaseModel):
+    """Time spent in `status` by repairs that left it within the window"""
+    status: str
+    count: int
+    average_hours: Optional[float] = None
+    p50_hours: Optional[float] = None
+    p90_hours: Optional[float] = None
+    p99_hours: Optional[float] = None
+
+class DimensionDwellTimes(BaseModel):
+    key: str
+    name: str
+    stages: List[StageDwellTime]
+
+class DwellTimeStats(BaseModel):
+    changed_from: datetime
+    changed_to: datetime
+    overall: List[StageDwellTime]
+    by_brand: List[DimensionDwellTimes]
+    by_repair_type: List[DimensionDwellTimes]
+
+class RepairSearchResult(BaseModel):
+    id: str
+    reference_number: str
+    customer_name: str
+    customer_cpf: str
+    customer_phone: str
+    watch_brand: str
+    status: str
+    created_at: datetime
+    rank: float
+
+class CustomerSearchResult(BaseModel):
+    id: str
+    name: str
+    cpf: str
+    phone: str
+    email: Optional[str] = None
+    rank: float
+
+class SearchResults(BaseModel):
+    repairs: List[RepairSearchResult]
+    customers: List[CustomerSearchResult]
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    errors: int
+    hit_ratio: Optional[float] = None
+
+class StatusCacheStats(BaseModel):
+    status_cache: CacheStats
+
+class PoolStatus(BaseModel):
+    pool: str
+    # Occupancy is only reported by queue pools (not NullPool)
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int
+    checkout_wait_seconds_total: float
+    checkout_wait_seconds_avg: Optional[float] = None
+    checkout_wait_seconds_max: float
+    exhausted: int
+    timeouts: int
+    overflow_connects: int
+    invalidated: int
+
+class ReplicaStatus(BaseModel):
+    name: str
+    healthy: bool
+    lag_seconds: Optional[float] = None
+    error: Optional[str] = None
+    reads: int
+
+class ReplicaRouterStatus(BaseModel):
+    enabled: bool
+    healthy: int
+    primary_fallbacks: int
+    replicas: List[ReplicaStatus]
+
+class BrokerStats(BaseModel):
+    backend: str
+    subscribers: int
+    published: int
+    dropped: int
+
+class ServiceInfo(BaseModel):
+    message: str
+    status: str
+
+class HealthCheck(BaseModel):
+    status: str
+    timestamp: datetime
@@ -0,0 +1,152 @@
+# search.py
+import re
+from typing import Dict, List
+
+from sqlalchemy import select, func, case, literal_column, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RepairRequest, Customer, WatchBrand
+
+MIN_QUERY_LENGTH = 3  # trigram matching needs at least one full trigram
+
+def digits_expression(column):
+    """Same expression as the *_digits_trgm indexes, so PostgreSQL can use them"""
+    return func.regexp_replace(column, literal_column("'[^0-9]'"), literal_column("''"), literal_column("'g'"))
+
+def joined_digits(first, second):
+    return digits_expression(first).op("||")(literal_column("' '")).op("||")(digits_expression(second))
+
+def fts_phrase(term: str) -> str:
+    """Quote a user string as a single FTS5 phrase"""
+    return '"' + term.replace('"', '""') + '"'
+
+def repair_row(row, rank) -> Dict:
+    return {
+        "id": str(row.id),
+        "reference_number": row.reference_number,
+        "customer_name": row.customer_name,
+        "customer_cpf": row.customer_cpf,
+        "customer_phone": row.customer_phone,
+        "watch_brand": row.watch_brand,
+        "status": row.status.value,
+        "created_at": row.created_at,
+        "rank": float(rank or 0),
+    }
+
+def customer_row(row, rank) -> Dict:
+    return {
+        "id": str(row.id),
+        "name": row.name,
+        "cpf": row.cpf,
+        "phone": row.phone,
+        "email": row.email,
+        "rank": float(rank or 0),
+    }
+
+REPAIR_COLUMNS = (
+    RepairRequest.id,
+    RepairRequest.reference_number,
+    RepairRequest.customer_name,
+    RepairRequest.customer_cpf,
+    RepairRequest.customer_phone,
+    WatchBrand.name.label("watch_brand"),
+    RepairRequest.status,
+    RepairRequest.created_at,
+)
+CUSTOMER_COLUMNS = (Customer.id, Customer.name, Customer.cpf, Customer.phone, Customer.email)
+
+async def search_postgresql(db: AsyncSession, term: str, digits: str, limit: int) -> Dict[str, List[Dict]]:
+    # Every OR branch matches one of the GIN expression indexes in models.py,
+    # which lets the planner combine them with a BitmapOr instead of scanning
+    pattern = f"%{term.lower()}%"
+    config = literal_column("'portuguese'::regconfig")
+
+    document = func.to_tsvector(config, RepairRequest.problem_description)
+    ts_query = func.websearch_to_tsquery(config, term)
+    repair_digits = joined_digits(RepairRequest.customer_cpf, RepairRequest.customer_phone)
+    repair_conditions = [
+        document.op("@@")(ts_query),
+        func.lower(RepairRequest.customer_name).like(pattern),
+        func.lower(RepairRequest.reference_number).like(pattern),
+    ]
+    rank_terms = [
+        func.ts_rank(document, ts_query),
+        func.similarity(func.lower(RepairRequest.customer_name), term.lower()),
+    ]
+    if digits:
+        repair_conditions.append(repair_digits.like(f"%{digits}%"))
+        rank_terms.append(case((repair_digits.like(f"%{digits}%"), 1.0), else_=0.0))
+    repair_rank = func.greatest(*rank_terms)
+    repairs = await db.execute(
+        select(*REPAIR_COLUMNS, repair_rank.label("rank"))
+        .join(WatchBrand, WatchBrand.id == RepairRequest.watch_brand_id)
+        .where(or_(*repair_conditions))
+        .order_by(literal_column("rank").desc(), RepairRequest.created_at.desc())
+        .limit(limit)
+    )
+
+    customer_digits = joined_digits(Customer.cpf, Customer.phone)
+    customer_conditions = [func.lower(Customer.name).like(pattern)]
+    if digits:
+        customer_conditions.append(customer_digits.like(f"%{digits}%"))
+    customers = await db.execute(
+        select(*CUSTOMER_COLUMNS, func.similarity(func.lower(Customer.name), term.lower()).label("rank"))
+        .where(or_(*customer_conditions))
+        .order_by(literal_column("rank").desc(), Customer.name)
+        .limit(limit)
+    )
+
+    return {
+        "repairs": [repair_row(row, row.rank) for row in repairs],
+        "customers": [customer_row(row, row.rank) for row in customers],
+    }
+
+async def search_sqlite(db: AsyncSession, term: str, digits: str, limit: int) -> Dict[str, List[Dict]]:
+    match = fts_phrase(term)
+    if digits and digits != term:
+        match = f"{match} OR {fts_phrase(digits)}"
+
+    # bm25() is lower for better matches; negate it so higher rank is better
+    repair_ids = (await db.execute(
+        text("SELECT rowid, -bm25(repair_search) AS rank FROM repair_search "
+             "WHERE repair_search MATCH :match ORDER BY rank DESC LIMIT :limit"),
+        {"match": match, "limit": limit},
+    )).all()
+    customer_ids = (await db.execute(
+        text("SELECT rowid, -bm25(customer_search) AS rank FROM customer_search "
+             "WHERE customer_search MATCH :match ORDER BY rank DESC LIMIT :limit"),
+        {"match": match, "limit": limit},
+    )).all()
+
+    repair_ranks = dict(repair_ids)
+    customer_ranks = dict(customer_ids)
+    repairs = (await db.execute(
+        select(*REPAIR_COLUMNS, literal_column("repair_requests.rowid").label("rowid"))
+        .join(WatchBrand, WatchBrand.id == RepairRequest.watch_brand_id)
+        .where(literal_column("repair_requests.rowid").in_(list(repair_ranks)))
+    )).all() if repair_ranks else []
+    customers = (await db.execute(
+        select(*CUSTOMER_COLUMNS, literal_column("customers.rowid").label("rowid"))
+        .where(literal_column("customers.rowid").in_(list(customer_ranks)))
+    )).all() if customer_ranks else []
+
+    def ranked(rows, ranks, to_dict):
+        return sorted((to_dict(row, ranks[row.rowid]) for row in rows), key=lambda item: item["rank"], reverse=True)
+
+    return {
+        "repairs": ranked(repairs, repair_ranks, repair_row),
+        "customers": ranked(customers, customer_ranks, customer_row),
+    }
+
+async def search(db: AsyncSession, term: str, limit: int = 20) -> Dict[str, List[Dict]]:
+    """Ranked repairs and customers matching a name, CPF/phone fragment,
+    reference number or words in the problem description"""
+    term = term.strip()
+    digits = re.sub(r"\D", "", term)
+    # A digit or two inside a word query ("Rolex 2") would match nearly every
+    # CPF and phone number
+    if len(digits) < MIN_QUERY_LENGTH:
+        digits = ""
+    if db.bind.dialect.name == "postgresql":
+        return await search_postgresql(db, term, digits, limit)
+    return await search_sqlite(db, term, digits, limit)
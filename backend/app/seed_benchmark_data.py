@@ -0,0 +1,185 @@
+# seed_benchmark_data.py
+"""
+Synthetic dataset for benchmark.py
+Fills DATABASE_URL (PostgreSQL or SQLite) with customers and repair requests
+spread over the last --days days, with a realistic status mix, repair type
+combinations and prices. Rows go in with multi-row INSERTs per batch, and
+the dashboard aggregates and reference numbers are kept consistent, so every
+endpoint behaves as it would on production data. The generated content is
+reproducible for a given --seed; ids and reference numbers are not, so runs
+can be repeated on the same database to grow it.
+
+Usage:
+    python setup_database.py                       # brands and repair types
+    python seed_benchmark_data.py --repairs 2000000 --customers 200000
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from cpf import FIRST_WEIGHTS, SECOND_WEIGHTS, check_digit, cpf_key, format_key
+from database import AsyncSessionLocal, dialect_insert
+from models import Customer, RepairRequest, RepairStatus, RepairType, WatchBrand, WatchType, repair_request_types
+from references import allocate_reference_numbers
+from stats import RepairFacts, StatsDelta
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João",
+               "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vitória", "William"]
+LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+              "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa"]
+PROBLEMS = [
+    "Relógio parou de funcionar", "Vidro trincado após queda", "Atrasa alguns minutos por dia",
+    "Pulseira quebrada no fecho", "Entrou água no mostrador", "Coroa solta, não ajusta a hora",
+    "Ponteiros desalinhados", "Bateria descarrega rápido", "Revisão completa e limpeza",
+    "Adianta quando fica parado", "Fundo com corrosão", "Cronógrafo não zera",
+]
+# Older repairs are mostly finished; the last two weeks are mostly open
+OPEN_WINDOW_DAYS = 14
+OPEN_STATUS_WEIGHTS = {RepairStatus.PENDING: 50, RepairStatus.IN_PROGRESS: 35, RepairStatus.COMPLETED: 10, RepairStatus.DELIVERED: 5}
+CLOSED_STATUS_WEIGHTS = {RepairStatus.PENDING: 2, RepairStatus.IN_PROGRESS: 3, RepairStatus.COMPLETED: 15, RepairStatus.DELIVERED: 80}
+
+def random_cpf(rng: random.Random) -> str:
+    base = "".join(rng.choice("0123456789") for _ in range(9))
+    base += str(check_digit(base, FIRST_WEIGHTS))
+    return format_key(base + str(check_digit(base, SECOND_WEIGHTS)))
+
+def random_phone(rng: random.Random) -> str:
+    return f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(0, 9999):04d}"
+
+def random_person(rng: random.Random) -> dict:
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+    cpf = random_cpf(rng)
+    return {
+        "name": name,
+        "cpf": cpf,
+        "phone": random_phone(rng),
+        "address": f"Rua {rng.choice(LAST_NAMES)}, {rng.randint(1, 3000)}",
+        "email": f"{name.split()[0].lower()}.{cpf[-2:]}{rng.randint(0, 999)}@example.com" if rng.random() < 0.6 else None,
+    }
+
+async def load_catalog(db):
+    brands = (await db.scalars(select(WatchBrand.id).where(WatchBrand.is_active == True))).all()
+    repair_types = (await db.execute(
+        select(RepairType.id, RepairType.estimated_price).where(RepairType.is_active == True)
+    )).all()
+    if not brands or not repair_types:
+        raise SystemExit("❌ No active brands/repair types. Run setup_database.py first.")
+    return brands, repair_types
+
+async def seed_customers(db, rng: random.Random, count: int, batch_size: int) -> list:
+    """Insert customer accounts; returns (id, person) pairs for linking repairs"""
+    customers = []
+    for start in range(0, count, batch_size):
+        now = datetime.utcnow()
+        people = {}
+        while len(people) < min(batch_size, count - start):
+            person = random_person(rng)
+            people[person["cpf"]] = person
+        # CPFs can repeat across batches or earlier runs; the unique index
+        # keeps the existing account and the repairs link to that one
+        await db.execute(
+            dialect_insert(db, Customer).on_conflict_do_nothing(index_elements=[Customer.cpf]),
+            [{"id": uuid.uuid4(), **person, "cpf_key": cpf_key(cpf), "created_at": now, "updated_at": now}
+             for cpf, person in people.items()],
+        )
+        ids = await db.execute(select(Customer.cpf, Customer.id).where(Customer.cpf.in_(list(people))))
+        await db.commit()
+        customers.extend((customer_id, people[cpf]) for cpf, customer_id in ids)
+    return customers
+
+async def seed_repairs(db, rng: random.Random, count: int, days: int, batch_size: int, customers: list, catalog,
+                       account_share: float = 0.4) -> None:
+    """Insert repairs; `account_share` of them belong to one of `customers`"""
+    brands, repair_types = catalog
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        reference_numbers = await allocate_reference_numbers(db, size)
+        repair_rows = []
+        type_rows = []
+        stats_delta = StatsDelta()
+        for reference_number in reference_numbers:
+            repair_id = uuid.uuid4()
+            created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+            age_days = (now - created_at).days
+            weights = OPEN_STATUS_WEIGHTS if age_days < OPEN_WINDOW_DAYS else CLOSED_STATUS_WEIGHTS
+            status = rng.choices(list(weights), list(weights.values()))[0]
+            chosen_types = rng.sample(repair_types, k=rng.choice((1, 1, 1, 2, 2, 3)))
+            price = None
+            if status in (RepairStatus.COMPLETED, RepairStatus.DELIVERED) or rng.random() < 0.3:
+                price = sum((estimated or Decimal(100)) for _, estimated in chosen_types)
+            updated_at = min(now, created_at + timedelta(hours=rng.randint(1, 24 * 21)))
+
+            if customers and rng.random() < account_share:
+                customer_id, person = rng.choice(customers)
+            else:
+                customer_id, person = None, random_person(rng)
+            brand_id = rng.choice(brands)
+            watch_type = rng.choice(list(WatchType))
+            repair_rows.append({
+                "id": repair_id,
+                "reference_number": reference_number,
+                "customer_id": customer_id,
+                "customer_name": person["name"],
+                "customer_cpf": person["cpf"],
+                "customer_phone": person["phone"],
+                "customer_address": person["address"],
+                "customer_email": person["email"],
+                "watch_brand_id": brand_id,
+                "watch_type": watch_type,
+                "problem_description": rng.choice(PROBLEMS),
+                "status": status,
+                "total_price": price,
+                "estimated_completion": created_at + timedelta(days=rng.randint(3, 30)),
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "completed_at": updated_at if status in (RepairStatus.COMPLETED, RepairStatus.DELIVERED) else None,
+            })
+            type_rows.extend({"repair_request_id": repair_id, "repair_type_id": rt_id} for rt_id, _ in chosen_types)
+
+            facts = RepairFacts(brand_id, watch_type, [rt_id for rt_id, _ in chosen_types])
+            stats_delta.created(facts, status, price)
+            if status in (RepairStatus.COMPLETED, RepairStatus.DELIVERED):
+                stats_delta.completed(facts, int((updated_at - created_at).total_seconds()))
+
+        await db.execute(insert(RepairRequest), repair_rows)
+        await db.execute(insert(repair_request_types), type_rows)
+        await stats_delta.apply(db)
+        await db.commit()
+
+        done = start + size
+        rate = done / (time.perf_counter() - started)
+        print(f"   {done:,}/{count:,} repairs ({rate:,.0f}/s)", end="\r", flush=True)
+    print()
+
+async def seed(args) -> None:
+    rng = random.Random(args.seed)
+    async with AsyncSessionLocal() as db:
+        catalog = await load_catalog(db)
+        print(f"🔄 Creating {args.customers:,} customers...")
+        customers = await seed_customers(db, rng, args.customers, args.batch_size)
+        print(f"🔄 Creating {args.repairs:,} repair requests over {args.days} days...")
+        await seed_repairs(db, rng, args.repairs, args.days, args.batch_size, customers, catalog)
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic dataset for benchmark.py")
+    parser.add_argument("--repairs", type=int, default=100000)
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=730, help="Spread creation dates over this many days")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    asyncio.run(seed(args))
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
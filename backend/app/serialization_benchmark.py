@@ -0,0 +1,166 @@
+# serialization_benchmark.py
+"""
+Response serialization micro-benchmark
+Times what FastAPI does with an endpoint's return value, per response, for
+the heaviest payloads: the previous path (no response_model: jsonable_encoder,
+then JSONResponse's json.dumps) against the current one (response_model
+validated and dumped by pydantic-core, then ORJSONResponse). Both run through
+FastAPI's own serialize_response, after checking they produce the same JSON.
+
+Usage:
+    python serialization_benchmark.py
+    python serialization_benchmark.py --page-size 100 --count 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import schemas
+from models import RepairStatus, WatchType
+from stats import DIMENSIONS
+
+BRANDS = ["Rolex", "Omega", "Seiko", "Casio", "Citizen", "Tissot", "Orient", "Invicta"]
+REPAIR_TYPES = ["Troca de bateria", "Troca de vidro", "Revisão completa", "Troca de pulseira", "Polimento"]
+
+def random_repair(rng: random.Random) -> dict:
+    created_at = datetime.utcnow() - timedelta(seconds=rng.randint(0, 90 * 86400))
+    status = rng.choice(list(RepairStatus))
+    return {
+        "id": str(uuid.uuid4()),
+        "reference_number": f"REP-2026-{rng.randint(1, 999999):06d}",
+        "customer_name": "Maria Oliveira Santos",
+        "customer_cpf": "529.982.247-25",
+        "customer_phone": "(11) 98765-4321",
+        "customer_address": "Rua das Flores, 123",
+        "customer_email": "maria@example.com",
+        "watch_brand": rng.choice(BRANDS),
+        "watch_type": rng.choice(list(WatchType)).value,
+        "repair_types": rng.sample(REPAIR_TYPES, k=rng.randint(1, 3)),
+        "problem_description": "Relógio parou de funcionar após troca de bateria",
+        "status": status.value,
+        "estimated_completion": created_at + timedelta(days=7),
+        "total_price": Decimal(rng.randint(5000, 90000)) / 100 if rng.random() < 0.7 else None,
+        "internal_notes": "Aguardando peça" if status != RepairStatus.PENDING else None,
+        "created_at": created_at,
+        "updated_at": created_at + timedelta(hours=5),
+    }
+
+def list_item(repair: dict) -> dict:
+    keys = schemas.RepairListItem.model_fields
+    return {key: repair[key] for key in keys}
+
+def admin_list(rng: random.Random, page_size: int) -> dict:
+    return {
+        "repair_requests": [list_item(random_repair(rng)) for _ in range(page_size)],
+        "pagination": {"current_page": 1, "total_pages": 5000, "total_items": 100000, "next_cursor": "MjAyNi0xMC0xOA"},
+    }
+
+def repair_detail(rng: random.Random) -> dict:
+    repair = random_repair(rng)
+    repair["repair_types"] = [
+        {"id": str(uuid.uuid4()), "name": name, "description": f"Serviço de {name.lower()}"}
+        for name in repair["repair_types"]
+    ]
+    return repair
+
+def repair_status(rng: random.Random) -> dict:
+    repair = random_repair(rng)
+    return {key: repair.get(key) for key in schemas.RepairStatusResponse.model_fields} | {"notes": repair["internal_notes"]}
+
+def summary(rng: random.Random) -> dict:
+    by_status = {
+        status.value: {"count": rng.randint(0, 5000), "revenue": Decimal(rng.randint(0, 10 ** 8)) / 100}
+        for status in RepairStatus
+    }
+    return {
+        "total_repairs": sum(entry["count"] for entry in by_status.values()),
+        "total_revenue": sum((entry["revenue"] for entry in by_status.values()), Decimal(0)),
+        "by_status": by_status,
+        "completed_count": rng.randint(0, 5000),
+        "average_turnaround_hours": round(rng.uniform(24, 400), 2),
+    }
+
+def dashboard(rng: random.Random) -> dict:
+    keys = {"brand": BRANDS, "repair_type": REPAIR_TYPES, "watch_type": [t.value for t in WatchType]}
+    result = {"totals": summary(rng)}
+    for dimension in DIMENSIONS:
+        result[f"by_{dimension}"] = [{"key": str(uuid.uuid4()), "name": name, **summary(rng)} for name in keys[dimension]]
+    return result
+
+def search_results(rng: random.Random) -> dict:
+    repairs = [random_repair(rng) for _ in range(20)]
+    return {
+        "repairs": [
+            {key: repair[key] for key in schemas.RepairSearchResult.model_fields if key != "rank"} | {"rank": rng.random()}
+            for repair in repairs
+        ],
+        "customers": [
+            {"id": str(uuid.uuid4()), "name": repair["customer_name"], "cpf": repair["customer_cpf"],
+             "phone": repair["customer_phone"], "email": repair["customer_email"], "rank": rng.random()}
+            for repair in repairs[:10]
+        ],
+    }
+
+async def render_untyped(content) -> bytes:
+    """No response_model: jsonable_encoder, then the default JSONResponse"""
+    return JSONResponse(await serialize_response(response_content=content)).body
+
+def typed_renderer(model):
+    field = create_response_field(name="response", type_=model)
+
+    async def render(content) -> bytes:
+        return ORJSONResponse(await serialize_response(field=field, response_content=content)).body
+    return render
+
+async def best_time(render, content, count: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(count):
+            await render(content)
+        best = min(best, time.perf_counter() - started)
+    return best / count
+
+async def run(args) -> None:
+    rng = random.Random(args.seed)
+    payloads = [
+        (f"admin list ({args.page_size} rows)", schemas.RepairRequestList, admin_list(rng, args.page_size)),
+        ("repair detail", schemas.RepairRequestResponse, repair_detail(rng)),
+        ("public status", schemas.RepairStatusResponse, repair_status(rng)),
+        ("dashboard stats", schemas.DashboardStats, dashboard(rng)),
+        ("search (20+10 hits)", schemas.SearchResults, search_results(rng)),
+    ]
+    for name, model, content in payloads:
+        render_typed = typed_renderer(model)
+        before = await render_untyped(content)
+        after = await render_typed(content)
+        if json.loads(before) != json.loads(after):
+            raise SystemExit(f"❌ {name}: typed response differs from the untyped one\n{before!r}\n{after!r}")
+
+        untyped = await best_time(render_untyped, content, args.count, args.repeat)
+        typed = await best_time(render_typed, content, args.count, args.repeat)
+        print(f"📊 {name:<22} {len(after):>7,} bytes  "
+              f"untyped {untyped * 1e6:8.1f}µs  typed+orjson {typed * 1e6:8.1f}µs  ({untyped / typed:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization micro-benchmark")
+    parser.add_argument("--page-size", type=int, default=20, help="Rows in the admin list payload")
+    parser.add_argument("--count", type=int, default=1000, help="Serializations per run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+    print("✅ Typed and untyped responses serialize to the same JSON")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# stats.py
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import dialect_insert
+from models import RepairStat, RepairTurnaroundStat, RepairStatus, WatchType, WatchBrand, RepairType, repair_request_types
+
+DIMENSIONS = ("brand", "repair_type", "watch_type")
+
+@dataclass(frozen=True)
+class RepairFacts:
+    """The attributes of a repair that the dashboard groups by"""
+    brand_id: uuid.UUID
+    watch_type: WatchType
+    repair_type_ids: Sequence[uuid.UUID]
+
+    def dimension_keys(self) -> List[Tuple[str, str]]:
+        return [
+            ("all", "all"),
+            ("brand", str(self.brand_id)),
+            ("watch_type", self.watch_type.value),
+            *(("repair_type", str(repair_type_id)) for repair_type_id in self.repair_type_ids),
+        ]
+
+async def load_repair_facts(db: AsyncSession, repair) -> RepairFacts:
+    """Facts for an existing repair; costs one indexed lookup for its repair types"""
+    repair_type_ids = (await db.scalars(
+        select(repair_request_types.c.repair_type_id)
+        .where(repair_request_types.c.repair_request_id == repair.id)
+    )).all()
+    return RepairFacts(repair.watch_brand_id, repair.watch_type, repair_type_ids)
+
+async def load_repair_facts_many(db: AsyncSession, repairs) -> Dict[uuid.UUID, RepairFacts]:
+    """Facts for several existing repairs (rows with id, watch_brand_id and
+    watch_type) with one lookup for all their repair types"""
+    repair_type_ids = defaultdict(list)
+    if repairs:
+        rows = await db.execute(
+            select(repair_request_types.c.repair_request_id, repair_request_types.c.repair_type_id)
+            .where(repair_request_types.c.repair_request_id.in_([repair.id for repair in repairs]))
+        )
+        for repair_id, repair_type_id in rows:
+            repair_type_ids[repair_id].append(repair_type_id)
+    return {
+        repair.id: RepairFacts(repair.watch_brand_id, repair.watch_type, repair_type_ids[repair.id])
+        for repair in repairs
+    }
+
+class StatsDelta:
+    """Accumulates aggregate changes for one transaction and applies them as
+    a single upsert per table, so a write costs O(1) statements regardless
+    of how many repairs it touches"""
+
+    def __init__(self):
+        self.counts: Dict[Tuple[str, str, RepairStatus], List] = defaultdict(lambda: [0, Decimal(0)])
+        self.turnaround: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+
+    def add(self, facts: RepairFacts, status: RepairStatus, price: Optional[Decimal], sign: int = 1) -> None:
+        for dimension, key in facts.dimension_keys():
+            entry = self.counts[(dimension, key, status)]
+            entry[0] += sign
+            entry[1] += sign * (price or Decimal(0))
+
+    def created(self, facts: RepairFacts, status: RepairStatus = RepairStatus.PENDING, price: Optional[Decimal] = None) -> None:
+        self.add(facts, status, price)
+
+    def changed(
+        self,
+        facts: RepairFacts,
+        old_status: RepairStatus,
+        old_price: Optional[Decimal],
+        new_status: RepairStatus,
+        new_price: Optional[Decimal],
+        created_at: Optional[datetime] = None,
+        completed_at: Optional[datetime] = None,
+    ) -> None:
+        """`completed_at` is the repair's completed_at before this change"""
+        if old_status == new_status and old_price == new_price:
+            return
+        self.add(facts, old_status, old_price, sign=-1)
+        self.add(facts, new_status, new_price)
+
+        # Turnaround is recorded when work first finishes, not again on
+        # delivery or when a reopened repair is completed again
+        if (new_status == RepairStatus.COMPLETED and old_status in (RepairStatus.PENDING, RepairStatus.IN_PROGRESS)
+                and created_at is not None and completed_at is None):
+            self.completed(facts, int((datetime.utcnow() - created_at).total_seconds()))
+
+    def completed(self, facts: RepairFacts, turnaround_seconds: int) -> None:
+        for dimension, key in facts.dimension_keys():
+            entry = self.turnaround[(dimension, key)]
+            entry[0] += 1
+            entry[1] += turnaround_seconds
+
+    async def apply(self, db: AsyncSession) -> None:
+        count_rows = [
+            {"dimension": dimension, "dimension_key": key, "status": status, "repair_count": count, "revenue": revenue}
+            for (dimension, key, status), (count, revenue) in self.counts.items()
+            if count or revenue
+        ]
+        if count_rows:
+            table = RepairStat.__table__
+            statement = dialect_insert(db, table)
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[table.c.dimension, table.c.dimension_key, table.c.status],
+                    set_={
+                        "repair_count": table.c.repair_count + statement.excluded.repair_count,
+                        "revenue": table.c.revenue + statement.excluded.revenue,
+                    },
+                ),
+                count_rows,
+            )
+
+        turnaround_rows = [
+            {"dimension": dimension, "dimension_key": key, "completed_count": count, "turnaround_seconds": seconds}
+            for (dimension, key), (count, seconds) in self.turnaround.items()
+        ]
+        if turnaround_rows:
+            table = RepairTurnaroundStat.__table__
+            statement = dialect_insert(db, table)
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[table.c.dimension, table.c.dimension_key],
+                    set_={
+                        "completed_count": table.c.completed_count + statement.excluded.completed_count,
+                        "turnaround_seconds": table.c.turnaround_seconds + statement.excluded.turnaround_seconds,
+                    },
+                ),
+                turnaround_rows,
+            )
+
+        self.counts.clear()
+        self.turnaround.clear()
+
+def summarize(by_status: Dict[str, Dict], turnaround: Optional[Tuple[int, int]]) -> Dict:
+    completed_count, turnaround_seconds = turnaround or (0, 0)
+    return {
+        "total_repairs": sum(entry["count"] for entry in by_status.values()),
+        "total_revenue": sum((entry["revenue"] for entry in by_status.values()), Decimal(0)),
+        "by_status": by_status,
+        "completed_count": completed_count,
+        "average_turnaround_hours": (
+            round(turnaround_seconds / completed_count / 3600, 2) if completed_count else None
+        ),
+    }
+
+async def dashboard_stats(db: AsyncSession) -> Dict:
+    """Read the precomputed aggregates; cost depends on the number of
+    brands/repair types, not on the number of repairs"""
+    by_status = defaultdict(lambda: {status.value: {"count": 0, "revenue": Decimal(0)} for status in RepairStatus})
+    for stat in (await db.scalars(select(RepairStat))).all():
+        by_status[(stat.dimension, stat.dimension_key)][stat.status.value] = {
+            "count": stat.repair_count,
+            "revenue": stat.revenue,
+        }
+    turnaround = {
+        (stat.dimension, stat.dimension_key): (stat.completed_count, stat.turnaround_seconds)
+        for stat in (await db.scalars(select(RepairTurnaroundStat))).all()
+    }
+
+    names = {
+        "brand": {str(brand_id): name for brand_id, name in await db.execute(select(WatchBrand.id, WatchBrand.name))},
+        "repair_type": {str(rt_id): name for rt_id, name in await db.execute(select(RepairType.id, RepairType.name))},
+        "watch_type": {watch_type.value: watch_type.value for watch_type in WatchType},
+    }
+
+    result = {"totals": summarize(by_status[("all", "all")], turnaround.get(("all", "all")))}
+    for dimension in DIMENSIONS:
+        result[f"by_{dimension}"] = [
+            {"key": key, "name": names[dimension].get(key, key), **summarize(by_status[(dimension, key)], turnaround.get((dimension, key)))}
+            for key in sorted({key for dim, key in list(by_status) + list(turnaround) if dim == dimension})
+        ]
+    return result
@@ -0,0 +1,202 @@
+# status_history.py
+"""
+Append-only repair status history
+Every submission and status change adds a row to repair_status_events in the
+same transaction as the repair write (StatusHistory, used like
+stats.StatsDelta). Each event stores how long the repair sat in the status
+it left (dwell_seconds), computed at write time from the previous event, so
+the stage analytics are plain aggregates over a changed_at range rather than
+window functions pairing up millions of events.
+
+Repairs created before the history existed have no creation event; their
+first change out of PENDING is measured from created_at, later stages from
+the events recorded since. Events are kept when a repair is archived; the
+per repair type figures only cover repairs still in repair_requests, since
+archival removes their repair_request_types rows.
+"""
+import math
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RepairStatus, RepairStatusEvent, RepairType, WatchBrand, repair_request_types
+
+PERCENTILES = (0.5, 0.9, 0.99)
+# Window of the dwell time analytics when the request gives none
+DEFAULT_WINDOW_DAYS = 30
+
+@dataclass(frozen=True)
+class StatusChange:
+    repair_id: uuid.UUID
+    brand_id: uuid.UUID
+    from_status: Optional[RepairStatus]
+    to_status: RepairStatus
+    changed_at: datetime
+    created_at: Optional[datetime] = None
+
+class StatusHistory:
+    """Status events for one transaction, written by apply() with one
+    lookup of the repairs' previous events and one multi-row INSERT"""
+
+    def __init__(self):
+        self.changes: List[StatusChange] = []
+
+    def created(self, repair_id: uuid.UUID, brand_id: uuid.UUID, created_at: datetime) -> None:
+        self.changes.append(StatusChange(repair_id, brand_id, None, RepairStatus.PENDING, created_at))
+
+    def changed(
+        self,
+        repair_id: uuid.UUID,
+        brand_id: uuid.UUID,
+        old_status: RepairStatus,
+        new_status: RepairStatus,
+        created_at: Optional[datetime] = None,
+    ) -> None:
+        if old_status != new_status:
+            self.changes.append(StatusChange(repair_id, brand_id, old_status, new_status, datetime.utcnow(), created_at))
+
+    async def apply(self, db: AsyncSession) -> None:
+        if not self.changes:
+            return
+        changed_ids = [change.repair_id for change in self.changes if change.from_status is not None]
+        previous = {}
+        if changed_ids:
+            previous = dict((await db.execute(
+                select(RepairStatusEvent.repair_request_id, func.max(RepairStatusEvent.changed_at))
+                .where(RepairStatusEvent.repair_request_id.in_(changed_ids))
+                .group_by(RepairStatusEvent.repair_request_id)
+            )).all())
+
+        rows = []
+        for change in self.changes:
+            entered_at = previous.get(change.repair_id)
+            if entered_at is None and change.from_status == RepairStatus.PENDING:
+                entered_at = change.created_at
+            rows.append({
+                "repair_request_id": change.repair_id,
+                "watch_brand_id": change.brand_id,
+                "from_status": change.from_status,
+                "to_status": change.to_status,
+                "changed_at": change.changed_at,
+                "dwell_seconds": (
+                    max(int((change.changed_at - entered_at).total_seconds()), 0)
+                    if change.from_status is not None and entered_at is not None else None
+                ),
+            })
+            previous[change.repair_id] = change.changed_at
+        await db.execute(insert(RepairStatusEvent), rows)
+        self.changes.clear()
+
+async def load_timeline(db: AsyncSession, repair_id: uuid.UUID) -> List[Dict]:
+    """Events of one repair, oldest first (a range scan of its index)"""
+    events = (await db.scalars(
+        select(RepairStatusEvent)
+        .where(RepairStatusEvent.repair_request_id == repair_id)
+        .order_by(RepairStatusEvent.changed_at, RepairStatusEvent.id)
+    )).all()
+    return [
+        {
+            "from_status": event.from_status.value if event.from_status else None,
+            "to_status": event.to_status.value,
+            "changed_at": event.changed_at,
+            "dwell_seconds": event.dwell_seconds,
+        }
+        for event in events
+    ]
+
+def hours(seconds) -> Optional[float]:
+    return round(float(seconds) / 3600, 2) if seconds is not None else None
+
+def stage_summary(status: RepairStatus, count: int, average, percentiles: Sequence) -> Dict:
+    summary = {"status": status.value, "count": count, "average_hours": hours(average)}
+    for fraction, value in zip(PERCENTILES, percentiles):
+        summary[f"p{round(fraction * 100)}_hours"] = hours(value)
+    return summary
+
+def percentile_disc(ordered: Sequence[int], fraction: float) -> int:
+    """Smallest value with at least `fraction` of the values at or below it"""
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+def in_workflow_order(stages: Dict) -> Dict:
+    """Stages as PENDING, IN_PROGRESS, ... (SQLite sorts the names alphabetically)"""
+    order = {status.value: index for index, status in enumerate(RepairStatus)}
+    for summaries in stages.values():
+        summaries.sort(key=lambda summary: order[summary["status"]])
+    return stages
+
+async def dwell_stages(db: AsyncSession, group_column, changed_from: datetime, changed_to: datetime, join=None) -> Dict:
+    """{group key: [stage summaries]} over the events in the window.
+
+    PostgreSQL computes the percentiles with ordered-set aggregates in the
+    GROUP BY; SQLite (local testing) reads the dwell times in order and
+    picks them in Python.
+    """
+    dwell = RepairStatusEvent.dwell_seconds
+    keys = [RepairStatusEvent.from_status] if group_column is None else [group_column, RepairStatusEvent.from_status]
+    filters = [
+        RepairStatusEvent.changed_at >= changed_from,
+        RepairStatusEvent.changed_at < changed_to,
+        RepairStatusEvent.from_status.is_not(None),
+        dwell.is_not(None),
+    ]
+
+    def scoped(statement):
+        if join is not None:
+            statement = statement.join(*join)
+        return statement.where(*filters)
+
+    stages = defaultdict(list)
+    if db.bind.dialect.name == 'postgresql':
+        rows = await db.execute(scoped(
+            select(
+                *keys, func.count(), func.avg(dwell),
+                *(func.percentile_disc(fraction).within_group(dwell) for fraction in PERCENTILES)
+            ).select_from(RepairStatusEvent)
+        ).group_by(*keys).order_by(*keys))
+        for row in rows:
+            key = row[0] if group_column is not None else None
+            status, count, average, *percentiles = row[len(keys) - 1:]
+            stages[key].append(stage_summary(status, count, average, percentiles))
+        return in_workflow_order(stages)
+
+    rows = (await db.execute(scoped(select(*keys, dwell).select_from(RepairStatusEvent)).order_by(*keys, dwell))).all()
+    for group, members in groupby(rows, key=lambda row: tuple(row[:-1])):
+        ordered = [row[-1] for row in members]
+        key = group[0] if group_column is not None else None
+        stages[key].append(stage_summary(
+            group[-1], len(ordered), sum(ordered) / len(ordered),
+            [percentile_disc(ordered, fraction) for fraction in PERCENTILES]
+        ))
+    return in_workflow_order(stages)
+
+async def dwell_time_stats(db: AsyncSession, changed_from: datetime, changed_to: datetime) -> Dict:
+    """Time spent in each status before moving on, overall and per watch
+    brand and repair type, for status changes in [changed_from, changed_to)"""
+    overall = await dwell_stages(db, None, changed_from, changed_to)
+    by_brand = await dwell_stages(db, RepairStatusEvent.watch_brand_id, changed_from, changed_to)
+    by_repair_type = await dwell_stages(
+        db, repair_request_types.c.repair_type_id, changed_from, changed_to,
+        join=(repair_request_types, repair_request_types.c.repair_request_id == RepairStatusEvent.repair_request_id)
+    )
+
+    brand_names = dict((await db.execute(select(WatchBrand.id, WatchBrand.name))).all())
+    repair_type_names = dict((await db.execute(select(RepairType.id, RepairType.name))).all())
+    return {
+        "changed_from": changed_from,
+        "changed_to": changed_to,
+        "overall": overall.get(None, []),
+        "by_brand": [
+            {"key": str(key), "name": brand_names.get(key, str(key)), "stages": stages}
+            for key, stages in by_brand.items()
+        ],
+        "by_repair_type": [
+            {"key": str(key), "name": repair_type_names.get(key, str(key)), "stages": stages}
+            for key, stages in by_repair_type.items()
+        ],
+    }
@@ -0,0 +1,99 @@
+# conftest.py
+"""
+Shared fixtures: the app against a fresh SQLite database in a temporary
+directory, with a small catalog. DATABASE_URL has to be set before the app
+modules are imported, since database.py builds the engine at import time.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+DATABASE_DIR = tempfile.mkdtemp(prefix="watchmaker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIR, 'test.db')}"
+os.environ.setdefault("DATABASE_REPLICA_URLS", "")
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+import models
+
+def run_alembic(database_url: str, *args: str) -> None:
+    """Run an alembic command against `database_url` in a subprocess (env.py
+    reads DATABASE_URL, and this process's engine points at the test database)"""
+    subprocess.run(
+        [sys.executable, "-m", "alembic", *args],
+        cwd=APP_DIR, env={**os.environ, "DATABASE_URL": database_url},
+        check=True, capture_output=True,
+    )
+
+VALID_CPFS = ["529.982.247-25", "111.444.777-35", "123.456.789-09", "935.411.347-80"]
+
+@pytest.fixture(scope="session")
+def catalog():
+    engine = create_engine(os.environ["DATABASE_URL"])
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        brands = [models.WatchBrand(name="Rolex"), models.WatchBrand(name="Omega")]
+        repair_types = [
+            models.RepairType(name="Battery replacement", estimated_price=25),
+            models.RepairType(name="Crystal replacement", estimated_price=80),
+            models.RepairType(name="Full service", estimated_price=300),
+        ]
+        session.add_all(brands + repair_types)
+        session.commit()
+        ids = {
+            "brands": [str(brand.id) for brand in brands],
+            "repair_types": [str(repair_type.id) for repair_type in repair_types],
+        }
+    engine.dispose()
+    return ids
+
+@pytest.fixture(scope="session")
+def client(catalog):
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+def submission(catalog, index: int = 0, create_account: bool = False) -> dict:
+    return {
+        "customer_data": {
+            "name": f"Customer {index}",
+            "cpf": VALID_CPFS[index % len(VALID_CPFS)],
+            "phone": f"(11) 99999-{index:04d}",
+            "address": "Rua Augusta, 100",
+        },
+        "watch_data": {"brand_id": catalog["brands"][index % len(catalog["brands"])], "type": "AUTOMATIC"},
+        "repair_data": {
+            "repair_type_ids": catalog["repair_types"][:1 + index % len(catalog["repair_types"])],
+            "problem_description": "Stopped running",
+        },
+        "create_customer_account": create_account,
+    }
+
+@pytest.fixture
+def count_queries():
+    """Context manager yielding a list whose length is the number of SQL
+    statements executed inside the block"""
+    from database import engine
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    return counting
@@ -0,0 +1,53 @@
+# test_bulk_import.py
+"""
+Rows rejected by the database are isolated: the rest of their batch is still
+imported, and only those rows are reported, with the database's message.
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from conftest import submission
+
+REJECTED_NAME = "Rejected By Database"
+
+@pytest.fixture
+def rejecting_trigger(catalog):
+    # Stands in for any constraint the schema validation cannot see
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TRIGGER reject_repair BEFORE INSERT ON repair_requests "
+            f"WHEN NEW.customer_name = '{REJECTED_NAME}' "
+            "BEGIN SELECT RAISE(ABORT, 'repair rejected by trigger'); END"
+        ))
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER reject_repair"))
+    engine.dispose()
+
+def ndjson(bodies) -> bytes:
+    return "\n".join(json.dumps(body) for body in bodies).encode()
+
+def test_database_errors_are_reported_per_row(client, catalog, rejecting_trigger):
+    bodies = [submission(catalog, index) for index in range(7)]
+    for index in (2, 5):
+        bodies[index]["customer_data"]["name"] = REJECTED_NAME
+    bodies[4]["customer_data"]["cpf"] = "123.456.789-00"
+
+    response = client.post(
+        "/api/admin/repair-requests/import",
+        files={"file": ("repairs.ndjson", ndjson(bodies))},
+        params={"batch_size": 10},
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    assert result["total_rows"] == 7
+    assert result["created"] == 4
+    errors = {error["row"]: error["error"] for error in result["errors"]}
+    assert sorted(errors) == [3, 5, 6]
+    assert errors[3] == errors[6] == "Database error: repair rejected by trigger"
+    assert "customer_data.cpf" in errors[5]
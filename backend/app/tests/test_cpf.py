@@ -0,0 +1,76 @@
+# test_cpf.py
+"""
+cpf.py must accept, reject and format every CPF exactly like the validator
+schemas.CustomerData used before it, and format_cpf_for_display must keep
+its old output; cpf_benchmark.py only measures the speed difference.
+"""
+import random
+
+import pytest
+
+from cpf import format_key, normalize
+from cpf_benchmark import legacy_validate, random_valid_key
+from utils import format_cpf_for_display
+
+RANDOM_KEYS = 2000
+
+def legacy_format_cpf_for_display(cpf):
+    """utils.format_cpf_for_display before cpf.py"""
+    cpf_digits = ''.join(filter(str.isdigit, cpf))
+    if len(cpf_digits) == 11:
+        return f"{cpf_digits[:3]}.{cpf_digits[3:6]}.{cpf_digits[6:9]}-{cpf_digits[9:]}"
+    return cpf
+
+def outcome(validate, value):
+    try:
+        return validate(value)
+    except ValueError as e:
+        return f"error: {e}"
+
+def assert_agree(value):
+    assert outcome(lambda v: format_key(normalize(v)), value) == outcome(legacy_validate, value), value
+    assert format_cpf_for_display(value) == legacy_format_cpf_for_display(value), value
+
+@pytest.fixture(scope="module")
+def valid_keys():
+    rng = random.Random(42)
+    return [random_valid_key(rng) for _ in range(RANDOM_KEYS)]
+
+def test_random_valid_cpfs(valid_keys):
+    for key in valid_keys:
+        assert format_key(normalize(key)) == legacy_validate(key) == format_key(key)
+        assert_agree(key)
+
+def test_single_digit_corruptions(valid_keys):
+    for key in valid_keys[:200]:
+        for position in range(11):
+            for digit in "0123456789":
+                if digit != key[position]:
+                    assert_agree(key[:position] + digit + key[position + 1:])
+
+@pytest.mark.parametrize("shape", [
+    lambda key: format_key(key),
+    lambda key: " ".join(key[i:i + 3] for i in range(0, 11, 3)),
+    lambda key: f"  {format_key(key)}\n",
+    lambda key: f"\t{key} ",
+    lambda key: "-".join(key),
+    lambda key: f"{key[:3]}.{key[3:6]}.{key[6:9]}/{key[9:]}",
+    lambda key: f"CPF: {format_key(key)}",
+], ids=["formatted", "groups", "padded", "tabbed", "dashes", "slash", "labelled"])
+def test_punctuated_and_whitespace_forms(valid_keys, shape):
+    for key in valid_keys[:200]:
+        value = shape(key)
+        assert normalize(value) == key
+        assert_agree(value)
+
+@pytest.mark.parametrize("digit", "0123456789")
+def test_all_equal_digits_are_invalid(digit):
+    key = digit * 11
+    for value in (key, format_key(key)):
+        with pytest.raises(ValueError, match="Invalid CPF"):
+            normalize(value)
+        assert_agree(value)
+
+@pytest.mark.parametrize("value", ["", "abc", "529.982.247-2", "5299822472512", "529.982.247-255", "52998224725a"])
+def test_wrong_lengths(value):
+    assert_agree(value)
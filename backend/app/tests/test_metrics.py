@@ -0,0 +1,60 @@
+# test_metrics.py
+"""
+Event streams are not requests in flight: they stay open for as long as the
+client listens, so the middleware counts them apart and keeps them out of
+the latency histogram.
+"""
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from metrics import MetricsMiddleware
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def run(app, path):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    observed = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            observed["in_flight"] = sample("watchmaker_http_requests_in_flight")
+            observed["streams"] = sample("watchmaker_event_streams_open")
+
+    asyncio.run(MetricsMiddleware(app)(scope, receive, send))
+    return observed
+
+def responder(content_type):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": b"data: {}\n\n"})
+    return app
+
+def test_event_streams_are_counted_apart():
+    latency = "watchmaker_http_request_duration_seconds_count"
+    in_flight = sample("watchmaker_http_requests_in_flight")
+    streams = sample("watchmaker_event_streams_open")
+    observations = sample(latency, method="GET", route="unmatched")
+
+    during = run(responder(b"text/event-stream; charset=utf-8"), "/events")
+    assert during == {"in_flight": in_flight, "streams": streams + 1}
+    assert sample(latency, method="GET", route="unmatched") == observations
+
+    during = run(responder(b"application/json"), "/status")
+    assert during == {"in_flight": in_flight + 1, "streams": streams}
+    assert sample(latency, method="GET", route="unmatched") == observations + 1
+
+    assert sample("watchmaker_http_requests_in_flight") == in_flight
+    assert sample("watchmaker_event_streams_open") == streams
+
+def test_catalog_cache_stats_are_exported(client):
+    assert client.get("/api/repair-form/data").status_code == 200
+    hits = sample("watchmaker_catalog_cache_hits")
+    assert client.get("/api/repair-form/data").status_code == 200
+    assert sample("watchmaker_catalog_cache_hits") == hits + 1
+    assert sample("watchmaker_catalog_cache_misses") >= 1
+    assert "watchmaker_catalog_cache_hit_ratio" in client.get("/metrics").text
@@ -0,0 +1,60 @@
+# test_migrations.py
+"""
+Data migrations against a temporary SQLite database: the schema is brought
+to the revision before the migration, seeded, then upgraded.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from conftest import run_alembic
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'migrations.db'}"
+
+def insert_repair(connection, brand_id, status, created_at, updated_at, reference_number):
+    repairs = sa.table(
+        'repair_requests',
+        *(sa.column(name) for name in (
+            'reference_number', 'customer_name', 'customer_cpf', 'customer_phone', 'customer_address',
+            'watch_type', 'problem_description', 'status', 'total_price', 'created_at', 'updated_at',
+        )),
+        sa.column('id', sa.Uuid()),
+        sa.column('watch_brand_id', sa.Uuid()),
+    )
+    connection.execute(repairs.insert().values(
+        id=uuid.uuid4(), reference_number=reference_number, customer_name="Ana", customer_cpf="529.982.247-25",
+        customer_phone="1", customer_address="x", watch_brand_id=brand_id, watch_type="AUTOMATIC",
+        problem_description="broken", status=status, total_price=100, created_at=created_at, updated_at=updated_at,
+    ))
+
+def test_dashboard_backfill_counts_delivered_turnaround(database_url):
+    run_alembic(database_url, "upgrade", "0003_reference_number_sequence")
+    engine = sa.create_engine(database_url)
+    brand_id = uuid.uuid4()
+    created_at = datetime(2026, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(
+            sa.table('watch_brands', sa.column('id', sa.Uuid()), sa.column('name')).insert(),
+            {"id": brand_id, "name": "Rolex"},
+        )
+        insert_repair(connection, brand_id, "COMPLETED", created_at, created_at + timedelta(hours=10), "REP-2026-000001")
+        insert_repair(connection, brand_id, "DELIVERED", created_at, created_at + timedelta(hours=30), "REP-2026-000002")
+        insert_repair(connection, brand_id, "IN_PROGRESS", created_at, created_at + timedelta(hours=99), "REP-2026-000003")
+
+    run_alembic(database_url, "upgrade", "0004_dashboard_stats")
+    with engine.connect() as connection:
+        turnaround = {
+            (dimension, key): (count, seconds)
+            for dimension, key, count, seconds in connection.execute(sa.text(
+                "SELECT dimension, dimension_key, completed_count, turnaround_seconds FROM repair_turnaround_stats"
+            ))
+        }
+    engine.dispose()
+
+    # A delivered repair stays counted, as StatsDelta keeps it after delivery
+    assert turnaround[("all", "all")] == (2, 40 * 3600)
+    assert turnaround[("brand", str(brand_id))] == (2, 40 * 3600)
@@ -0,0 +1,68 @@
+# test_query_counts.py
+"""
+Fixed statement counts for the repair lookup endpoints, so an N+1 (a lazy
+load per repair, brand or repair type) fails here rather than in production.
+Counts are per request and must not depend on how many repairs a page holds.
+"""
+import uuid
+
+import pytest
+
+from conftest import submission
+
+REPAIR_COUNT = 12
+
+@pytest.fixture(scope="module")
+def repairs(client, catalog):
+    created = []
+    for index in range(REPAIR_COUNT):
+        response = client.post("/api/repair-requests", json=submission(catalog, index, create_account=index % 3 == 0))
+        assert response.status_code == 200, response.text
+        created.append(response.json()["repair_request"])
+    return created
+
+@pytest.mark.parametrize("limit", [1, 5, REPAIR_COUNT])
+def test_admin_list(client, repairs, count_queries, limit):
+    # Page query plus one selectin load of the page's repair types
+    with count_queries() as statements:
+        response = client.get("/api/admin/repair-requests", params={"limit": limit, "include_total": False})
+    assert response.status_code == 200
+    assert len(response.json()["repair_requests"]) == limit
+    assert len(statements) == 2, statements
+
+def test_admin_list_cursor_page(client, repairs, count_queries):
+    first = client.get("/api/admin/repair-requests", params={"limit": 5, "include_total": False}).json()
+    with count_queries() as statements:
+        response = client.get(
+            "/api/admin/repair-requests",
+            params={"limit": 5, "include_total": False, "cursor": first["pagination"]["next_cursor"]},
+        )
+    assert response.status_code == 200
+    assert len(statements) == 2, statements
+
+def test_admin_detail(client, repairs, count_queries):
+    with count_queries() as statements:
+        response = client.get(f"/api/admin/repair-requests/{repairs[-1]['id']}")
+    assert response.status_code == 200
+    assert len(response.json()["repair_types"]) == 3
+    assert len(statements) == 2, statements
+
+@pytest.mark.parametrize("by", ["id", "reference"])
+def test_status_lookup(client, repairs, count_queries, by):
+    import main
+    repair = repairs[-1]
+    url = (f"/api/repair-requests/{repair['id']}/status" if by == "id"
+           else f"/api/repair-requests/reference/{repair['reference_number']}/status")
+
+    keys = main.status_cache_keys(uuid.UUID(repair["id"]), repair["reference_number"])
+    client.portal.call(main.status_cache.invalidate, *keys)
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert response.json()["repair_types"]
+    assert len(statements) == 2, statements
+
+    # Served from the status cache afterwards
+    with count_queries() as statements:
+        assert client.get(url).status_code == 200
+    assert statements == []
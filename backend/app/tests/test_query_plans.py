@@ -0,0 +1,25 @@
+# test_query_plans.py
+"""
+Every endpoint query in explain_queries.py must be served by an index on the
+schema the migrations build: a plan with `SCAN <table>` fails here.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from conftest import run_alembic
+from explain_queries import endpoint_queries, full_scans
+
+@pytest.fixture(scope="module")
+def migrated_connection(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    run_alembic(f"sqlite:///{path}", "upgrade", "head")
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+@pytest.mark.parametrize("statement", [statement for _, statement in endpoint_queries()],
+                         ids=[description for description, _ in endpoint_queries()])
+def test_query_uses_an_index(migrated_connection, statement):
+    sql = statement.compile(dialect=migrated_connection.dialect, compile_kwargs={"literal_binds": True})
+    assert full_scans(migrated_connection, sql) == []
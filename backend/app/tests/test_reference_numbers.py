@@ -0,0 +1,38 @@
+# test_reference_numbers.py
+"""
+Concurrent submissions must each get their own reference number: the
+allocator is a sequence on PostgreSQL and a locked counter row elsewhere,
+never a read of the latest reference followed by an insert.
+"""
+import asyncio
+
+import httpx
+
+from conftest import submission
+
+CONCURRENT_SUBMISSIONS = 50
+
+def test_concurrent_submissions_get_distinct_reference_numbers(client, catalog):
+    import main
+
+    async def submit_all():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as concurrent_client:
+            return await asyncio.gather(*(
+                concurrent_client.post("/api/repair-requests", json=submission(catalog, index))
+                for index in range(CONCURRENT_SUBMISSIONS)
+            ))
+
+    # On the app's own event loop, where its startup ran
+    responses = client.portal.call(submit_all)
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_SUBMISSIONS
+    reference_numbers = [response.json()["repair_request"]["reference_number"] for response in responses]
+    assert len(set(reference_numbers)) == CONCURRENT_SUBMISSIONS
+
+def test_reference_numbers_follow_the_sequence(client, catalog):
+    first = client.post("/api/repair-requests", json=submission(catalog)).json()["repair_request"]
+    second = client.post("/api/repair-requests", json=submission(catalog)).json()["repair_request"]
+
+    prefix, _, number = first["reference_number"].rpartition("-")
+    assert second["reference_number"] == f"{prefix}-{int(number) + 1:0{len(number)}d}"
@@ -1,17 +1,32 @@
 # utils.py
 from datetime import datetime
-import random
-import string
+from typing import Tuple
+import base64
+import binascii
+import uuid
 
-def generate_reference_number() -> str:
-    """Generate a unique reference number like REP-2025-001"""
-    year = datetime.now().year
-    random_part = ''.join(random.choices(string.digits, k=3))
-    return f"REP-{year}-{random_part}"
+from cpf import cpf_key, format_key
+
+def generate_reference_number(sequence_value: int, year: int = None) -> str:
+    """Build a reference number like REP-2025-000001 from a sequence value"""
+    year = year or datetime.now().year
+    return f"REP-{year}-{sequence_value:06d}"
 
 def format_cpf_for_display(cpf: str) -> str:
     """Format CPF for display: 12345678901 -> 123.456.789-01"""
-    cpf_digits = ''.join(filter(str.isdigit, cpf))
-    if len(cpf_digits) == 11:
-        return f"{cpf_digits[:3]}.{cpf_digits[3:6]}.{cpf_digits[6:9]}-{cpf_digits[9:]}"
-    return cpf
+    key = cpf_key(cpf)
+    return format_key(key) if key else cpf
+
+def encode_cursor(created_at: datetime, repair_id: uuid.UUID) -> str:
+    """Opaque pagination cursor for the (created_at, id) position of a row"""
+    raw = f"{created_at.isoformat()}|{repair_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, repair_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(repair_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
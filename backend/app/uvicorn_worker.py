@@ -0,0 +1,17 @@
+# uvicorn_worker.py
+"""
+gunicorn worker class for `python run.py --production`
+gunicorn loads worker classes by dotted path, so this lives outside run.py.
+"""
+from decouple import config
+from uvicorn.workers import UvicornWorker
+
+# Seconds a worker waits for in-flight requests after SIGTERM
+GRACEFUL_TIMEOUT = config('GRACEFUL_TIMEOUT', default=30, cast=int)
+
+class GracefulUvicornWorker(UvicornWorker):
+    """UvicornWorker that stops accepting on shutdown, closes idle keep-alive
+    connections and waits up to GRACEFUL_TIMEOUT for in-flight requests;
+    requests still running then (SSE streams) are cancelled"""
+
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": GRACEFUL_TIMEOUT}